@@ -1,9 +1,13 @@
+import copy
+import hashlib
+import inspect
 import numpy as np
 import openpnm as op
 import scipy.sparse.linalg
+import threading
 import warnings
+from collections import OrderedDict
 from numpy.linalg import norm
-import scipy.sparse.csgraph as spgr
 from scipy.spatial import ConvexHull
 from scipy.spatial import cKDTree
 from openpnm.topotools import iscoplanar, is_fully_connected
@@ -15,6 +19,381 @@ from openpnm.utils import logging, Docorator, GenericSettings, prettify_logger_m
 
 docstr = Docorator()
 logger = logging.getLogger(__name__)
+# pypardiso uses a single solver instance, which must not be used by
+# several threads at once
+_pardiso_lock = threading.Lock()
+
+
+class FactorizationCache(OrderedDict):
+    r"""
+    Stores factorizations of coefficient matrices (i.e. SuperLU objects or
+    AMG hierarchies) keyed by a fingerprint of the matrix, so that solving
+    the same matrix with a different RHS does not require refactorizing
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of bytes to be held in the cache.  The default
+        is 50 MB.  Factorizations larger than this are not stored.
+
+    Notes
+    -----
+    Each transport algorithm has its own cache, created on first use and
+    accessed via its ``factorization_cache`` attribute, so factorizations
+    are only reused between calls to ``run`` on the same algorithm.  The
+    least recently used entries are discarded once ``max_size`` is
+    exceeded, which is reported in the log and counted in ``evictions``.
+    Access is guarded by a lock so the algorithm can be solved on several
+    threads.
+
+    """
+
+    def __init__(self, max_size=5e7):
+        super().__init__()
+        self.max_size = max_size
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def fingerprint(A, kind):
+        r"""
+        Returns a hash of the structure and values of the CSR matrix ``A``
+        and the ``kind`` of factorization
+        """
+        h = hashlib.blake2b(kind.encode(), digest_size=16)
+        h.update(np.array(A.shape).tobytes())
+        for arr in [A.indptr, A.indices, A.data]:
+            h.update(str(arr.dtype).encode())
+            h.update(np.ascontiguousarray(arr).tobytes())
+        return h.hexdigest()
+
+    def fetch(self, key):
+        r"""
+        Returns the factorization stored under ``key``, or ``None`` if not
+        found
+        """
+        with self._lock:
+            if key in self.keys():
+                self.hits += 1
+                self.move_to_end(key)
+                return self[key][0]
+            self.misses += 1
+
+    def store(self, key, factor, nbytes):
+        r"""
+        Stores ``factor`` under ``key``, then discards the least recently
+        used factorizations until the cache is below ``max_size``
+        """
+        if nbytes > self.max_size:
+            logger.info(f'Factorization of {nbytes:.3g} bytes exceeds the'
+                        + ' cache size, so was not stored')
+            return
+        with self._lock:
+            if key in self.keys():
+                self.nbytes -= self.pop(key)[1]
+            self[key] = (factor, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_size:
+                _, (_, old) = self.popitem(last=False)
+                self.nbytes -= old
+                self.evictions += 1
+                logger.info(f'Factorization of {old:.3g} bytes removed from'
+                            + ' the cache to stay below max_size')
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self.nbytes = 0
+
+    @property
+    def stats(self):
+        r"""
+        Returns the number of hits, misses and evictions, as well as the
+        number and total size of the stored factorizations
+        """
+        d = op.utils.PrintableDict()
+        d._value = 'Value'
+        d.update({'hits': self.hits,
+                  'misses': self.misses,
+                  'evictions': self.evictions,
+                  'count': len(self),
+                  'nbytes': self.nbytes})
+        return d
+
+
+class PreconditionerManager:
+    r"""
+    Builds a preconditioner for the iterative solvers and reuses it while
+    the coefficient matrix changes only slightly, such as between the
+    iterations of reactive and transient algorithms
+
+    Parameters
+    ----------
+    tol : float
+        The relative change in the values of A, measured as
+        ``norm(A - A_ref)/norm(A_ref)`` where ``A_ref`` is the matrix the
+        preconditioner was built from, above which it is rebuilt.  The
+        default is 0.1.
+    growth : float
+        The preconditioner is also rebuilt when the number of iterations
+        taken by the solver exceeds this multiple of the number taken
+        right after it was built.  The default is 2.
+    block_size : int
+        The number of consecutive pores in each block of the block Jacobi
+        preconditioner.  The default is 100.
+
+    Notes
+    -----
+    The following kinds of preconditioner are supported:
+
+    * 'jacobi'
+        The inverse of the diagonal of A
+    * 'block_jacobi'
+        The LU factorization of the blocks of A on the diagonal
+    * 'ilu'
+        The incomplete LU factorization of A from ``spilu``
+    * 'amg'
+        A smoothed aggregation AMG V-cycle, which requires ``pyamg``
+
+    The number of builds and reuses are given by ``stats``, which can be
+    used to tune ``tol`` and ``growth``.
+
+    """
+
+    def __init__(self, tol=0.1, growth=2.0, block_size=100):
+        self.tol = tol
+        self.growth = growth
+        self.block_size = block_size
+        self.kind = None
+        self.M = None
+        self.fresh = False
+        self.counts = {'builds': 0, 'reuses': 0,
+                       'A changed': 0, 'convergence degraded': 0}
+        self._A_ref = None
+        self._iters = None
+        self._degraded = False
+
+    def get(self, A, kind, force=False):
+        r"""
+        Returns the preconditioner of the given kind for ``A``, as a
+        ``LinearOperator``, rebuilding it only if necessary
+        """
+        A = A.tocsr()
+        reason = None
+        if force or self._degraded:
+            reason = 'convergence degraded'
+        elif self._changed(A):
+            reason = 'A changed'
+        if (self.M is None) or (kind != self.kind) or (reason is not None):
+            if (self.M is not None) and (kind == self.kind):
+                self.counts[reason] += 1
+                logger.info(f'Rebuilding {kind} preconditioner: {reason}')
+            self._build(A, kind)
+        else:
+            self.counts['reuses'] += 1
+            self.fresh = False
+        return self.M
+
+    def record(self, n_iter):
+        r"""
+        Records the number of iterations taken by the solver using the
+        present preconditioner, so it can be rebuilt if this number grows
+        """
+        if self.fresh or (self._iters is None):
+            self._iters = max(n_iter, 1)
+        elif n_iter > self.growth * self._iters:
+            self._degraded = True
+
+    def _changed(self, A):
+        ref = self._A_ref
+        if (ref is None) or (ref.shape != A.shape) \
+                or not np.array_equal(ref.indptr, A.indptr) \
+                or not np.array_equal(ref.indices, A.indices):
+            return True
+        return norm(A.data - ref.data) > self.tol * norm(ref.data)
+
+    def _build(self, A, kind):
+        LinearOperator = scipy.sparse.linalg.LinearOperator
+        if kind == 'jacobi':
+            diag = A.diagonal()
+            inv = 1.0/np.where(diag == 0, 1.0, diag)
+            M = LinearOperator(shape=A.shape, dtype=float,
+                               matvec=lambda x: inv*np.ravel(x))
+        elif kind == 'block_jacobi':
+            A = A.tocoo()
+            mask = (A.row // self.block_size) == (A.col // self.block_size)
+            B = scipy.sparse.csc_matrix(
+                (A.data[mask], (A.row[mask], A.col[mask])), shape=A.shape)
+            lu = scipy.sparse.linalg.splu(B)
+            M = LinearOperator(shape=A.shape, dtype=float, matvec=lu.solve)
+        elif kind == 'ilu':
+            ilu = scipy.sparse.linalg.spilu(A.tocsc())
+            M = LinearOperator(shape=A.shape, dtype=float, matvec=ilu.solve)
+        elif kind == 'amg':
+            import pyamg
+            M = pyamg.smoothed_aggregation_solver(A).aspreconditioner()
+        else:
+            raise Exception(f'Unsupported preconditioner: {kind}')
+        self.M = M
+        self.kind = kind
+        self.fresh = True
+        self.counts['builds'] += 1
+        self._A_ref = A.tocsr(copy=True)
+        self._degraded = False
+
+    @property
+    def stats(self):
+        r"""
+        Returns the number of times the preconditioner was built and
+        reused, and the number of rebuilds due to each reason
+        """
+        d = op.utils.PrintableDict()
+        d._value = 'Count'
+        d.update(self.counts)
+        return d
+
+
+def _split_conductance(g, Nt):
+    r"""
+    Returns the conductances of each throat from its first to its second
+    pore and back again, given either one or two values per throat
+    """
+    g = np.asarray(g, dtype=float)
+    if g.shape == (Nt, ):
+        return g, g
+    elif g.shape == (Nt, 2):
+        return g[:, 0], g[:, 1]
+    elif g.shape == (2*Nt, ):
+        return g[:Nt], g[Nt:]
+    raise Exception('Received conductances are of incorrect length')
+
+
+def _find_clusters_from_conns(conns, Np):
+    r"""
+    Returns the cluster number of each pore, found directly from the
+    throat connections by hooking and pointer jumping, so the adjacency
+    matrix is not needed.  Each cluster is numbered by its lowest pore.
+    """
+    labels = np.arange(Np)
+    if conns.size == 0:
+        return labels
+    P1, P2 = conns[:, 0], conns[:, 1]
+    while True:
+        L1, L2 = labels[P1], labels[P2]
+        if np.array_equal(L1, L2):
+            return labels
+        # Hook the root of each throat's larger label onto the smaller one
+        low = np.minimum(L1, L2)
+        np.minimum.at(labels, L1, low)
+        np.minimum.at(labels, L2, low)
+        # Point every pore straight at its root
+        while True:
+            new = labels[labels]
+            if np.array_equal(new, labels):
+                break
+            labels = new
+
+
+class LaplacianOperator(scipy.sparse.linalg.LinearOperator):
+    r"""
+    Applies the coefficient matrix of a transport algorithm to a vector
+    directly from the throat conductances, without assembling the matrix
+
+    Parameters
+    ----------
+    conns : ndarray
+        The Nt-by-2 array of pores connected by each throat
+    g : ndarray
+        The throat conductances, either Nt long, or Nt-by-2 (or 2*Nt long)
+        for conductances which differ in each direction
+    Np : int
+        The number of pores
+
+    Notes
+    -----
+    The product is identical to that of the matrix built by
+    ``GenericTransport._build_A``, but only the conductances and the
+    diagonal are stored, so the memory needed is a fraction of that of the
+    sparse matrix.  Value BCs are applied by ``set_value_BCs``, which masks
+    the rows and columns of the given pores and places ``f`` on their
+    diagonal, as is done to the assembled matrix.
+
+    """
+
+    def __init__(self, conns, g, Np):
+        super().__init__(dtype=float, shape=(Np, Np))
+        g01, g10 = _split_conductance(g, Nt=conns.shape[0])
+        # Self-loops are ignored, as in csgraph.laplacian
+        loops = conns[:, 0] == conns[:, 1]
+        if np.any(loops):
+            g01 = np.where(loops, 0.0, g01)
+            g10 = np.where(loops, 0.0, g10)
+        self.conns = conns
+        self.g01 = g01
+        self.g10 = g10
+        self.diag = np.bincount(conns[:, 1], weights=g01, minlength=Np) \
+            + np.bincount(conns[:, 0], weights=g10, minlength=Np)
+        self.bc_mask = None
+        self.bc_diag = None
+
+    def _apply(self, x, g01, g10):
+        shape = x.shape
+        x = np.ravel(x)
+        Np = self.shape[0]
+        xm = x if self.bc_mask is None else np.where(self.bc_mask, 0.0, x)
+        y = self.diag * xm
+        y -= np.bincount(self.conns[:, 0], weights=g01*xm[self.conns[:, 1]],
+                         minlength=Np)
+        y -= np.bincount(self.conns[:, 1], weights=g10*xm[self.conns[:, 0]],
+                         minlength=Np)
+        if self.bc_mask is not None:
+            y[self.bc_mask] = self.bc_diag * x[self.bc_mask]
+        return y.reshape(shape)
+
+    def _matvec(self, x):
+        return self._apply(x, self.g01, self.g10)
+
+    def _rmatvec(self, x):
+        return self._apply(x, self.g10, self.g01)
+
+    def set_value_BCs(self, mask, f):
+        r"""
+        Removes the rows and columns of the pores indicated by ``mask``
+        from the operator, and places ``f`` on their diagonal
+        """
+        self.bc_mask = np.array(mask, dtype=bool)
+        self.bc_diag = f
+
+    def diagonal(self):
+        r"""
+        Returns the diagonal of the operator
+        """
+        diag = self.diag.copy()
+        if self.bc_mask is not None:
+            diag[self.bc_mask] = self.bc_diag
+        return diag
+
+    def jacobi(self):
+        r"""
+        Returns the Jacobi (diagonal) preconditioner of the operator
+        """
+        diag = self.diagonal()
+        inv = 1.0/np.where(diag == 0, 1.0, diag)
+        return scipy.sparse.linalg.LinearOperator(
+            shape=self.shape, dtype=float,
+            matvec=lambda x: inv*np.ravel(x), rmatvec=lambda x: inv*np.ravel(x))
+
+    def is_symmetric(self):
+        r"""
+        Returns ``True`` if the conductances are equal in both directions
+        """
+        return np.array_equal(self.g01, self.g10)
+
+    def copy(self):
+        return copy.copy(self)
 
 
 @docstr.get_sections(base='GenericTransportSettings',
@@ -76,6 +455,32 @@ class GenericTransportSettings(GenericSettings):
         If ``True``, A matrix is cached and reused rather than getting rebuilt.
     cache_b : bool
         If ``True``, b vector is cached and reused rather than getting rebuilt.
+    reuse_preconditioner : bool
+        If ``True``, the iterative ``scipy`` solvers are given the
+        preconditioner specified by ``solver_preconditioner`` (either
+        'jacobi', 'block_jacobi', 'ilu' or 'amg'), and the ``pyamg`` solver
+        uses its hierarchy as a preconditioner.  These are kept by the
+        algorithm's ``preconditioner`` attribute and reused between solves
+        until A changes by more than ``preconditioner_tol`` or convergence
+        slows down.
+    preconditioner_tol : float (default = 0.1)
+        The relative change in A beyond which a reused preconditioner is
+        rebuilt.
+    matrix_free : bool
+        If ``True``, the A matrix is not assembled, and a ``LaplacianOperator``
+        which computes its product with a vector from the conductances is
+        used instead.  This is only supported by the iterative ``scipy``
+        solvers on steady linear problems without source terms, but uses
+        much less memory on large networks.  A Jacobi preconditioner is
+        applied.
+    cache_factorization : bool
+        If ``True``, the factorizations computed by the ``scipy`` direct
+        solver and the hierarchies built by ``pyamg`` are stored in the
+        algorithm's ``factorization_cache`` and reused whenever the same A
+        matrix is solved again.  This is only useful when A does not change
+        between calls to ``run``, such as when only the BCs values change,
+        so it is off by default.  Factorizations are always reused between
+        the time steps of linear transient problems with a constant step.
 
     """
 
@@ -91,6 +496,10 @@ class GenericTransportSettings(GenericSettings):
     solver_max_iter = 5000
     cache_A = True
     cache_b = True
+    cache_factorization = False
+    reuse_preconditioner = False
+    preconditioner_tol = 0.1
+    matrix_free = False
 
 
 @docstr.get_sections(base='GenericTransport', sections=['Parameters'])
@@ -180,6 +589,11 @@ class GenericTransport(GenericAlgorithm):
         instance._b = None
         instance._pure_A = None
         instance._pure_b = None
+        instance._A_template = None
+        instance._BC_slots = None
+        instance._preconditioner = None
+        instance._factorization_cache = None
+        instance._constant_A = False
         return instance
 
     def __init__(self, project=None, network=None, phase=None, settings={},
@@ -202,6 +616,16 @@ class GenericTransport(GenericAlgorithm):
     def x(self):
         return self[self.settings['quantity']]
 
+    @property
+    def factorization_cache(self):
+        r"""
+        The ``FactorizationCache`` holding the factorizations of the A
+        matrices solved by this algorithm
+        """
+        if self._factorization_cache is None:
+            self._factorization_cache = FactorizationCache()
+        return self._factorization_cache
+
     @docstr.get_full_description(base='GenericTransport.reset')
     @docstr.get_sections(base='GenericTransport.reset', sections=['Parameters'])
     @docstr.dedent
@@ -425,12 +849,13 @@ class GenericTransport(GenericAlgorithm):
         if ('pore.bc_rate' in self.keys()) and ('rate' in bctype):
             self['pore.bc_rate'][pores] = np.nan
 
-    def _build_A(self):
+    def _build_A(self, g=None):
         r"""
         Builds the coefficient matrix based on conductances between pores.
         The conductance to use is specified in the algorithm's ``settings``
         under ``conductance``.  In subclasses (e.g. ``FickianDiffusion``)
-        this is set by default, though it can be overwritten.
+        this is set by default, though it can be overwritten.  The values
+        can also be given as ``g``, instead of being fetched from the phase.
         """
         gvals = self.settings['conductance']
         if not gvals:
@@ -444,17 +869,111 @@ class GenericTransport(GenericAlgorithm):
             pass
         if not self.settings['cache_A']:
             self._pure_A = None
+        # Rebuild A if 'matrix_free' was toggled since it was cached
+        if isinstance(self._pure_A, LaplacianOperator) \
+                != bool(self.settings['matrix_free']):
+            self._pure_A = None
         if self._pure_A is None:
             network = self.project.network
             try:
                 phase = self.project.phases()[self.settings['phase']]
             except KeyError:
                 raise Exception('Phase has not been defined for algorithm')
-            g = phase[gvals]
-            am = network.create_adjacency_matrix(weights=g, fmt='coo')
-            self._pure_A = spgr.laplacian(am).astype(float)
+            if g is None:
+                g = phase[gvals]
+            if self.settings['matrix_free']:
+                self._pure_A = LaplacianOperator(conns=network['throat.conns'],
+                                                 g=g, Np=network.Np)
+            else:
+                self._pure_A = self._fill_A_template(g=g, network=network)
         self.A = self._pure_A.copy()
 
+    def _get_A_template(self, network):
+        r"""
+        Returns the sparsity pattern of the coefficient matrix in CSR format,
+        along with the position in its ``data`` array of each entry
+
+        Notes
+        -----
+        The entries are ordered as the off-diagonal entry of each throat from
+        ``conns[:, 0]`` to ``conns[:, 1]``, then back again, followed by the
+        diagonal entry of each pore.  Since the pattern depends only on the
+        topology, it is built once and reused by ``_build_A``.  It is rebuilt
+        if ``'throat.conns'`` on the network has been replaced (i.e. by
+        ``topotools.trim`` or ``extend``).
+
+        """
+        conns = network['throat.conns']
+        template = self._A_template
+        if (template is not None) and (template['conns'] is conns) \
+                and (template['A'].shape[0] == network.Np):
+            return template
+        Np = network.Np
+        row = np.concatenate((conns[:, 0], conns[:, 1], np.arange(Np)))
+        col = np.concatenate((conns[:, 1], conns[:, 0], np.arange(Np)))
+        # Sort entries by row then column to find the unique locations
+        order = np.lexsort((col, row))
+        key = row[order].astype(np.int64)*Np + col[order]
+        first = np.ones(key.size, dtype=bool)
+        first[1:] = key[1:] != key[:-1]
+        slots = np.empty(key.size, dtype=np.int64)
+        slots[order] = np.cumsum(first) - 1
+        indptr = np.zeros(Np + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row[order][first], minlength=Np), out=indptr[1:])
+        indices = col[order][first]
+        A = scipy.sparse.csr_matrix((np.zeros(indices.size), indices, indptr),
+                                    shape=(Np, Np))
+        A.has_sorted_indices = True
+        # Duplicate throats and self-loops cause entries to share locations
+        unique = np.all(first)
+        self._A_template = {'conns': conns, 'A': A, 'slots': slots,
+                            'unique': unique}
+        return self._A_template
+
+    def _fill_A_template(self, g, network):
+        r"""
+        Writes the Laplacian of the given throat conductances into the data
+        array of the cached coefficient matrix template and returns it
+
+        Parameters
+        ----------
+        g : ndarray
+            The throat conductances, either Nt long, or Nt-by-2 (or 2*Nt
+            long) for conductances which differ in each direction.
+        network : GenericNetwork
+            The network defining the topology
+
+        Notes
+        -----
+        The result is identical to ``scipy.sparse.csgraph.laplacian`` of the
+        weighted adjacency matrix, so the diagonal contains the sum of each
+        column of the adjacency matrix.  The returned matrix is overwritten
+        on the next call, so it should be copied before being modified.
+
+        """
+        template = self._get_A_template(network=network)
+        Np, Nt = network.Np, network.Nt
+        g01, g10 = _split_conductance(g, Nt=Nt)
+        conns = template['conns']
+        A = template['A']
+        slots = template['slots']
+        if template['unique']:
+            diag = np.bincount(conns[:, 1], weights=g01, minlength=Np)
+            diag += np.bincount(conns[:, 0], weights=g10, minlength=Np)
+            A.data[slots[:Nt]] = -g01
+            A.data[slots[Nt:2*Nt]] = -g10
+            A.data[slots[2*Nt:]] = diag
+        else:
+            # Self-loops are ignored, as in csgraph.laplacian
+            loops = conns[:, 0] == conns[:, 1]
+            g01 = np.where(loops, 0.0, g01)
+            g10 = np.where(loops, 0.0, g10)
+            diag = np.bincount(conns[:, 1], weights=g01, minlength=Np)
+            diag += np.bincount(conns[:, 0], weights=g10, minlength=Np)
+            vals = np.concatenate((-g01, -g10, diag))
+            A.data[:] = np.bincount(slots, weights=vals, minlength=A.data.size)
+        return A
+
     def _build_b(self):
         r"""
         Builds the RHS matrix, without applying any boundary conditions or
@@ -479,6 +998,38 @@ class GenericTransport(GenericAlgorithm):
 
     A = property(fget=_get_A, fset=_set_A)
 
+    @property
+    def preconditioner(self):
+        r"""
+        The ``PreconditionerManager`` which builds and reuses the
+        preconditioner when ``settings['reuse_preconditioner']`` is ``True``
+        """
+        if self._preconditioner is None:
+            self._preconditioner = PreconditionerManager()
+        self._preconditioner.tol = self.settings['preconditioner_tol']
+        return self._preconditioner
+
+    def _solve_preconditioned(self, ls, A, b, kind, **kwargs):
+        r"""
+        Calls the given iterative solver using the reused preconditioner,
+        rebuilding the preconditioner and trying again if the solver fails
+        """
+        pc = self.preconditioner
+        for force in [False, True]:
+            count = [0]
+
+            def callback(*args):
+                count[0] += 1
+
+            if 'callback_type' in inspect.signature(ls).parameters:
+                kwargs['callback_type'] = 'pr_norm'
+            M = pc.get(A, kind=kind, force=force)
+            x, info = ls(A=A, b=b, M=M, callback=callback, **kwargs)
+            pc.record(count[0])
+            if (info == 0) or pc.fresh:
+                break
+        return x
+
     def _get_b(self):
         if self._b is None:
             self._build_b()
@@ -498,23 +1049,88 @@ class GenericTransport(GenericAlgorithm):
             # Update b
             ind = np.isfinite(self['pore.bc_rate'])
             self.b[ind] = self['pore.bc_rate'][ind]
-        if 'pore.bc_value' in self.keys():
+        if 'pore.bc_value' in self.keys() \
+                and isinstance(self.A, LaplacianOperator):
             f = self.A.diagonal().mean()
-            # Update b (impose bc values)
             ind = np.isfinite(self['pore.bc_value'])
             self.b[ind] = self['pore.bc_value'][ind] * f
-            # Update b (substract quantities from b to keep A symmetric)
             x_BC = np.zeros_like(self.b)
             x_BC[ind] = self['pore.bc_value'][ind]
-            self.b[~ind] -= (self.A * x_BC)[~ind]
-            # Update A
+            self.b[~ind] -= (self.A @ x_BC)[~ind]
+            self.A.set_value_BCs(mask=ind, f=f)
+        elif 'pore.bc_value' in self.keys():
+            A = self.A.tocsr()
+            f = A.diagonal().mean()
+            # Update b (impose bc values)
+            ind = np.isfinite(self['pore.bc_value'])
+            self.b[ind] = self['pore.bc_value'][ind] * f
             P_bc = self.toindices(ind)
-            mask = np.isin(self.A.row, P_bc) | np.isin(self.A.col, P_bc)
-            self.A.data[mask] = 0  # Remove entries from A for all BC rows/cols
-            datadiag = self.A.diagonal()  # Add diagonal entries back into A
-            datadiag[P_bc] = np.ones_like(P_bc, dtype=float) * f
-            self.A.setdiag(datadiag)
-            self.A.eliminate_zeros()  # Remove 0 entries
+            slots = self._get_BC_slots(A=A, pores=P_bc)
+            # Update b (substract quantities from b to keep A symmetric)
+            vals = A.data[slots['coupling']] \
+                * self['pore.bc_value'][slots['coupling_cols']]
+            self.b -= np.bincount(slots['coupling_rows'], weights=vals,
+                                  minlength=A.shape[0])
+            # Update A
+            A.data[slots['zero']] = 0  # Zero entries in all BC rows/cols
+            if slots['diag'].size == P_bc.size:  # Put f on diagonal of BCs
+                A.data[slots['diag']] = f
+            else:  # Unless some diagonal entries are absent from A
+                datadiag = A.diagonal()
+                datadiag[P_bc] = f
+                A.setdiag(datadiag)
+            self.A = A
+
+    def _get_BC_slots(self, A, pores):
+        r"""
+        Finds the positions in the ``data`` array of the given CSR matrix of
+        the entries affected by value BCs in the given pores
+
+        Returns
+        -------
+        slots : dict
+            With the following keys:
+
+            * 'zero'
+                Entries in the rows and columns of the BC pores
+            * 'diag'
+                Diagonal entries of the BC pores
+            * 'coupling'
+                Entries in the columns of BC pores but not in their rows,
+                with their rows and columns in 'coupling_rows' and
+                'coupling_cols'.  These are needed to correct ``b``.
+
+        Notes
+        -----
+        The result is kept and reused for as long as the BC pores and the
+        sparsity pattern of ``A`` are unchanged, which is usually the case
+        in the iterations of reactive and transient algorithms.
+
+        """
+        slots = self._BC_slots
+        if (slots is not None) and np.array_equal(slots['pores'], pores) \
+                and (slots['indptr'] is A.indptr
+                     or np.array_equal(slots['indptr'], A.indptr)) \
+                and (slots['indices'] is A.indices
+                     or np.array_equal(slots['indices'], A.indices)):
+            return slots
+        Np = A.shape[0]
+        row = np.repeat(np.arange(Np), np.diff(A.indptr))
+        col = A.indices
+        is_bc = np.zeros(Np, dtype=bool)
+        is_bc[pores] = True
+        bc_row = is_bc[row]
+        bc_col = is_bc[col]
+        coupling = np.flatnonzero(~bc_row & bc_col)
+        self._BC_slots = {'pores': np.copy(pores),
+                          'indptr': A.indptr,
+                          'indices': A.indices,
+                          'zero': np.flatnonzero(bc_row | bc_col),
+                          'diag': np.flatnonzero(bc_row & (row == col)),
+                          'coupling': coupling,
+                          'coupling_rows': row[coupling],
+                          'coupling_cols': col[coupling]}
+        return self._BC_slots
 
     def run(self, x0=None):
         r"""
@@ -554,6 +1170,113 @@ class GenericTransport(GenericAlgorithm):
             raise Exception('"quantity" has not been defined on this algorithm')
         self[quantity] = x_new
 
+    def run_batch(self, bcs=None, b=None):
+        r"""
+        Solves for several sets of boundary conditions, or several RHS
+        vectors, sharing the A matrix and its factorization between them
+
+        Parameters
+        ----------
+        bcs : dict
+            The sets of boundary conditions keyed by name.  Each set is a
+            ``dict`` containing 'pore.bc_value' and/or 'pore.bc_rate',
+            either as an Np long array with ``nan`` in pores without BCs,
+            like those stored on the algorithm, or as a scalar.  Sets with
+            value BCs in the same pores have the same A matrix so are
+            solved together.
+        b : ND-array
+            An Np by N array of RHS vectors to be solved along with the
+            boundary conditions presently applied on the algorithm.  These
+            are the raw RHS vectors, before the BCs are applied, so entries
+            in pores with BCs are replaced by the BCs.  Cannot be given with
+            ``bcs``.
+
+        Returns
+        -------
+        results : dict
+            Keyed by the name of each BC set, or the column number of each
+            RHS vector, containing a ``dict`` with the solution stored
+            under the 'quantity' specified in the ``settings`` and the net
+            rate of material leaving each pore under 'pore.rate'.
+
+        Notes
+        -----
+        The BCs applied to the algorithm are not changed, and the results
+        are not stored on the algorithm.  Only linear problems are supported
+        since the A matrix of reactive algorithms depends on the solution.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> import openpnm as op
+        >>> pn = op.network.Cubic(shape=[5, 5, 5])
+        >>> air = op.phases.GenericPhase(network=pn)
+        >>> air['throat.diffusive_conductance'] = 1.0
+        >>> fd = op.algorithms.FickianDiffusion(network=pn, phase=air)
+        >>> bcs = {}
+        >>> for c in [0.5, 1.0]:
+        ...     vals = np.ones(pn.Np)*np.nan
+        ...     vals[pn.pores('left')] = c
+        ...     vals[pn.pores('right')] = 0
+        ...     bcs[c] = {'pore.bc_value': vals}
+        >>> res = fd.run_batch(bcs=bcs)
+        >>> R = res[1.0]['pore.rate'][pn.pores('left')].sum()
+        >>> print(np.round(R, 3))
+        6.25
+
+        """
+        if self.settings['sources']:
+            raise Exception('run_batch does not support source terms')
+        if (bcs is None) == (b is None):
+            raise Exception('Must specify either bcs or b, not both')
+        self._validate_settings()
+        keys = ['pore.bc_value', 'pore.bc_rate']
+        orig = {k: self[k].copy() for k in keys}
+        X = {}
+        try:
+            if b is not None:
+                self._build_A()
+                self.b = np.zeros(self.Np, dtype=float)
+                self._apply_BCs()
+                self._validate_data_health()
+                # Applying the BCs to b is affine, so apply them to a zero
+                # vector once and combine the result with each column
+                mask = np.isfinite(self['pore.bc_value']) \
+                    | np.isfinite(self['pore.bc_rate'])
+                B = np.reshape(np.array(b, dtype=float), (self.Np, -1))
+                B = np.where(mask[:, None], self.b[:, None],
+                             B + self.b[:, None])
+                sol = self._solve_batch(A=self.A, B=B)
+                X.update({i: sol[:, i] for i in range(B.shape[1])})
+            else:
+                # Group the BC sets by pores with value BCs, which share A
+                groups = {}
+                for name, bc in bcs.items():
+                    vals = {k: np.ones(self.Np)*bc.get(k, np.nan) for k in keys}
+                    mask = np.isfinite(vals['pore.bc_value']).tobytes()
+                    groups.setdefault(mask, {})[name] = vals
+                for group in groups.values():
+                    cols = []
+                    for vals in group.values():
+                        self.update(vals)
+                        self._build_A()
+                        self._build_b()
+                        self._apply_BCs()
+                        cols.append(self.b)
+                    self._validate_data_health()
+                    sol = self._solve_batch(A=self.A, B=np.vstack(cols).T)
+                    X.update({k: sol[:, i] for i, k in enumerate(group)})
+        finally:
+            self.update(orig)
+        conns = self.network['throat.conns']
+        results = {}
+        for name, x in X.items():
+            Qt = self._get_throat_rates(x=x)
+            Qp = np.bincount(conns[:, 1], Qt, minlength=self.Np) \
+                - np.bincount(conns[:, 0], Qt, minlength=self.Np)
+            results[name] = {self.settings['quantity']: x, 'pore.rate': Qp}
+        return results
+
     def _solve(self, A=None, b=None, x0=None):
         r"""
         Sends the A and b matrices to the specified solver, and solves for *x*
@@ -585,14 +1308,18 @@ class GenericTransport(GenericAlgorithm):
         b = self.b if b is None else b
         if A is None or b is None:
             raise Exception('The A matrix or the b vector not yet built.')
-        A = A.tocsr()
+        if scipy.sparse.issparse(A):
+            A = A.tocsr()
 
         # Check if A and b are STILL well-defined
         self._validate_data_health()
 
         # Check if A is symmetric
         if self.settings['solver_type'] == 'cg':
-            is_sym = op.utils.is_symmetric(self.A)
+            if isinstance(self.A, LaplacianOperator):
+                is_sym = self.A.is_symmetric()
+            else:
+                is_sym = op.utils.is_symmetric(self.A)
             if not is_sym:
                 raise Exception('CG solver only works on symmetric matrices.')
 
@@ -611,6 +1338,46 @@ class GenericTransport(GenericAlgorithm):
 
         return x
 
+    def _solve_batch(self, A, B):
+        r"""
+        Solves ``A X = B`` for the columns of ``B``, using a single solve
+        with a shared factorization for the direct solvers, otherwise
+        solving each column in turn with the solver in the ``settings``
+        """
+        if scipy.sparse.issparse(A):
+            A = A.tocsr()
+        family = self.settings['solver_family']
+        if (family == 'scipy') and (self.settings['solver_type'] == 'spsolve'):
+            lu = self._get_factorization(A, kind='splu')
+            if lu is None:
+                X = scipy.sparse.linalg.spsolve(A=A, b=B)
+            else:
+                X = lu.solve(B)
+        elif family in ['pypardiso', 'pardiso']:
+            import pypardiso
+            with _pardiso_lock:
+                X = pypardiso.spsolve(A=A, b=B)
+        else:
+            # The convergence checks use self.A and self.b, so set them
+            # while solving each column and restore them afterwards
+            A0, b0 = self.A, self.b
+            X = []
+            try:
+                self.A = A
+                for i in range(B.shape[1]):
+                    self.b = B[:, i]
+                    X.append(self._solve())
+            finally:
+                self.A, self.b = A0, b0
+            return np.vstack(X).T
+        X = np.reshape(X, B.shape)
+        res = norm(A @ X - B, axis=0)
+        if not np.all(np.isfinite(res)):
+            raise Exception("Solution diverged, undefined residual")
+        if np.any(res > norm(B, axis=0) * self.settings['solver_tol']):
+            raise Exception("Solver did not converge.")
+        return X
+
     def _get_solver(self):
         r"""
         Fetch solver object based on solver settings stored in settings dict.
@@ -628,10 +1395,23 @@ class GenericTransport(GenericAlgorithm):
                 """
                 ls = getattr(scipy.sparse.linalg, self.settings['solver_type'])
                 if self.settings["solver_type"] == "spsolve":
-                    x = ls(A=A, b=b)
+                    lu = None
+                    if self._caching_factorizations():
+                        lu = self._get_factorization(A, kind='splu')
+                    x = ls(A=A, b=b) if lu is None else lu.solve(b)
                 else:
                     tol = self.settings["solver_tol"]
-                    x, _ = ls(A=A, b=b, atol=atol, tol=tol, maxiter=max_it, x0=x0)
+                    kwargs = {}
+                    has_M = 'M' in inspect.signature(ls).parameters
+                    if isinstance(A, LaplacianOperator) and has_M:
+                        kwargs['M'] = A.jacobi()
+                    elif self.settings['reuse_preconditioner'] and has_M:
+                        kind = self.settings['solver_preconditioner']
+                        return self._solve_preconditioned(
+                            ls, A=A, b=b, kind=kind, atol=atol, tol=tol,
+                            maxiter=max_it, x0=x0)
+                    x, _ = ls(A=A, b=b, atol=atol, tol=tol, maxiter=max_it,
+                              x0=x0, **kwargs)
                 return x
         # PETSc
         elif self.settings['solver_family'] == 'petsc':
@@ -651,8 +1431,12 @@ class GenericTransport(GenericAlgorithm):
                 r"""
                 Wrapper method for PyAMG sparse linear solvers.
                 """
-                import pyamg
-                ml = pyamg.smoothed_aggregation_solver(A)
+                if self.settings['reuse_preconditioner']:
+                    ls = scipy.sparse.linalg.bicgstab
+                    return self._solve_preconditioned(
+                        ls, A=A, b=b, kind='amg', tol=rtol, maxiter=max_it,
+                        x0=x0, atol=0)
+                ml = self._get_factorization(A, kind='pyamg')
                 x = ml.solve(b=b, x0=x0, tol=rtol, maxiter=max_it, accel="bicgstab")
                 return x
         # PyPardiso
@@ -662,7 +1446,8 @@ class GenericTransport(GenericAlgorithm):
                 Wrapper method for PyPardiso sparse linear solver.
                 """
                 import pypardiso
-                x = pypardiso.spsolve(A=A, b=b)
+                with _pardiso_lock:
+                    x = pypardiso.spsolve(A=A, b=b)
                 return x
         # CuPy
         elif self.settings['solver_family'] == 'cupy':  # pragma: no cover
@@ -699,6 +1484,60 @@ class GenericTransport(GenericAlgorithm):
 
         return solver
 
+    def _get_factorization(self, A, kind):
+        r"""
+        Returns the factorization of the given matrix, reusing the one in
+        ``factorization_cache`` if the same matrix was factorized before
+
+        Parameters
+        ----------
+        A : sparse matrix
+            The coefficient matrix in CSR format
+        kind : str
+            Either 'splu' for the SuperLU factorization used by the ``scipy``
+            direct solver, or 'pyamg' for a smoothed aggregation hierarchy
+
+        Returns
+        -------
+        The factorization object, which has a ``solve`` method, or ``None``
+        if ``A`` is singular so cannot be factorized by SuperLU.
+
+        """
+        if self._caching_factorizations():
+            cache = self.factorization_cache
+            key = cache.fingerprint(A, kind)
+            factor = cache.fetch(key)
+            if factor is not None:
+                return factor
+        if kind == 'splu':
+            try:
+                factor = scipy.sparse.linalg.splu(A.tocsc())
+            except RuntimeError:  # Let spsolve deal with singular matrices
+                return None
+            nbytes = factor.nnz * (A.data.itemsize + A.indices.itemsize)
+        elif kind == 'pyamg':
+            import pyamg
+            factor = pyamg.smoothed_aggregation_solver(A)
+            mats = [getattr(level, item) for level in factor.levels
+                    for item in ['A', 'P', 'R'] if hasattr(level, item)]
+            nbytes = sum([m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+                          for m in mats if hasattr(m, 'indptr')])
+        else:
+            raise Exception(f'Unsupported factorization: {kind}')
+        if self._caching_factorizations():
+            cache.store(key, factor, nbytes=nbytes)
+        return factor
+
+    def _caching_factorizations(self):
+        r"""
+        Returns ``True`` if factorizations are to be stored in the cache,
+        either because 'cache_factorization' is set or because the A matrix
+        is known to be the same between solves (e.g. while time stepping a
+        linear transient problem with a constant time step)
+        """
+        return bool(self.settings['cache_factorization']) \
+            or self._constant_A
+
     def _get_atol(self):
         r"""
         Fetches absolute tolerance for the solver if not ``None``, otherwise
@@ -740,7 +1579,7 @@ class GenericTransport(GenericAlgorithm):
         if x is None:
             quantity = self.settings['quantity']
             x = self[quantity]
-        return norm(self.A * x - self.b)
+        return norm(self.A @ x - self.b)
 
     def _is_converged(self, x=None):
         r"""
@@ -763,6 +1602,13 @@ class GenericTransport(GenericAlgorithm):
             raise Exception('"quantity" has not been defined on this algorithm')
         if self.settings['conductance'] is None:
             raise Exception('"conductance" has not been defined on this algorithm')
+        if self.settings['matrix_free']:
+            if self.settings['sources']:
+                raise Exception('Matrix-free mode does not support source terms')
+            if (self.settings['solver_family'] != 'scipy') \
+                    or (self.settings['solver_type'] == 'spsolve'):
+                raise Exception('Matrix-free mode requires one of the'
+                                + ' iterative scipy solvers')
 
     def _validate_geometry_health(self):
         h = self.project.check_geometry_health()
@@ -778,7 +1624,15 @@ class GenericTransport(GenericAlgorithm):
 
     def _validate_topology_health(self):
         Ps = ~np.isnan(self['pore.bc_rate']) + ~np.isnan(self['pore.bc_value'])
-        if not is_fully_connected(network=self.network, pores_BC=Ps):
+        if self.settings['matrix_free']:
+            # Avoid building the adjacency matrix, which is as large as A
+            clusters = _find_clusters_from_conns(
+                self.network['throat.conns'], self.Np)
+            connected = np.all(np.isin(clusters, clusters[Ps])) \
+                or np.all(clusters == 0)
+        else:
+            connected = is_fully_connected(network=self.network, pores_BC=Ps)
+        if not connected:
             raise Exception(
                 "Your network is clustered. Run h = net.check_network_health() followed"
                 " by op.topotools.trim(net, pores=h['trim_pores']) to make your network"
@@ -794,7 +1648,11 @@ class GenericTransport(GenericAlgorithm):
         # Validate network topology health
         self._validate_topology_health()
         # Short-circuit subsequent checks if data are healthy
-        if np.isfinite(self.A.data).all() and np.isfinite(self.b).all():
+        if isinstance(self.A, LaplacianOperator):
+            data = self.A.diagonal()
+        else:
+            data = self.A.data
+        if np.isfinite(data).all() and np.isfinite(self.b).all():
             return True
         # Validate geometry health
         self._validate_geometry_health()
@@ -897,17 +1755,8 @@ class GenericTransport(GenericAlgorithm):
             raise Exception('Must specify either pores or throats')
 
         network = self.project.network
-        phase = self.project.phases()[self.settings['phase']]
-        g = phase[self.settings['conductance']]
-        quantity = self[self.settings['quantity']]
-
         P12 = network['throat.conns']
-        X12 = quantity[P12]
-        if g.size == self.Nt:
-            g = np.tile(g, (2, 1)).T    # Make conductance a Nt by 2 matrix
-        # The next line is critical for rates to be correct
-        g = np.flip(g, axis=1)
-        Qt = np.diff(g*X12, axis=1).squeeze()
+        Qt = self._get_throat_rates(x=self[self.settings['quantity']])
 
         if throats.size:
             R = np.absolute(Qt[throats])
@@ -924,6 +1773,24 @@ class GenericTransport(GenericAlgorithm):
 
         return np.array(R, ndmin=1)
 
+    def _get_throat_rates(self, x):
+        r"""
+        Calculates the rate of material moving through each throat from
+        its first to its second pore, given the values of the quantity in
+        each pore
+        """
+        network = self.project.network
+        phase = self.project.phases()[self.settings['phase']]
+        g = phase[self.settings['conductance']]
+        P12 = network['throat.conns']
+        X12 = x[P12]
+        if g.size == self.Nt:
+            g = np.tile(g, (2, 1)).T    # Make conductance a Nt by 2 matrix
+        # The next line is critical for rates to be correct
+        g = np.flip(g, axis=1)
+        Qt = np.diff(g*X12, axis=1).squeeze()
+        return Qt
+
     def set_solver(
             self,
             solver_family=None,
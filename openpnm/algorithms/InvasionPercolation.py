@@ -3,6 +3,7 @@ import heapq as hq
 import scipy as sp
 import numpy as np
 from collections import namedtuple
+from functools import lru_cache
 from openpnm.utils import logging
 from openpnm.topotools import find_clusters
 from openpnm.algorithms import GenericAlgorithm
@@ -103,6 +104,8 @@ class InvasionPercolation(GenericAlgorithm):
             self.settings['phase'] = phase.name
         self['pore.invasion_sequence'] = -1
         self['throat.invasion_sequence'] = -1
+        self.queue = []
+        self._state = None
 
     def set_inlets(self, pores=[], overwrite=False):
         r"""
@@ -111,37 +114,44 @@ class InvasionPercolation(GenericAlgorithm):
         ----------
         pores : array_like
             The list of inlet pores from which the Phase can enter the Network
+
+        Notes
+        -----
+        Any invasion done by previous calls to ``run`` is discarded, so the
+        next call starts a new invasion from the inlets.
+
         """
         if overwrite:
             self['pore.invasion_sequence'] = -1
         self['pore.invasion_sequence'][pores] = 0
+        self._state = None
 
-
-    def run(self, n_steps=None):
+    def run(self, n_steps=None, until_saturation=None, until_pressure=None):
         r"""
-        Perform the algorithm
+        Perform the algorithm, continuing from where the last call stopped
 
         Parameters
         ----------
         n_steps : int
             The number of throats to invaded during this step
+        until_saturation : float
+            If given, the invasion stops once this fraction of the pore and
+            throat volume, excluding the inlet pores, is invaded.
+        until_pressure : float
+            If given, the invasion stops before any throat with an entry
+            pressure above this value is invaded.
 
-        """
-
-        # Setup arrays and info
-        phase = self.project[self.settings['phase']]
-        self['throat.entry_pressure'] = phase[self.settings['entry_pressure']]
-        # Indices into t_entry giving a sorted list
-        self['throat.sorted'] = np.argsort(self['throat.entry_pressure'], axis=0)
-        self['throat.order'] = 0
-        self['throat.order'][self['throat.sorted']] = np.arange(0, self.Nt)
+        Notes
+        -----
+        The heap of accessible throats, the sorted throat order and the
+        neighbor arrays are kept between calls, so the invasion can be done
+        in chunks, for instance to observe the intermediate saturations of
+        a drainage curve.  Calling ``set_inlets`` starts a new invasion.
 
-        # Perform initial analysis on input pores
-        pores = self['pore.invasion_sequence'] == 0
-        Ts = self.project.network.find_neighbor_throats(pores=pores)
-        self.queue = []
-        for T in self['throat.order'][Ts]:
-            hq.heappush(self.queue, T)
+        """
+        if self._state is None:
+            self._setup()
+        st = self._state
 
         if n_steps is None:
             n_steps = np.inf
@@ -150,27 +160,81 @@ class InvasionPercolation(GenericAlgorithm):
             logger.warn('queue is empty, this network is fully invaded')
             return
 
-        # Create incidence matrix to get neighbor throats later in _run method
-        incidence_matrix = self.network.create_incidence_matrix(fmt='csr')
-        t_inv, p_inv, p_inv_t = InvasionPercolation._run_accelerated(
+        net = self.project.network
+        vol_p = np.zeros(self.Np)
+        vol_t = np.zeros(self.Nt)
+        saturation = 0.0
+        if until_saturation is None:
+            until_saturation = np.inf
+        else:
+            vol_p = net[self.settings['pore_volume']]
+            vol_t = net[self.settings['throat_volume']]
+            vol_tot = vol_p.sum() + vol_t.sum()
+            vol_p, vol_t = vol_p/vol_tot, vol_t/vol_tot
+            # Start from the saturation reached by previous calls
+            t_inv = self['throat.invasion_sequence'] >= 0
+            p_inv = self['pore.invasion_sequence'] >= 0
+            p_inv[st['inlets']] = False
+            saturation = vol_p[p_inv].sum() + vol_t[t_inv].sum()
+        if until_pressure is None:
+            until_pressure = np.inf
+
+        st['count'], _ = _get_invasion_kernel()(
             queue=self.queue,
             t_sorted=self['throat.sorted'],
             t_order=self['throat.order'],
             t_inv=self['throat.invasion_sequence'],
             p_inv=self['pore.invasion_sequence'],
-            p_inv_t=np.zeros_like(self['pore.invasion_sequence']),
-            conns=self.project.network['throat.conns'],
-            idx=incidence_matrix.indices,
-            indptr=incidence_matrix.indptr,
-            n_steps=n_steps
+            p_inv_t=st['p_inv_t'],
+            conns=net['throat.conns'],
+            idx=st['indices'],
+            indptr=st['indptr'],
+            entry=self['throat.entry_pressure'],
+            vol_p=vol_p,
+            vol_t=vol_t,
+            count=st['count'],
+            saturation=saturation,
+            n_steps=n_steps,
+            until_saturation=until_saturation,
+            until_pressure=until_pressure,
         )
 
-        self['throat.invasion_sequence'] = t_inv
-        self['pore.invasion_sequence'] = p_inv
         self['throat.invasion_pressure'] = self['throat.entry_pressure']
-        self['pore.invasion_pressure'] = self['throat.entry_pressure'][p_inv_t]
+        self['pore.invasion_pressure'] = \
+            self['throat.entry_pressure'][st['p_inv_t']]
         self['pore.invasion_pressure'][self['pore.invasion_sequence']==0] = 0.0
 
+    def _setup(self):
+        r"""
+        Sorts the throats, seeds the heap with the throats of the inlet pores
+        and finds the neighbor arrays, to start a new invasion
+        """
+        phase = self.project[self.settings['phase']]
+        self['throat.entry_pressure'] = phase[self.settings['entry_pressure']]
+        # Indices into t_entry giving a sorted list
+        self['throat.sorted'] = np.argsort(self['throat.entry_pressure'], axis=0)
+        self['throat.order'] = 0
+        self['throat.order'][self['throat.sorted']] = np.arange(0, self.Nt)
+
+        # Discard any previous invasion
+        inlets = self['pore.invasion_sequence'] == 0
+        self['pore.invasion_sequence'][~inlets] = -1
+        self['throat.invasion_sequence'] = -1
+
+        # Perform initial analysis on input pores
+        Ts = self.project.network.find_neighbor_throats(pores=inlets)
+        self.queue = []
+        for T in self['throat.order'][Ts]:
+            hq.heappush(self.queue, T)
+
+        # Create incidence matrix to get neighbor throats later in the kernel
+        im = self.network.create_incidence_matrix(fmt='csr')
+        self._state = {'inlets': inlets,
+                       'indices': im.indices,
+                       'indptr': im.indptr,
+                       'p_inv_t': np.zeros(self.Np, dtype=int),
+                       'count': 0}
+
     def results(self, Snwp=None):
         r"""
         Returns the phase configuration at the specified non-wetting phase
@@ -250,9 +314,9 @@ class InvasionPercolation(GenericAlgorithm):
         neighbor connected to a sink is touched the trapped cluster stops
         growing as this is the point of trapping in forward invasion time.
 
-        Logger info displays the invasion sequence and pore index and a message
-        with condition number based on the modified trapping rules and the
-        assignment of the pore to a given cluster.
+        The number of pores assigned under each of the modified trapping
+        rules (C:1 new cluster, C:2 joins a cluster, C:3 and C:4 joins the
+        sink cluster, C:5 merges clusters) is reported in the logger info.
 
         Initially all invaded pores are given cluster label -1
         Outlets / Sinks are given -2
@@ -282,77 +346,36 @@ class InvasionPercolation(GenericAlgorithm):
         invaded_ps = self['pore.invasion_sequence'] > -1
         if ~np.all(invaded_ps):
             # Put defending phase into clusters
-            clusters = find_clusters(network=net, mask=~invaded_ps)
+            clusters = find_clusters(network=net, mask=~invaded_ps)[0]
             # Identify clusters that are connected to an outlet and set to -2
             # -1 is the invaded fluid
             # -2 is the defender fluid able to escape
             # All others now trapped clusters which grow as invasion is reversed
             out_clusters = np.unique(clusters[outlets])
-            for c in out_clusters:
-                if c >= 0:
-                    clusters[clusters == c] = -2
+            out_clusters = out_clusters[out_clusters >= 0]
+            clusters[np.isin(clusters, out_clusters)] = -2
         else:
             # Go from end
             clusters = np.ones(net.Np, dtype=int)*-1
             clusters[outlets] = -2
 
-        # Turn into a list for indexing
+        # Reverse sort the invasion sequence, skipping inlets and outlets
         inv_seq = np.vstack((self['pore.invasion_sequence'].astype(int),
                              np.arange(0, net.Np, dtype=int))).T
-        # Reverse sort list
         inv_seq = inv_seq[inv_seq[:, 0].argsort()][::-1]
-        next_cluster_num = np.max(clusters)+1
-        # For all the steps after the inlets are set up to break-through
-        # Reverse the sequence and assess the neighbors cluster state
-        stopped_clusters = np.zeros(net.Np, dtype=bool)
-        all_neighbors = net.find_neighbor_pores(net.pores(), flatten=False,
-                                                include_input=True)
-        for un_seq, pore in inv_seq:
-            if pore not in outlets and un_seq > 0:  # Skip inlets and outlets
-                nc = clusters[all_neighbors[pore]]  # Neighboring clusters
-                unique_ns = np.unique(nc[nc != -1])  # Unique Neighbors
-                seq_pore = "S:"+str(un_seq)+" P:"+str(pore)
-                if np.all(nc == -1):
-                    # This is the start of a new trapped cluster
-                    clusters[pore] = next_cluster_num
-                    next_cluster_num += 1
-                    msg = (seq_pore+" C:1 new cluster number: "
-                           + str(clusters[pore]))
-                    logger.info(msg)
-                elif len(unique_ns) == 1:
-                    # Grow the only connected neighboring cluster
-                    if not stopped_clusters[unique_ns[0]]:
-                        clusters[pore] = unique_ns[0]
-                        msg = (seq_pore+" C:2 joins cluster number: "
-                               + str(clusters[pore]))
-                        logger.info(msg)
-                    else:
-                        clusters[pore] = -2
-                elif -2 in unique_ns:
-                    # We have reached a sink neighbor, stop growing cluster
-                    msg = (seq_pore+" C:3 joins sink cluster")
-                    logger.info(msg)
-                    clusters[pore] = -2
-                    # Stop growth and merging
-                    stopped_clusters[unique_ns[unique_ns > -1]] = True
-                else:
-                    # We might be able to do some merging
-                    # Check if any stopped clusters are neighbors
-                    if np.any(stopped_clusters[unique_ns]):
-                        msg = (seq_pore+" C:4 joins sink cluster")
-                        logger.info(msg)
-                        clusters[pore] = -2
-                        # Stop growing all neighboring clusters
-                        stopped_clusters[unique_ns] = True
-                    else:
-                        # Merge multiple un-stopped trapped clusters
-                        new_num = unique_ns[0]
-                        clusters[pore] = new_num
-                        for c in unique_ns:
-                            clusters[clusters == c] = new_num
-                            msg = (seq_pore + " C:5 merge clusters: "
-                                   + str(c) + " into "+str(new_num))
-                            logger.info(msg)
+        is_outlet = np.zeros(net.Np, dtype=bool)
+        is_outlet[outlets] = True
+        keep = (inv_seq[:, 0] > 0) & ~is_outlet[inv_seq[:, 1]]
+        order = inv_seq[keep, 1]
+        # Assess the neighbors cluster state of each pore in turn
+        am = net.create_adjacency_matrix(fmt='csr')
+        clusters, counts = _get_trapping_kernel()(
+            clusters.astype(np.int64), order.astype(np.int64),
+            am.indices.astype(np.int64), am.indptr.astype(np.int64),
+            int(np.max(clusters)) + 1)
+        logger.info('Pores by trapping rule: '
+                    + ', '.join(['C:' + str(i+1) + ' ' + str(n)
+                                 for i, n in enumerate(counts)]))
 
         # And now return clusters
         self['pore.clusters'] = clusters
@@ -420,61 +443,168 @@ class InvasionPercolation(GenericAlgorithm):
         plt.xlabel('capillary pressure')
         plt.grid(True)
 
-    def _run_accelerated(queue, t_sorted, t_order, t_inv, p_inv, p_inv_t,
-                         conns, idx, indptr, n_steps):
-        r"""
-        Numba-jitted run method for InvasionPercolation class.
 
-        Notes
-        -----
-        (1) ``idx`` and ``indptr`` are properties are the network's incidence
-        matrix, and are used to quickly find neighbor throats.
+@lru_cache(maxsize=None)
+def _get_invasion_kernel():
+    r"""
+    Compiles the kernel of ``InvasionPercolation.run`` on first use, so
+    numba is only imported when needed
 
-        (2) Numba doesn't like forein data types (i.e. GenericNetwork), and so
-        ``find_neighbor_throats`` method cannot be called in a jitted method.
+    Notes
+    -----
+    The kernel invades throats from the ``queue`` heap, updating the
+    invasion sequences in place, until the heap is empty or one of the
+    stopping criteria is met.  It returns the next sequence number and the
+    saturation reached, to be passed in again to continue the invasion.
 
-        (3) Nested wrapper is for performance issues (reduced OpenPNM import)
-        time due to local numba import
+    ``idx`` and ``indptr`` are properties of the network's incidence matrix,
+    and are used to quickly find neighbor throats, since numba doesn't like
+    foreign data types (i.e. GenericNetwork).
 
-        """
-        from numba import njit
-        try:
-            from numba.core.errors import NumbaPendingDeprecationWarning
-        except ModuleNotFoundError:
-            from numba.errors import NumbaPendingDeprecationWarning
-        warnings.simplefilter('ignore', category=NumbaPendingDeprecationWarning)
-
-        @njit
-        def wrapper(queue, t_sorted, t_order, t_inv, p_inv, p_inv_t, conns,
-                    idx, indptr, n_steps):
-            count = 0
-            while (len(queue) > 0) and (count < n_steps):
-                # Find throat at the top of the queue
+    """
+    from numba import njit
+    try:
+        from numba.core.errors import NumbaPendingDeprecationWarning
+    except ModuleNotFoundError:
+        from numba.errors import NumbaPendingDeprecationWarning
+    warnings.simplefilter('ignore', category=NumbaPendingDeprecationWarning)
+
+    @njit
+    def kernel(queue, t_sorted, t_order, t_inv, p_inv, p_inv_t, conns, idx,
+               indptr, entry, vol_p, vol_t, count, saturation, n_steps,
+               until_saturation, until_pressure):
+        steps = 0
+        while (len(queue) > 0) and (steps < n_steps):
+            if saturation >= until_saturation:
+                break
+            if entry[t_sorted[queue[0]]] > until_pressure:
+                break
+            # Find throat at the top of the queue
+            t = hq.heappop(queue)
+            # Extract actual throat number
+            t_next = t_sorted[t]
+            t_inv[t_next] = count
+            saturation += vol_t[t_next]
+            # If throat is duplicated
+            while len(queue) > 0 and queue[0] == t:
                 t = hq.heappop(queue)
-                # Extract actual throat number
-                t_next = t_sorted[t]
-                t_inv[t_next] = count
-                # If throat is duplicated
-                while len(queue) > 0 and queue[0] == t:
-                    # Note: Preventing duplicate entries below might save some time
-                    t = hq.heappop(queue)
-                # Find pores connected to newly invaded throat
-                Ps = conns[t_next]
-                # Remove already invaded pores from Ps
-                Ps = Ps[p_inv[Ps] < 0]
-                if len(Ps) > 0:
-                    p_inv[Ps] = count
-                    p_inv_t[Ps] = t_next
-                    for i in Ps:
-                        Ts = idx[indptr[i]:indptr[i+1]]
-                        Ts = Ts[t_inv[Ts] < 0]
-                    for i in set(Ts):   # set(Ts) to exclude repeated neighbor throats
-                        hq.heappush(queue, t_order[i])
-                count += 1
-            return t_inv, p_inv, p_inv_t
-
-        return wrapper(queue, t_sorted, t_order, t_inv, p_inv, p_inv_t, conns,
-                       idx, indptr, n_steps)
+            # Find pores connected to newly invaded throat
+            Ps = conns[t_next]
+            # Remove already invaded pores from Ps
+            Ps = Ps[p_inv[Ps] < 0]
+            for i in Ps:
+                p_inv[i] = count
+                p_inv_t[i] = t_next
+                saturation += vol_p[i]
+                Ts = idx[indptr[i]:indptr[i+1]]
+                Ts = Ts[t_inv[Ts] < 0]
+                for j in set(Ts):  # Exclude repeated neighbor throats
+                    hq.heappush(queue, t_order[j])
+            count += 1
+            steps += 1
+        return count, saturation
+
+    return kernel
+
+
+@lru_cache(maxsize=None)
+def _get_trapping_kernel():
+    r"""
+    Compiles the kernel of ``InvasionPercolation.apply_trapping`` on first
+    use, so numba is only imported when needed
+
+    Notes
+    -----
+    The kernel takes the initial pore clusters (-1 for invaded pores, -2 for
+    defender connected to the outlets), the pores to visit in reverse
+    invasion order, the CSR neighbor arrays and the next free cluster
+    number.  It returns the final clusters and the number of pores assigned
+    under each trapping rule.  Trapped clusters are kept in a union-find
+    forest, each root holding the lowest cluster number in its tree, so
+    merging clusters does not require relabelling pores.
+
+    """
+    from numba import njit
+
+    @njit
+    def find(parent, i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:  # Path compression
+            parent[i], i = root, parent[i]
+        return root
+
+    @njit
+    def kernel(clusters, order, indices, indptr, next_num):
+        Nc = next_num + order.size
+        parent = np.arange(Nc)
+        size = np.ones(Nc, dtype=np.int64)
+        label = np.arange(Nc)
+        stopped = np.zeros(Nc, dtype=np.bool_)
+        counts = np.zeros(5, dtype=np.int64)
+        roots = np.zeros(np.amax(np.diff(indptr)) + 1, dtype=np.int64)
+        for pore in order:
+            # Find the distinct neighboring clusters
+            n = 0
+            sink = False
+            for j in indices[indptr[pore]:indptr[pore+1]]:
+                c = clusters[j]
+                if c == -2:
+                    sink = True
+                elif c >= 0:
+                    r = find(parent, c)
+                    new = True
+                    for k in range(n):
+                        if roots[k] == r:
+                            new = False
+                    if new:
+                        roots[n] = r
+                        n += 1
+            if (n == 0) and not sink:
+                # This is the start of a new trapped cluster
+                clusters[pore] = next_num
+                next_num += 1
+                counts[0] += 1
+            elif (n == 1) and not sink:
+                # Grow the only connected neighboring cluster
+                if not stopped[roots[0]]:
+                    clusters[pore] = roots[0]
+                    counts[1] += 1
+                else:
+                    clusters[pore] = -2
+            elif sink and (n == 0):
+                clusters[pore] = -2
+            elif sink:
+                # We have reached a sink neighbor, stop growing clusters
+                clusters[pore] = -2
+                stopped[roots[:n]] = True
+                counts[2] += 1
+            elif np.any(stopped[roots[:n]]):
+                # Stop growing all neighboring clusters
+                clusters[pore] = -2
+                stopped[roots[:n]] = True
+                counts[3] += 1
+            else:
+                # Merge multiple un-stopped trapped clusters
+                r = roots[0]
+                for k in range(1, n):
+                    a, b = r, roots[k]
+                    if size[a] < size[b]:
+                        a, b = b, a
+                    parent[b] = a
+                    size[a] += size[b]
+                    label[a] = min(label[a], label[b])
+                    r = a
+                clusters[pore] = r
+                counts[4] += 1
+        # Convert the roots to the lowest cluster number in each tree
+        for i in range(clusters.size):
+            if clusters[i] >= 0:
+                clusters[i] = label[find(parent, clusters[i])]
+        return clusters, counts
+
+    return kernel
 
 
 if __name__ == '__main__':
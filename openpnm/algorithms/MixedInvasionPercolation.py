@@ -8,6 +8,7 @@ import logging
 import heapq as hq
 import numpy as np
 from collections import namedtuple
+from functools import lru_cache
 from openpnm.algorithms import GenericAlgorithm
 from openpnm.topotools import find_clusters, site_percolation
 
@@ -185,7 +186,6 @@ class MixedInvasionPercolation(GenericAlgorithm):
         else:
             logger.error("Either 'inlets' or 'clusters' must be passed to" + " setup method")
         self.queue = []
-        check_coop = self.settings["cooperative_pore_filling"] and hasattr(self, "tt_Pc")
         for i, cluster in enumerate(clusters):
             self.queue.append([])
             # Perform initial analysis on input pores
@@ -195,14 +195,32 @@ class MixedInvasionPercolation(GenericAlgorithm):
             if np.size(cluster) > 1:
                 for elem_id in cluster:
                     self._add_ts2q(elem_id, self.queue[i])
-                    if check_coop:
-                        self._check_coop(elem_id, self.queue[i])
             elif np.size(cluster) == 1:
                 self._add_ts2q(cluster, self.queue[i])
-                if check_coop:
-                    self._check_coop(cluster, self.queue[i])
             else:
                 logger.warning("Some inlet clusters have no pores")
+        tt_indices, tt_indptr, tt_data = self._get_coop_pairs()
+        if tt_indices.size > 0:
+            # Add the pores the inlet pores can fill cooperatively, as done
+            # by the kernel of ``run`` after each pore is invaded
+            net = self.project.network
+            conns = net["throat.conns"].astype(np.int64)
+            im = net.create_incidence_matrix(fmt="csr")
+            seq = np.concatenate(
+                (self["pore.invasion_sequence"],
+                 self["throat.invasion_sequence"])
+            ).astype(np.int64)
+            heap_p = np.zeros(tt_indices.size)
+            heap_e = np.zeros(tt_indices.size, dtype=np.int64)
+            for i, cluster in enumerate(clusters):
+                for P in np.ravel(cluster):
+                    n = _get_coop_kernel()(
+                        P, self.Np, seq, conns, im.indices.astype(np.int64),
+                        im.indptr.astype(np.int64), tt_indices, tt_indptr,
+                        tt_data, heap_p, heap_e, 0)
+                    for k in range(n):
+                        hq.heappush(self.queue[i],
+                                    [heap_p[k], heap_e[k], "pore"])
         if self.settings["snap_off"]:
             self._apply_snap_off()
 
@@ -267,27 +285,27 @@ class MixedInvasionPercolation(GenericAlgorithm):
                 data.append(elem_type)
                 hq.heappush(queue, data)
 
-    def _add_ps2q(self, throat, queue):
-        """
-        Helper method to add pores to the cluster queue
+    def _get_coop_pairs(self):
+        r"""
+        Returns the CSR arrays (indices, indptr, data) of the pairs of
+        throats able to cooperatively fill their common pore, and the
+        pressure at which they do so, or empty arrays if cooperative pore
+        filling is not used
         """
-        net = self.project.network
-        elem_type = "pore"
-        # Find pores connected to newly invaded throat
-        Ps = net["throat.conns"][throat]
-        # Remove already invaded pores from Ps
-        Ps = Ps[self["pore.invasion_sequence"][Ps] <= 0]
-        if len(Ps) > 0:
-            self._interface_Ps[Ps] = True
-            for P in Ps:
-                data = []
-                # Pc
-                data.append(self["pore.entry_pressure"][P])
-                # Element Index
-                data.append(P)
-                # Element Type (Pore of Throat)
-                data.append(elem_type)
-                hq.heappush(queue, data)
+        Nt = self.Nt
+        if self.settings["cooperative_pore_filling"] and hasattr(self, "tt_Pc"):
+            tt_Pc = self.tt_Pc.tocsr()
+            keep = ~np.isnan(tt_Pc.data)
+            rows = np.repeat(np.arange(Nt), np.diff(tt_Pc.indptr))[keep]
+            tt_indices = tt_Pc.indices[keep].astype(np.int64)
+            tt_data = tt_Pc.data[keep]
+            tt_indptr = np.zeros(Nt + 1, dtype=np.int64)
+            tt_indptr[1:] = np.cumsum(np.bincount(rows, minlength=Nt))
+        else:
+            tt_indices = np.zeros(0, dtype=np.int64)
+            tt_data = np.zeros(0)
+            tt_indptr = np.zeros(Nt + 1, dtype=np.int64)
+        return tt_indices, tt_indptr, tt_data
 
     def run(self, max_pressure=None):
         r"""
@@ -299,6 +317,13 @@ class MixedInvasionPercolation(GenericAlgorithm):
             The maximum pressure applied to the invading cluster. Any pores and
             throats with entry pressure above this value will not be invaded.
 
+        Notes
+        -----
+        Pores and throats share a single element index (throats are offset by
+        ``Np``), and the cluster queues are copied into array based heaps
+        which are invaded by a compiled kernel.  Any elements left in the
+        heaps are put back into the cluster queues when the invasion stops.
+
         """
         if "throat.entry_pressure" not in self.keys():
             logger.error("Setup method must be run first")
@@ -310,118 +335,101 @@ class MixedInvasionPercolation(GenericAlgorithm):
         if len(self.queue) == 0:
             logger.warn("queue is empty, this network is fully invaded")
             return
+        net = self.project.network
+        Np, Nt, Nc = self.Np, self.Nt, len(self.queue)
         # track whether each cluster has reached the maximum pressure
-        self.max_p_reached = [False] * len(self.queue)
-        # starting invasion sequence
-        self.count = 0
+        max_p_reached = np.zeros(Nc, dtype=bool)
         # highest pressure reached so far - used for porosimetry curve
-        self.high_Pc = np.ones(len(self.queue)) * -np.inf
+        self.high_Pc = np.ones(Nc) * -np.inf
         outlets = self["pore.outlets"]
         terminate_clusters = np.sum(outlets) > 0
         if not hasattr(self, "invasion_running"):
-            self.invasion_running = [True] * len(self.queue)
+            self.invasion_running = [True] * Nc
         else:
             # created by set_residual
             pass
-        while np.any(self.invasion_running) and not np.all(self.max_p_reached):
-            # Loop over clusters
-            for c_num in np.argwhere(self.invasion_running).flatten():
-                self._invade_cluster(c_num)
-                queue = self.queue[c_num]
-                if len(queue) == 0 or self.max_p_reached[c_num]:
-                    # If the cluster contains no more entries invasion has
-                    # finished
-                    self.invasion_running[c_num] = False
-            if self.settings["invade_isolated_Ts"]:
-                self._invade_isolated_Ts()
-            if terminate_clusters:
-                # terminated clusters
-                tcs = np.unique(self["pore.cluster"][outlets]).astype(int)
-                tcs = tcs[tcs >= 0]
-                if len(tcs) > 0:
-                    for tc in tcs:
-                        if self.invasion_running[tc] is True:
-                            self.invasion_running[tc] = False
-                            logger.info(
-                                "Cluster "
-                                + str(tc)
-                                + " reached "
-                                + " outlet at sequence "
-                                + str(self.count)
-                            )
-
-    def _invade_cluster(self, c_num):
-        queue = self.queue[c_num]
-        pressure, elem_id, elem_type = hq.heappop(queue)
-        if elem_type == "pore":
-            self._interface_Ps[elem_id] = False
-        else:
-            self._interface_Ts[elem_id] = False
-        if pressure > self.max_pressure:
-            self.max_p_reached[c_num] = True
-        else:
-            elem_cluster = self[elem_type + ".cluster"][elem_id]
-            elem_cluster = elem_cluster.astype(int)
-            # Cluster is the uninvaded cluster
-            if elem_cluster == -1:
-                self.count += 1
-                # Record highest Pc cluster has reached
-                if self.high_Pc[c_num] < pressure:
-                    self.high_Pc[c_num] = pressure
-                # The newly invaded element is available for
-                # invasion
-                self[elem_type + ".invasion_sequence"][elem_id] = self.count
-                self[elem_type + ".cluster"][elem_id] = c_num
-                self[elem_type + ".invasion_pressure"][elem_id] = self.high_Pc[c_num]
-                if elem_type == "throat":
-                    self._add_ps2q(elem_id, queue)
-                elif elem_type == "pore":
-                    self._add_ts2q(elem_id, queue)
-                    if self.settings["cooperative_pore_filling"] and hasattr(
-                        self, "tt_Pc"
-                    ):
-                        self._check_coop(elem_id, queue)
-            # Element is part of existing cluster that is still invading
-            elif elem_cluster != c_num and self.invasion_running[elem_cluster]:
-                # The newly invaded element is part of an invading
-                # cluster. Merge the clusters using the existing
-                # cluster number)
-                self._merge_cluster(c2keep=c_num, c2empty=elem_cluster)
-                logger.info(
-                    "Merging cluster "
-                    + str(elem_cluster)
-                    + " into cluster "
-                    + str(c_num)
-                    + " at sequence "
-                    + str(self.count)
-                )
-            # Element is part of residual cluster - now invasion can start
-            elif elem_cluster != c_num and len(self.queue[elem_cluster]) > 0:
-                # The newly invaded element is part of an invading
-                # cluster. Merge the clusters using the existing
-                # cluster number)
-                self._merge_cluster(c2keep=c_num, c2empty=elem_cluster)
-                logger.info(
-                    "Merging residual cluster "
-                    + str(elem_cluster)
-                    + " into cluster "
-                    + str(c_num)
-                    + " at sequence "
-                    + str(self.count)
-                )
+        running = np.array(self.invasion_running, dtype=bool)
+        conns = net["throat.conns"].astype(np.int64)
+        im = net.create_incidence_matrix(fmt="csr")
+        tcp = self["throat.entry_pressure"].astype(float)
+        if not self._bidirectional:
+            tcp = np.column_stack((tcp, tcp))
+        tt_indices, tt_indptr, tt_data = self._get_coop_pairs()
+        # Every pore and throat is invaded at most once, which bounds the
+        # number of elements that can be added to the heaps
+        n_init = sum([len(queue) for queue in self.queue])
+        size = n_init + 4 * Nt + 2 * tt_indices.size
+        heap_p = np.zeros(size)
+        heap_e = np.zeros(size, dtype=np.int64)
+        owner = -np.ones(size, dtype=np.int64)
+        i = 0
+        for c_num, queue in enumerate(self.queue):
+            for pressure, elem_id, elem_type in queue:
+                heap_p[i] = pressure
+                heap_e[i] = np.ravel(elem_id)[0] + (elem_type == "throat") * Np
+                owner[i] = c_num
+                i += 1
+        seq = np.concatenate(
+            (self["pore.invasion_sequence"], self["throat.invasion_sequence"])
+        ).astype(np.int64)
+        cluster = np.concatenate(
+            (self["pore.cluster"], self["throat.cluster"])
+        ).astype(np.int64)
+        inv_Pc = np.concatenate(
+            (self["pore.invasion_pressure"], self["throat.invasion_pressure"])
+        ).astype(float)
+        interface = np.concatenate((self._interface_Ps, self._interface_Ts))
+        self.count, merged, merge_seq, from_residual, stop_seq = (
+            _get_invasion_kernel()(
+                heap_p, heap_e, owner, n_init, Np, conns,
+                im.indices.astype(np.int64), im.indptr.astype(np.int64),
+                tt_indices, tt_indptr, tt_data,
+                self["pore.entry_pressure"].astype(float), tcp,
+                seq, cluster, inv_Pc, interface, running, max_p_reached,
+                self.high_Pc, float(self.max_pressure), outlets,
+                bool(self.settings["invade_isolated_Ts"]),
+                bool(terminate_clusters),
+            )
+        )
+        self["pore.invasion_sequence"] = seq[:Np]
+        self["throat.invasion_sequence"] = seq[Np:]
+        self["pore.cluster"] = cluster[:Np]
+        self["throat.cluster"] = cluster[Np:]
+        self["pore.invasion_pressure"] = inv_Pc[:Np]
+        self["throat.invasion_pressure"] = inv_Pc[Np:]
+        self._interface_Ps = interface[:Np]
+        self._interface_Ts = interface[Np:]
+        self.invasion_running = running.tolist()
+        self.max_p_reached = max_p_reached.tolist()
+        # Put the uninvaded elements back into the cluster queues
+        self.queue = [[] for _ in range(Nc)]
+        for i in np.where(owner > -1)[0]:
+            if heap_e[i] < Np:
+                data = [heap_p[i], heap_e[i], "pore"]
             else:
-                pass
-
-    def _merge_cluster(self, c2keep, c2empty):
-        r"""
-        Little helper function to merger clusters but only add the uninvaded
-        elements
-        """
-        while len(self.queue[c2empty]) > 0:
-            temp = [_pc, _id, _type] = hq.heappop(self.queue[c2empty])
-            if self[_type + ".invasion_sequence"][_id] == -1:
-                hq.heappush(self.queue[c2keep], temp)
-        self.invasion_running[c2empty] = False
+                data = [heap_p[i], heap_e[i] - Np, "throat"]
+            self.queue[owner[i]].append(data)
+        for queue in self.queue:
+            hq.heapify(queue)
+        for c_num in np.where(merged > -1)[0]:
+            logger.info(
+                "Merging "
+                + ("residual " if from_residual[c_num] else "")
+                + "cluster "
+                + str(c_num)
+                + " into cluster "
+                + str(merged[c_num])
+                + " at sequence "
+                + str(merge_seq[c_num])
+            )
+        for c_num in np.where(stop_seq > -1)[0]:
+            logger.info(
+                "Cluster "
+                + str(c_num)
+                + " reached "
+                + " outlet at sequence "
+                + str(stop_seq[c_num])
+            )
 
     def results(self, Pc):
         r"""
@@ -853,32 +861,274 @@ class MixedInvasionPercolation(GenericAlgorithm):
             if c_num > initial_num:
                 self.invasion_running[c_num] = False
 
-    def _invade_isolated_Ts(self):
-        r"""
-        Throats that are uninvaded connected to pores that are both invaded
-        should be invaded too.
-        """
-        net = self.project.network
-        Ts = net["throat.conns"].copy()
-        invaded_Ps = self["pore.invasion_sequence"] > -1
-        uninvaded_Ts = self["throat.invasion_sequence"] == -1
-        isolated_Ts = np.logical_and(invaded_Ps[Ts[:, 0]], invaded_Ps[Ts[:, 1]])
-        isolated_Ts = np.logical_and(isolated_Ts, uninvaded_Ts)
-        inv_Pc = self["pore.invasion_pressure"]
-        inv_seq = self["pore.invasion_sequence"]
-        if np.any(isolated_Ts):
-            max_array = Ts[:, 0]
-            second_higher = inv_seq[Ts][:, 1] > inv_seq[Ts][:, 0]
-            max_array[second_higher] = Ts[:, 1][second_higher]
-            mPc = inv_Pc[max_array]
-            mSeq = inv_seq[max_array]
-            mClu = self["pore.cluster"][max_array]
-            self["throat.invasion_pressure"][isolated_Ts] = mPc[isolated_Ts]
-            self["throat.invasion_sequence"][isolated_Ts] = mSeq[isolated_Ts]
-            self["throat.cluster"][isolated_Ts] = mClu[isolated_Ts]
-
-    def _check_coop(self):
-        r"""
-        Not implemented in this class
-        """
-        pass
+
+@lru_cache(maxsize=None)
+def _get_invasion_kernel():
+    r"""
+    Compiles the kernel of ``MixedInvasionPercolation.run`` on first use, so
+    numba is only imported when needed
+
+    Notes
+    -----
+    Each cluster queue is a leftist heap whose nodes are stored in flat
+    arrays: ``heap_p`` and ``heap_e`` hold the pressure and element of each
+    node, and ``owner`` the cluster it is queued in (-1 once removed).  The
+    first ``n_init`` nodes are the initial queues.  Ties in pressure are
+    broken on the pore or throat index then on the element type, which
+    reproduces the ordering of the ``[pressure, index, type]`` lists.
+
+    ``seq``, ``cluster``, ``inv_Pc`` and ``interface`` are indexed by element
+    (pores then throats) and updated in place, as are ``running``,
+    ``max_p_reached`` and ``high_Pc``.  The kernel returns the last invasion
+    sequence, the cluster each cluster was merged into, the sequence and
+    whether it was a residual cluster at that point, and the sequence at
+    which each cluster was stopped by reaching an outlet.
+
+    The pores that can be filled cooperatively once a pore is invaded are
+    found by the kernel of ``_get_coop_kernel``, which ``set_inlets`` also
+    uses for the inlet pores.
+
+    """
+    from numba import njit
+    coop = _get_coop_kernel()
+
+    @njit
+    def less(i, j, heap_p, heap_e, Np):
+        if heap_p[i] != heap_p[j]:
+            return heap_p[i] < heap_p[j]
+        ei, ej = heap_e[i], heap_e[j]
+        ti, tj = ei >= Np, ej >= Np
+        if ti:
+            ei -= Np
+        if tj:
+            ej -= Np
+        if ei != ej:
+            return ei < ej
+        return tj and not ti
+
+    @njit
+    def meld(a, b, heap_p, heap_e, left, right, rank, Np, path):
+        # Merge the right spines, then restore the leftist property upwards
+        n = 0
+        while (a > -1) and (b > -1):
+            if less(b, a, heap_p, heap_e, Np):
+                a, b = b, a
+            path[n] = a
+            n += 1
+            a = right[a]
+        if a < 0:
+            a = b
+        for k in range(n - 1, -1, -1):
+            node = path[k]
+            right[node] = a
+            rank_l = rank[left[node]] if left[node] > -1 else 0
+            rank_r = rank[a] if a > -1 else 0
+            if rank_l < rank_r:
+                right[node] = left[node]
+                left[node] = a
+                rank_r = rank_l
+            rank[node] = rank_r + 1
+            a = node
+        return a
+
+    @njit
+    def kernel(heap_p, heap_e, owner, n_init, Np, conns, t_idx, t_ptr,
+               tt_idx, tt_ptr, tt_Pc, p_entry, t_entry, seq, cluster, inv_Pc,
+               interface, running, max_p_reached, high_Pc, max_pressure,
+               outlets, invade_isolated_Ts, terminate_clusters):
+        Nc = running.size
+        Nt = conns.shape[0]
+        left = -np.ones(heap_p.size, dtype=np.int64)
+        right = -np.ones(heap_p.size, dtype=np.int64)
+        rank = np.ones(heap_p.size, dtype=np.int64)
+        roots = -np.ones(Nc, dtype=np.int64)
+        sizes = np.zeros(Nc, dtype=np.int64)
+        path = np.zeros(128, dtype=np.int64)
+        for i in range(n_init):
+            c = owner[i]
+            roots[c] = meld(roots[c], i, heap_p, heap_e, left, right, rank,
+                            Np, path)
+            sizes[c] += 1
+        n_nodes = n_init
+        merged = -np.ones(Nc, dtype=np.int64)
+        merge_seq = -np.ones(Nc, dtype=np.int64)
+        from_residual = np.zeros(Nc, dtype=np.bool_)
+        stop_seq = -np.ones(Nc, dtype=np.int64)
+        new_Ps = np.zeros(Nc, dtype=np.int64)
+        count = 0
+        first = True
+        while np.any(running) and not np.all(max_p_reached):
+            n_new = 0
+            # Loop over clusters, each invading one element in turn
+            for c in np.where(running)[0]:
+                if not running[c]:
+                    # Merged into another cluster earlier in this round
+                    continue
+                if sizes[c] == 0:
+                    running[c] = False
+                    continue
+                node = roots[c]
+                roots[c] = meld(left[node], right[node], heap_p, heap_e, left,
+                                right, rank, Np, path)
+                sizes[c] -= 1
+                owner[node] = -1
+                e = heap_e[node]
+                pressure = heap_p[node]
+                interface[e] = False
+                n_push = 0
+                if pressure > max_pressure:
+                    max_p_reached[c] = True
+                elif cluster[e] == -1:
+                    count += 1
+                    # Record highest Pc cluster has reached
+                    if high_Pc[c] < pressure:
+                        high_Pc[c] = pressure
+                    seq[e] = count
+                    cluster[e] = c
+                    inv_Pc[e] = high_Pc[c]
+                    if e >= Np:
+                        # Add the neighboring pores to the queue
+                        for P in conns[e - Np]:
+                            if seq[P] <= 0:
+                                interface[P] = True
+                                heap_p[n_nodes + n_push] = p_entry[P]
+                                heap_e[n_nodes + n_push] = P
+                                n_push += 1
+                    else:
+                        new_Ps[n_new] = e
+                        n_new += 1
+                        # Add the neighboring throats to the queue, using
+                        # the entry pressure towards the other pore
+                        for T in t_idx[t_ptr[e]:t_ptr[e + 1]]:
+                            if seq[Np + T] <= 0:
+                                interface[Np + T] = True
+                                col = 1 if conns[T, 0] == e else 0
+                                heap_p[n_nodes + n_push] = t_entry[T, col]
+                                heap_e[n_nodes + n_push] = Np + T
+                                n_push += 1
+                        # Add the pores that throats with an interface can
+                        # now fill cooperatively
+                        n_push += coop(e, Np, seq, conns, t_idx, t_ptr,
+                                       tt_idx, tt_ptr, tt_Pc, heap_p, heap_e,
+                                       n_nodes + n_push)
+                elif cluster[e] != c and (running[cluster[e]]
+                                          or sizes[cluster[e]] > 0):
+                    # Merge the clusters using the existing cluster number,
+                    # only carrying over the uninvaded elements
+                    c2 = cluster[e]
+                    merged[c2] = c
+                    merge_seq[c2] = count
+                    from_residual[c2] = not running[c2]
+                    stack = np.zeros(sizes[c2], dtype=np.int64)
+                    stack[0] = roots[c2]
+                    n = 1
+                    while n > 0:
+                        n -= 1
+                        node = stack[n]
+                        if left[node] > -1:
+                            stack[n] = left[node]
+                            n += 1
+                        if right[node] > -1:
+                            stack[n] = right[node]
+                            n += 1
+                        if seq[heap_e[node]] == -1:
+                            left[node] = -1
+                            right[node] = -1
+                            rank[node] = 1
+                            owner[node] = c
+                            roots[c] = meld(roots[c], node, heap_p, heap_e,
+                                            left, right, rank, Np, path)
+                            sizes[c] += 1
+                        else:
+                            owner[node] = -1
+                    roots[c2] = -1
+                    sizes[c2] = 0
+                    running[c2] = False
+                for i in range(n_nodes, n_nodes + n_push):
+                    owner[i] = c
+                    roots[c] = meld(roots[c], i, heap_p, heap_e, left, right,
+                                    rank, Np, path)
+                    sizes[c] += 1
+                n_nodes += n_push
+                if (sizes[c] == 0) or max_p_reached[c]:
+                    # If the cluster contains no more entries invasion has
+                    # finished
+                    running[c] = False
+            if invade_isolated_Ts:
+                # Throats become isolated when their second pore is invaded
+                for k in range(Nt if first else n_new):
+                    if first:
+                        start, stop = k, k + 1
+                    else:
+                        start, stop = t_ptr[new_Ps[k]], t_ptr[new_Ps[k] + 1]
+                    for j in range(start, stop):
+                        T = j if first else t_idx[j]
+                        P1, P2 = conns[T, 0], conns[T, 1]
+                        if (seq[Np + T] == -1) and (seq[P1] > -1) \
+                                and (seq[P2] > -1):
+                            P = P2 if seq[P2] > seq[P1] else P1
+                            inv_Pc[Np + T] = inv_Pc[P]
+                            seq[Np + T] = seq[P]
+                            cluster[Np + T] = cluster[P]
+            if terminate_clusters:
+                # Stop the clusters that have reached an outlet
+                for k in range(Np if first else n_new):
+                    P = k if first else new_Ps[k]
+                    if outlets[P] and (cluster[P] > -1):
+                        if running[cluster[P]]:
+                            running[cluster[P]] = False
+                            stop_seq[cluster[P]] = count
+            first = False
+        return count, merged, merge_seq, from_residual, stop_seq
+
+    return kernel
+
+
+@lru_cache(maxsize=None)
+def _get_coop_kernel():
+    r"""
+    Compiles the function finding the pores that can be filled
+    cooperatively once a pore is invaded, on first use, so numba is only
+    imported when needed
+
+    Notes
+    -----
+    Once pore ``P`` is invaded, each of its uninvaded throats holds an
+    interface, so can fill the pore it has in common with any throat it is
+    paired with in the CSR arrays ``tt_idx``, ``tt_ptr`` and ``tt_Pc``,
+    provided the common pore is uninvaded and the other pores of both
+    throats are invaded.  The pressures and pores of these filling events
+    are written to ``heap_p`` and ``heap_e`` from position ``n`` onwards,
+    and their number is returned.  ``seq`` holds the invasion sequence of
+    the pores then of the throats.
+
+    """
+    from numba import njit
+
+    @njit
+    def coop(P, Np, seq, conns, t_idx, t_ptr, tt_idx, tt_ptr, tt_Pc, heap_p,
+             heap_e, n):
+        n_push = 0
+        for T in t_idx[t_ptr[P]:t_ptr[P + 1]]:
+            if seq[Np + T] != -1:
+                continue
+            a0, a1 = conns[T, 0], conns[T, 1]
+            for k in range(tt_ptr[T], tt_ptr[T + 1]):
+                T2 = tt_idx[k]
+                b0, b1 = conns[T2, 0], conns[T2, 1]
+                if (a0 == b0) or (a0 == b1):
+                    cP, uP1 = a0, a1
+                elif (a1 == b0) or (a1 == b1):
+                    cP, uP1 = a1, a0
+                else:
+                    continue
+                uP2 = b1 if b0 == cP else b0
+                if uP1 == uP2:
+                    continue
+                if (seq[uP1] > -1) and (seq[uP2] > -1) and (seq[cP] == -1):
+                    heap_p[n + n_push] = tt_Pc[k]
+                    heap_e[n + n_push] = cP
+                    n_push += 1
+        return n_push
+
+    return coop
@@ -8,10 +8,9 @@ With added cooperative filling algorithms
 """
 import time
 import logging
-import heapq as hq
 import scipy as sp
 import numpy as np
-from scipy.sparse import coo_matrix, dok_matrix
+from scipy.sparse import csr_matrix
 from openpnm.algorithms import MixedInvasionPercolation
 from transforms3d._gohlketransforms import angle_between_vectors
 
@@ -175,53 +174,40 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
         r"""
         Generate an array of pores with all connected throats and pairs of
         throats that connect to the same pore
+
+        Notes
+        -----
+        ``Ps`` and ``Ts`` are the rows of the incidence matrix in CSR format,
+        so the throats of each pore form a ragged row.  ``T1`` and ``T2``
+        index into these rows, holding every pair of throats in each row in
+        the order they appear, and are looked up for all pores at once from
+        the pairs of each coordination number.
         """
         network = self.project.network
-        # Collect all throat pairs sharing a pore as list of lists
-        neighbor_Ts = network.find_neighbor_throats(
-            pores=network.pores(), flatten=False
-        )
-        # Pores associated to throat
-        Ps = []
-        # Throats connected to each pore
-        Ts = []
-        # Pairs of throats sharing a pore
-        T1 = []
-        T2 = []
-        start = 0
+        im = network.create_incidence_matrix(fmt="csr")
+        im.sort_indices()
+        num_t = np.diff(im.indptr)
+        # Nt * 2 long
+        Ps = np.repeat(network.Ps, num_t)
+        Ts = im.indices.astype(int)
         # Build lookup pair index arrays for each coordination number up to the
         # Maximum coordination max_c
-        max_c = np.amax(network.num_neighbors(pores=network.Ps, flatten=False))
-        pair_T1 = []
-        pair_T2 = []
+        max_c = np.amax(num_t)
+        pair_T1 = np.zeros([max_c + 1, max_c * (max_c - 1) // 2], dtype=int)
+        pair_T2 = np.zeros_like(pair_T1)
         logger.info("Building throat pair matrices")
-        for num_t in range(max_c + 1):
-            temp1 = []
-            temp2 = []
-            for t1 in range(num_t)[:-1]:
-                for t2 in range(num_t)[t1 + 1 :]:
-                    temp1.append(t1)
-                    temp2.append(t2)
-            pair_T1.append(np.asarray(temp1))
-            pair_T2.append(np.asarray(temp2))
-        for p, nTs in enumerate(neighbor_Ts):
-            num_t = len(nTs)
-            for i in range(num_t):
-                Ps.append(p)
-                Ts.append(nTs[i])
-            # Pair indices into Ts
-            tempt1 = pair_T1[num_t] + start
-            tempt2 = pair_T2[num_t] + start
-            for i in range(len(tempt1)):
-                T1.append(tempt1[i])
-                T2.append(tempt2[i])
-            start += num_t
-        # Nt * 2 long
-        Ps = np.asarray(Ps)
-        Ts = np.asarray(Ts)
+        for num in np.unique(num_t):
+            t1, t2 = np.triu_indices(num, k=1)
+            pair_T1[num, : t1.size] = t1
+            pair_T2[num, : t2.size] = t2
+        # Position of each pair within the pairs of its pore
+        num_pairs = num_t * (num_t - 1) // 2
+        pores = np.repeat(network.Ps, num_pairs)
+        start = np.cumsum(num_pairs) - num_pairs
+        k = np.arange(np.sum(num_pairs)) - start[pores]
         # indices into the above arrays based on throat pairs
-        T1 = np.asarray(T1)
-        T2 = np.asarray(T2)
+        T1 = im.indptr[pores] + pair_T1[num_t[pores], k]
+        T2 = im.indptr[pores] + pair_T2[num_t[pores], k]
 
         return Ps, Ts, T1, T2
 
@@ -241,32 +227,27 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
     def _transform_point_normal(self, point, normal):
         r"""
         Transforms point normal plane definition to parametric form
-        Ax + By +Cz + D = 0
+        Ax + By +Cz + D = 0, returning an N by 4 array of A, B, C, D
         """
-        return [
-            a
-            for a in zip(
-                normal[:, 0], normal[:, 1], normal[:, 2], -self._my_dot(point, normal)
-            )
-        ]
+        return np.column_stack((normal, -self._my_dot(point, normal)))
 
     def _plane_intersect(self, a, b):
         """
-        a, b   4-tuples/lists
+        a, b   N by 4 arrays
                Ax + By +Cz + D = 0
                A, B, C, D in order
-        output: 2 points on line of intersection, np.arrays, shape (3,)
+        output: 2 points on each line of intersection, N by 3 arrays, which
+                are nan where the planes are parallel
         https://bit.ly/2LkBEyc
         """
-        a_vec, b_vec = np.array(a[:3]), np.array(b[:3])
+        a_vec, b_vec = a[:, :3], b[:, :3]
         aXb_vec = np.cross(a_vec, b_vec)
-        A = np.array([a_vec, b_vec, aXb_vec])
-        d = np.array([-a[3], -b[3], 0.0]).reshape(3, 1)
-        if np.linalg.det(A) == 0:
-            return None, None
-        else:
-            p_inter = np.linalg.solve(A, d).T
-            return p_inter[0], (p_inter + aXb_vec)[0]
+        A = np.stack((a_vec, b_vec, aXb_vec), axis=1)
+        d = np.column_stack((-a[:, 3], -b[:, 3], np.zeros(len(a))))
+        p_inter = np.full_like(d, np.nan)
+        mask = np.linalg.det(A) != 0
+        p_inter[mask] = np.linalg.solve(A[mask], d[mask][:, :, np.newaxis])[:, :, 0]
+        return p_inter, p_inter + aXb_vec
 
     def _t(self, p, q, r):
         r"""
@@ -274,21 +255,15 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
         https://bit.ly/2EpQ6DD
         """
         x = p - q
-        return np.dot(r - q, x) / np.dot(x, x)
+        return self._my_dot(r - q, x) / self._my_dot(x, x)
 
     def _distance(self, p, q, r):
         r"""
         Shortest distance between line passing through p and q and point r
         https://bit.ly/2EpQ6DD
         """
-        return np.linalg.norm(self._t(p, q, r) * (p - q) + q - r)
-
-    def _pair_permutations(self, n):
-        perms = []
-        for i in range(n):
-            for j in range(n - (i + 1)):
-                perms.append([i, j + i + 1])
-        return perms
+        t = self._t(p, q, r)[:, np.newaxis]
+        return np.linalg.norm(t * (p - q) + q - r, axis=1)
 
     def _perpendicular_vector(self, v, v_ref=None):
         if v_ref is None:
@@ -311,15 +286,80 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
     def setup_coop_filling(self, inv_points=None):
         r"""
         Populate the coop filling throat-throat pair matrix
+
+        Parameters
+        ----------
+        inv_points : array_like
+            The invasion pressures at which to assess coopertive pore filling.
+
+        Notes
+        -----
+        The throat pairs and their geometry are set up once for all pressures,
+        and both coop filling models are assessed for every pair at each
+        pressure, so the meniscus model is only regenerated once per pressure.
+        A pair filled by the creep model keeps the first pressure it creeps
+        at, otherwise it keeps the first pressure it bulges at.
+
+        The result is stored in ``tt_Pc``, a CSR matrix with sorted indices
+        holding the pressure at which each pair of throats cooperatively fills
+        their common pore.  Pairs that never fill are not stored.
         """
-        self._setup_coop_filling_creep(inv_points)
-        self._setup_coop_filling_bulge(inv_points)
+        start = time.time()
+        net = self.project.network
+        phase = self.project.find_phase(self)
+        all_phys = self.project.find_physics(phase=phase)
+        if inv_points is None:
+            inv_points = np.arange(0, 1.01, 0.01) * self._max_pressure()
+        cpf = self.settings["cooperative_pore_filling"]
+        # Meniscus Filling Angle
+        tfill_angle = cpf + ".alpha"
+        T1, T2, angles = self._setup_coop_filling_creep()
+        bulge = self._setup_coop_filling_bulge(T1, T2)
+        # Initialize the pressures with nans
+        # This is used to check for the first intersection pressure and
+        # Prevent overwriting
+        creep_Pc = np.full(T1.size, np.nan)
+        bulge_Pc = np.full(T1.size, np.nan)
+        for Pc in inv_points:
+            # regenerate model with new target Pc
+            for phys in all_phys:
+                phys.models[cpf]["target_Pc"] = Pc
+                phys.regenerate_models(propnames=cpf)
+            # check whether this throat pair already has a coop value
+            check_nans = np.isnan(creep_Pc)
+            fill_angle_sum = phase[tfill_angle][T1] + phase[tfill_angle][T2]
+            coalescence = fill_angle_sum >= angles
+            # Don't use zero as can get strange numbers in menisci data
+            creep_Pc[check_nans * coalescence] = Pc if Pc != 0.0 else 1e-6
+            # Pairs that creep are not checked for bulging
+            check_nans = np.isnan(creep_Pc) * np.isnan(bulge_Pc)
+            pairs = np.where(check_nans[bulge["pairs"]])[0]
+            pairs = pairs[self._check_bulge(bulge, pairs)]
+            bulge_Pc[bulge["pairs"][pairs]] = Pc
+        # Bulging pairs fill in both directions
+        tt_Pc = np.where(np.isnan(creep_Pc), bulge_Pc, creep_Pc)
+        mask = ~np.isnan(tt_Pc)
+        bulging = np.isnan(creep_Pc) * ~np.isnan(bulge_Pc)
+        rows = np.concatenate((T1[mask], T2[bulging]))
+        cols = np.concatenate((T2[mask], T1[bulging]))
+        data = np.concatenate((tt_Pc[mask], bulge_Pc[bulging]))
+        self.tt_Pc = csr_matrix((data, (rows, cols)), shape=(net.Nt, net.Nt))
+        self.tt_Pc.sort_indices()
+        logger.info(
+            "Coop filling finished in " + str(np.around(time.time() - start, 2)) + " s"
+        )
+        logger.info(
+            "Coop pairs found by creep: "
+            + str(np.sum(~np.isnan(creep_Pc)))
+            + ", by bulging: "
+            + str(np.sum(bulging))
+        )
 
-    def _setup_coop_filling_creep(self, inv_points=None):
+    def _setup_coop_filling_creep(self):
         r"""
-        This coop filling model iterates through the invasion pressures set by
-        the inv_points variable and calls the meniscus model whose dictionary
-        key must be given in the algorithm's setup.
+        This coop filling model compares the filling angles of the meniscus
+        model whose dictionary key must be given in the algorithm's setup,
+        which is regenerated for each of the invasion pressures in turn.
         The meniscus model supplies the position of the meniscus inside each
         throat as if there were a meniscus in every throat for a given pressure
         The contact line of the meniscus traces a circle around the inner
@@ -332,13 +372,17 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
         advance enough. For highly wetting fluid the contact point may be
         advanced well into the throat whilst still being at negative capillary
         pressure.
+
+        Returns
+        -------
+        T1, T2, angles : ndarray
+            The pairs of throats whose planes intersect, sorted by ``T1`` then
+            ``T2``, and the angle between each pair that the combined filling
+            angles must reach for the meniscii to coalesce.
         """
-        start = time.time()
         net = self.project.network
         phase = self.project.find_phase(self)
         all_phys = self.project.find_physics(phase=phase)
-        if inv_points is None:
-            inv_points = np.arange(0, 1.01, 0.01) * self._max_pressure()
         # Throat centroids
         try:
             t_centroids = net["throat.centroid"]
@@ -361,62 +405,26 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
             t_rad = net["throat.diameter"] / 2
         # Equations of throat planes at the center of each throat
         planes = self._transform_point_normal(t_centroids, t_norms)
-        Nt = net.Nt
-        adj_mat = dok_matrix((Nt, Nt), dtype=int)
-        # Run through and build the throat-throat pair adjacency matrix
+        # Run through all the throat pairs sharing a pore at once
         # If planes of throats intersect then meniscii in throats may also
         # Intersect at a given pressure.
-        for pore in net.Ps:
-            ts = net.find_neighbor_throats(pores=pore)
-            perms = self._pair_permutations(len(ts))
-            for perm in perms:
-                ta, tb = ts[perm]
-                p, q = self._plane_intersect(planes[ta], planes[tb])
-                if p is not None:
-                    d1 = self._distance(p, q, t_centroids[ta])
-                    d2 = self._distance(p, q, t_centroids[tb])
-                    if (t_rad[ta] >= d1) and (t_rad[tb] >= d2):
-                        adj_mat[ta, tb] = pore + 1
-        # Meniscus Filling Angle
-        tfill_angle = cpf + ".alpha"
-        # Capillary pressure adjacency maxtrix
-        pairs = np.asarray([list(key) for key in adj_mat.keys()])
-        pores = np.asarray([adj_mat[key] for key in adj_mat.keys()]) - 1
-        self.tt_Pc = adj_mat.copy().astype(float).tocsr()
-        # Initialize the pressure matrix with nans
-        # This is used to check for the first intersection pressure and
-        # Prevent overwriting
-        self.tt_Pc[pairs[:, 0], pairs[:, 1]] = np.nan
-        angles = self._throat_pair_angle(pairs[:, 0], pairs[:, 1], pores, net)
-        T1 = pairs[:, 0]
-        T2 = pairs[:, 1]
-        hits = []
-        for Pc in inv_points:
-            # Don't use zero as can get strange numbers in menisci data
-            if Pc == 0.0:
-                Pc = 1e-6
-            # regenerate model with new target Pc
-            for phys in all_phys:
-                phys.models[cpf]["target_Pc"] = Pc
-                phys.regenerate_models(propnames=cpf)
-            # check whether this throat pair already has a coop value
-            check_nans = np.asarray(np.isnan(self.tt_Pc[T1, T2]).tolist()[0])
-            fill_angle_sum = np.sum(phase[tfill_angle][pairs], axis=1)
-            coalescence = fill_angle_sum >= angles
-            mask = check_nans * coalescence
-            if np.any(mask):
-                self.tt_Pc[T1[mask], T2[mask]] = Pc
-                hits.append(Pc)
-        # Change to lil for single throat lookups
-        #        self.tt_Pc = self.tt_Pc.tolil()
-        logger.info(
-            "Coop filling finished in " + str(np.around(time.time() - start, 2)) + " s"
-        )
-        logger.info("Coop Hits", np.unique(np.asarray(hits)))
-
-    def _setup_coop_filling_bulge(self, inv_points=None):
+        Ps, Ts, T1, T2 = self._get_throat_pairs()
+        pores, T1, T2 = Ps[T1], Ts[T1], Ts[T2]
+        p, q = self._plane_intersect(planes[T1], planes[T2])
+        d1 = self._distance(p, q, t_centroids[T1])
+        d2 = self._distance(p, q, t_centroids[T2])
+        mask = (t_rad[T1] >= d1) * (t_rad[T2] >= d2)
+        pores, T1, T2 = pores[mask], T1[mask], T2[mask]
+        # Sort the pairs, keeping the last pore of pairs that share two
+        _, last = np.unique((T1 * net.Nt + T2)[::-1], return_index=True)
+        pairs = T1.size - 1 - last
+        pores, T1, T2 = pores[pairs], T1[pairs], T2[pairs]
+        angles = self._throat_pair_angle(T1, T2, pores, net)
+        return T1, T2, angles
+
+    def _setup_coop_filling_bulge(self, T1, T2):
         r"""
-        Evaluate the cooperative pore filling condition that the combined
+        Set up the cooperative pore filling condition that the combined
         filling angle in next neighbor throats cannot exceed the geometric
         angle between their throat planes.
         This is used when the invading fluid has access to multiple throats
@@ -424,20 +432,17 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
 
         Parameters
         ----------
-        inv_points : array_like
-            The invasion pressures at which to assess coopertive pore filling.
+        T1, T2 : ndarray
+            The pairs of throats that can fill cooperatively, sorted by ``T1``
+            then ``T2``
+
+        Returns
+        -------
+        A dictionary holding the geometry of the throat pairs sharing each
+        pore, where ``pairs`` indexes each one into ``T1`` and ``T2``, to be
+        assessed at each pressure by ``_check_bulge``.
         """
         net = self.project.network
-        phase = self.project.find_phase(self)
-        all_phys = self.project.find_physics(phase=phase)
-        if inv_points is None:
-            inv_points = np.arange(0, 1.01, 0.01) * self._max_pressure()
-
-        start = time.time()
-        cpf = self.settings["cooperative_pore_filling"]
-        tfill_angle = cpf + ".alpha"
-        tmen_rad = cpf + ".radius"
-        tmen_cen = cpf + ".center"
         try:
             # The following properties will all be there for Voronoi
             p_centroids = net["pore.centroid"]
@@ -452,140 +457,87 @@ class MixedInvasionPercolationCoop(MixedInvasionPercolation):
             p_rad = net["pore.diameter"] / 2
             t_norms = net["throat.normal"]
 
-        Ps, Ts, T1, T2 = self._get_throat_pairs()
-        # Network indices for the pairs
-        pps = Ps[T1]
-        pt1 = Ts[T1]
-        pt2 = Ts[T2]
-        # Arrays to get upper and lower triangular for reference to later
-        # When checking for phase presence one throat at a time - need to
-        # Check all throat pairs
-        T_all_t1 = Ts[np.concatenate((T1, T2))]
-        # T_all_t2 = Ts[np.concatenate((T2, T1))]
-        # Throat-Throat cooperative filling pressure
-        data = np.ones(len(T_all_t1), dtype=float)
-        data.fill(np.nan)
-        # coo --> useful for building matrix
-        # coo = coo_matrix(
-        #     (data, (T_all_t1, T_all_t2)), shape=(len(T_all_t1), len(T_all_t2))
-        # )
-        # csr --> for indexing into entire matrix when populating with
-        # actual coop filling values
-        #        self.tt_Pc = coo.tocsr()
-        # Pair pore center and radius
-        pp_cen = p_centroids[pps]
-        pp_rad = p_rad[pps]
+        Ps, Ts, I1, I2 = self._get_throat_pairs()
+        # Find the pairs of throats among the ones that can fill
+        keys = T1 * net.Nt + T2
+        pair_keys = Ts[I1] * net.Nt + Ts[I2]
+        pairs = np.searchsorted(keys, pair_keys)
+        mask = pairs < keys.size
+        mask[mask] = keys[pairs[mask]] == pair_keys[mask]
+        I1, I2, pairs = I1[mask], I2[mask], pairs[mask]
         # Make sure throat normals are unit vector
         unit = np.linalg.norm(t_norms, axis=1)
-        t_norms /= np.vstack((unit, unit, unit)).T
-
-        for Pc in inv_points:
-            # regenerate model with new target Pc
-            for phys in all_phys:
-                phys.models[cpf]["target_Pc"] = Pc
-                phys.regenerate_models(propnames=cpf)
-            men_cen_dist = phase[tmen_cen]
-            # Work out meniscii coord for each direction along the throat
-            men_cen_coord = self._apply_cen_to_throats(
-                p_centroids[Ps], t_centroids[Ts], t_norms[Ts], men_cen_dist[Ts]
-            )
-            # Pair centers
-            pc1 = men_cen_coord[T1]
-            pc2 = men_cen_coord[T2]
-            # Center to center vector between neighboring meniscii
-            c2c = pc1 - pc2
-            dist = np.linalg.norm(c2c, axis=1)
-            # Pair meniscii radii
-            pr1 = phase[tmen_rad][pt1]
-            pr2 = phase[tmen_rad][pt2]
-            # nans may exist if pressure is outside the range
-            # set these to zero to be ignored by next step without
-            # causing RuntimeWarning
-            pr1[np.isnan(pr1)] = 0
-            pr2[np.isnan(pr2)] = 0
-            # Negative mensicii radii means positive pressure
-            # Assume meniscii only interact when bulging into pore
-            check_neg = np.logical_and(pr1 < 0, pr2 < 0)
-            # simple initial distance check on sphere rads
-            check_rads = (np.abs(pr1 + pr2)) >= dist
-            # check whether the filling angle is ok at this Pc
-            check_alpha_T1 = ~np.isnan(phase[tfill_angle][pt1])
-            check_alpha_T2 = ~np.isnan(phase[tfill_angle][pt2])
-            check_alpha = check_alpha_T1 * check_alpha_T2
-            # check whether this throat pair already has a coop value
-            check_nans = np.asarray(np.isnan(self.tt_Pc[pt1, pt2]).tolist()[0])
-            mask = check_neg * check_alpha * check_nans * check_rads
-            # if all checks pass
-            if np.any(mask):
-                # Check if intersecting circle lies within pore
-                inter = self.trilaterate_v(
-                    P1=pc1[mask],
-                    P2=pc2[mask],
-                    P3=pp_cen[mask],
-                    r1=pr1[mask][:, np.newaxis],
-                    r2=pr2[mask][:, np.newaxis],
-                    r3=pp_rad[mask][:, np.newaxis],
-                )
-                inter = inter.flatten()
-                if np.any(inter):
-                    self.tt_Pc[pt1[mask][inter], pt2[mask][inter]] = Pc
-                    self.tt_Pc[pt2[mask][inter], pt1[mask][inter]] = Pc
-            # Save meniscii data for each throat into each connecting pore
-            men_data = {}
-            men_data["Ps"] = Ps
-            men_data["Ts"] = Ts
-            men_data["cen"] = men_cen_coord
-            men_data["rad"] = phase[tmen_rad][Ts]
-
-        # Change to lil for single throat lookups
-        self.tt_Pc = self.tt_Pc.tolil()
-        logger.info(
-            "Coop filling finished in " + str(np.around(time.time() - start, 2)) + " s"
-        )
+        t_norms = t_norms / np.vstack((unit, unit, unit)).T
+        bulge = {
+            "pairs": pairs,
+            "I1": I1,
+            "I2": I2,
+            "pt1": Ts[I1],
+            "pt2": Ts[I2],
+            # Pore and throat centers and throat normals for each throat of
+            # each pore
+            "p_cen": p_centroids[Ps],
+            "t_cen": t_centroids[Ts],
+            "t_norm": t_norms[Ts],
+            "Ts": Ts,
+            # Pair pore center and radius
+            "pp_cen": p_centroids[Ps[I1]],
+            "pp_rad": p_rad[Ps[I1]],
+        }
+        return bulge
 
-    def _check_coop(self, pore, queue):
+    def _check_bulge(self, bulge, pairs):
         r"""
-        Method run in loop after every pore invasion. All connecting throats
-        are now given access to the invading phase. Two throats with access to
-        the invading phase can cooperatively fill any pores that they are both
-        connected to, common pores.
-        The invasion of theses throats connected to the common pore is handled
-        elsewhere.
+        Find which of the given throat pairs, indices into the arrays set up
+        by ``_setup_coop_filling_bulge``, have meniscii that bulge into their
+        common pore and intersect inside it at the current meniscus state
         """
-        net = self.project.network
-        t_inv = "throat.invasion_sequence"
-        p_inv = "pore.invasion_sequence"
-        for throat in net.find_neighbor_throats(pores=pore):
-            # A pore has just been invaded, all it's throats now have
-            # An interface residing inside them
-            if self[t_inv][throat] == -1:
-                # If the throat is not the invading throat that gave access
-                # to this pore, get the pores that this throat connects with
-                a = set(net["throat.conns"][throat])
-                # Get a list of pre-calculated coop filling pressures for all
-                # Throats this throat can coop fill with
-                ts_Pc = self.tt_Pc.data[throat]
-                # Network indices of throats that can act as filling pairs
-                ts = self.tt_Pc.rows[throat]
-                # If there are any potential coop filling throats
-                if np.any(~np.isnan(ts_Pc)):
-                    ts_Pc = np.asarray(ts_Pc)
-                    ts = np.asarray(ts)
-                    ts = ts[~np.isnan(ts_Pc)]
-                    ts_Pc = ts_Pc[~np.isnan(ts_Pc)]
-                    # For each throat find the common pore and the uncommon
-                    # pores
-                    for i, t in enumerate(ts):
-                        # Find common pore (cP) and uncommon pores (uPs)
-                        b = set(net["throat.conns"][t])
-                        cP = list(a.intersection(b))
-                        uPs = list(a.symmetric_difference(b))
-                        # If the common pore is not invaded but the others are
-                        # The potential coop filling event can now happen
-                        # Add the coop pressure to the queue
-                        if (np.all(self[p_inv][uPs] > -1)) and (self[p_inv][cP] == -1):
-                            # Coop pore filling fills the common pore
-                            # The throats that gave access are not invaded now
-                            # However, isolated throats between invaded pores
-                            # Are taken care of elsewhere...
-                            hq.heappush(queue, [ts_Pc[i], list(cP), "pore"])
+        phase = self.project.find_phase(self)
+        cpf = self.settings["cooperative_pore_filling"]
+        tfill_angle = cpf + ".alpha"
+        tmen_rad = cpf + ".radius"
+        tmen_cen = cpf + ".center"
+        men_cen_dist = phase[tmen_cen]
+        # Work out meniscii coord for each direction along the throat
+        men_cen_coord = self._apply_cen_to_throats(
+            bulge["p_cen"], bulge["t_cen"], bulge["t_norm"], men_cen_dist[bulge["Ts"]]
+        )
+        pt1 = bulge["pt1"][pairs]
+        pt2 = bulge["pt2"][pairs]
+        # Pair centers
+        pc1 = men_cen_coord[bulge["I1"][pairs]]
+        pc2 = men_cen_coord[bulge["I2"][pairs]]
+        # Center to center vector between neighboring meniscii
+        c2c = pc1 - pc2
+        dist = np.linalg.norm(c2c, axis=1)
+        # Pair meniscii radii
+        pr1 = phase[tmen_rad][pt1]
+        pr2 = phase[tmen_rad][pt2]
+        # nans may exist if pressure is outside the range
+        # set these to zero to be ignored by next step without
+        # causing RuntimeWarning
+        pr1[np.isnan(pr1)] = 0
+        pr2[np.isnan(pr2)] = 0
+        # Negative mensicii radii means positive pressure
+        # Assume meniscii only interact when bulging into pore
+        check_neg = np.logical_and(pr1 < 0, pr2 < 0)
+        # simple initial distance check on sphere rads
+        check_rads = (np.abs(pr1 + pr2)) >= dist
+        # check whether the filling angle is ok at this Pc
+        check_alpha_T1 = ~np.isnan(phase[tfill_angle][pt1])
+        check_alpha_T2 = ~np.isnan(phase[tfill_angle][pt2])
+        check_alpha = check_alpha_T1 * check_alpha_T2
+        mask = check_neg * check_alpha * check_rads
+        # if all checks pass
+        if np.any(mask):
+            # Check if intersecting circle lies within pore
+            inter = self.trilaterate_v(
+                P1=pc1[mask],
+                P2=pc2[mask],
+                P3=bulge["pp_cen"][pairs][mask],
+                r1=pr1[mask][:, np.newaxis],
+                r2=pr2[mask][:, np.newaxis],
+                r3=bulge["pp_rad"][pairs][mask][:, np.newaxis],
+            )
+            mask[mask] = inter.flatten()
+        return mask
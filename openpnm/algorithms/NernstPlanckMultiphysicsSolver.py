@@ -1,4 +1,7 @@
 import numpy as np
+import scipy.sparse as sparse
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from openpnm.algorithms import GenericAlgorithm
 from openpnm.utils import logging, Docorator, GenericSettings
 docstr = Docorator()
@@ -26,6 +29,24 @@ class NernstPlanckMultiphysicsSolverSettings(GenericSettings):
         The tolerance to use for stopping Gummel iterations
     g_max_iter : int (default = 10)
         The maximum number if times to perform the Gummel iteration
+    coupling : str (default = 'gummel')
+        How the equations are coupled.  With 'gummel' the potential and each
+        ion are solved in turn until they stop changing.  With 'newton' they
+        are solved together by Newton's method, which converges
+        quadratically, so in far fewer iterations.  'g_tol' and 'g_max_iter'
+        apply to both.
+    workers : int (default = None)
+        If given, the equations of the ions are solved at the same time on
+        a pool of this many threads in each Gummel iteration, since they
+        are independent of each other for a given potential.  Each ion sees
+        the others as they were at the start of the iteration, so if they
+        are coupled through other properties, e.g. the viscosity through the
+        salinity, the results may differ from a serial run within the
+        tolerances, though they're the same from run to run.  This is only
+        beneficial on large networks, where the time spent in the linear
+        solvers, which release the GIL, dominates.  Solves by 'pypardiso',
+        which is multithreaded itself, are done one at a time, so with it
+        only the assembly is done in parallel, and a warning is logged.
 
     """
     phase = None
@@ -33,6 +54,8 @@ class NernstPlanckMultiphysicsSolverSettings(GenericSettings):
     ions = []
     g_tol = 1e-8
     g_max_iter = 10
+    coupling = 'gummel'
+    workers = None
 
 
 class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
@@ -45,6 +68,14 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
     This is not a true OpenPNM algorithm. This solver wraps the provided
     Nernst-Planck and ionic conduction algorithms and solves the associated
     system of equations.
+
+    Notes
+    -----
+    The number of linear systems solved by the last run is stored in the
+    ``n_solves`` attribute, and the number of times the residuals were
+    evaluated, each of which regenerates the physics and rebuilds the ``A``
+    matrices, is stored in ``n_residuals``.
+
     """
 
     def __init__(self, phase=None, settings={},  **kwargs):
@@ -53,6 +84,9 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
         self.settings._update_settings_and_docs(c)
         settings['phase'] = phase.name
         self.settings.update(settings)
+        self.n_solves = 0
+        self.n_residuals = 0
+        self._coloring = None
 
     def run(self, t=None):
         r"""
@@ -83,6 +117,15 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
         phys = p_alg.project.find_physics(phase=phase)
         p_alg._charge_conservation_eq_source_term(e_alg=e_alg)
 
+        self.n_solves = 0
+        self.n_residuals = 0
+        self._check_workers(e_alg)
+        if self.settings['coupling'] == 'newton':
+            self._run_newton(p_alg=p_alg, e_alg=e_alg)
+            return
+        if self.settings['coupling'] != 'gummel':
+            raise Exception('Unknown coupling: ' + self.settings['coupling'])
+
         # Initialize residuals & old/new fields for Gummel iterats
         g_tol = self.settings['g_tol']
         g_res = {}
@@ -103,7 +146,10 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
                 # Ions
                 for e in e_alg:
                     g_old[e.name] = (e[e.settings['quantity']].copy())
-                    e._run_reactive(x0=g_old[e.name])
+                self._run_ions(e_alg=e_alg, x0=g_old)
+                for e in e_alg:
+                    self.n_solves += len(e.residual_history) - 1
+                    self.n_residuals += len(e.residual_history)
                     g_new[e.name] = (e[e.settings['quantity']].copy())
                     # Residual
                     g_res[e.name] = np.sum(np.absolute(
@@ -115,6 +161,8 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
                     obj.regenerate_models()
                 g_old[p_alg.name] = p_alg[p_alg.settings['quantity']].copy()
                 p_alg._run_reactive(x0=g_old[p_alg.name])
+                self.n_solves += len(p_alg.residual_history) - 1
+                self.n_residuals += len(p_alg.residual_history)
                 g_new[p_alg.name] = p_alg[p_alg.settings['quantity']].copy()
                 # Residual
                 g_res[p_alg.name] = np.sum(np.absolute(
@@ -127,3 +175,281 @@ class NernstPlanckMultiphysicsSolver(GenericAlgorithm):
             if g_convergence:
                 print('Solution converged')
                 break
+        logger.info(f'Linear systems solved: {self.n_solves}, residual'
+                    + f' evaluations: {self.n_residuals}')
+
+    def _check_workers(self, e_alg):
+        r"""
+        Warns if 'workers' is given while the ions are solved by 'pypardiso',
+        whose solves are done one at a time
+        """
+        if self.settings['workers'] is None:
+            return
+        if any(e.settings['solver_family'] == 'pypardiso' for e in e_alg):
+            logger.warning('pypardiso solves are done one at a time, so only'
+                           + ' the assembly of the ions is done in parallel'
+                           + ' with workers')
+
+    def _run_ions(self, e_alg, x0, transient=False):
+        r"""
+        Solves the equation of each ion, starting from the guesses in the
+        dict ``x0``, on a pool of threads if 'workers' is given
+
+        Notes
+        -----
+        On several threads, each ion is given the guesses of the others in
+        ``x0`` as a snapshot, which it puts on the phase along with its own
+        guess before regenerating the physics, so it never sees the
+        intermediate guesses of the others and the results don't depend on
+        the order the threads run in.  The phase is only read and written
+        while holding the lock shared by all reactive algorithms, while the
+        assembly and the solve of each ion are done outside of it.  The final
+        results are written to the phase by the caller once all the ions are
+        solved.
+
+        """
+        def solve(e):
+            if transient:
+                e._t_run_reactive(x0=x0[e.name])
+            else:
+                e._run_reactive(x0=x0[e.name])
+
+        workers = self.settings['workers']
+        if workers is None:
+            for e in e_alg:
+                solve(e)
+            return
+        for e in e_alg:
+            e._snapshot = {i.settings['quantity']: x0[i.name].copy()
+                           for i in e_alg if i is not e}
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(solve, e) for e in e_alg]
+                for future in futures:
+                    future.result()
+        finally:
+            for e in e_alg:
+                e._snapshot = None
+
+    def _run_newton(self, p_alg, e_alg):
+        r"""
+        Solves for the potential and the concentrations of all ions together
+        by Newton's method, starting from their present values
+
+        Notes
+        -----
+        The Jacobian has the ``A`` matrix of each algorithm on its diagonal.
+        The coupling blocks, i.e. the change in each ion's equation with the
+        potential through the 'ad_dif_mig' conductance, and in the charge
+        conservation equation with each concentration through the ionic
+        conductance and source term, are found by finite differences.
+        Since each pore only interacts with its neighbours, pores with no
+        neighbours in common are perturbed together (see ``_get_coloring``),
+        so each block takes only a few evaluations.  The ``A`` matrices are
+        up to date in every iteration, since they come with the residuals,
+        while the coupling blocks are reused until the change in the fields
+        stops at least halving from one iteration to the next.  This costs
+        an iteration or so, but saves most of the residual evaluations.
+
+        One Gummel iteration is done first to get a starting point, since the
+        ionic conductance, and so the Jacobian, vanishes where the
+        concentrations are zero.  Iterations stop when the change in every
+        field, measured as in the Gummel iterations, is below 'g_tol'.
+
+        """
+        algs = [p_alg] + e_alg
+        g_tol = self.settings['g_tol']
+        self._get_newton_guess(algs)
+        x = [alg[alg.settings['quantity']].copy() for alg in algs]
+        A, R = self._get_newton_residual(algs, x)
+        solver = p_alg._get_solver()
+        C, g_max = None, None
+        for itr in range(int(self.settings['g_max_iter'])):
+            if C is None:
+                C = self._get_newton_coupling(algs, x, R)
+            J = self._get_newton_jacobian(A, C)
+            # Scale the rows since each equation has its own units
+            d = np.absolute(J.diagonal())
+            d = 1/np.where(d > 0, d, 1)
+            J = sparse.diags(d) @ J
+            r = d*R
+            dx = solver(J.tocsr(), -r)
+            self.n_solves += 1
+            dx = np.split(dx, len(algs))
+            x_new = [xi + dxi for xi, dxi in zip(x, dx)]
+            g_res = [np.sum(np.absolute(xi**2 - xj**2))
+                     for xi, xj in zip(x, x_new)]
+            x = x_new
+            A, R = self._get_newton_residual(algs, x)
+            g_r = str([float(format(i, '.3g')) for i in g_res])[1:-1]
+            print('Newton iter: ' + str(itr+1) + ', residuals: ' + g_r)
+            if max(g_res) < g_tol:
+                print('Solution converged')
+                break
+            # Update the coupling blocks only if the steps stop shrinking fast
+            if (g_max is not None) and (max(g_res) > 0.5*g_max):
+                C = None
+            g_max = max(g_res)
+        else:
+            logger.warning('Newton iterations did not converge after '
+                           + str(itr+1) + ' iterations')
+        logger.info(f'Linear systems solved: {self.n_solves}, residual'
+                    + f' evaluations: {self.n_residuals}')
+
+    def _get_newton_guess(self, algs):
+        r"""
+        Does one Gummel iteration, solving for each field in turn
+        """
+        phase = self.project.phases()[self.settings['phase']]
+        for alg in algs[1:] + algs[:1]:
+            alg._run_reactive(x0=alg[alg.settings['quantity']].copy())
+            self.n_solves += len(alg.residual_history) - 1
+            self.n_residuals += len(alg.residual_history)
+            phase.update(alg.results())
+            for obj in self.project.find_physics(phase=phase):
+                obj.regenerate_models()
+
+    def _set_newton_fields(self, algs, x):
+        r"""
+        Writes the fields in ``x`` to the algorithms and the phase, and
+        updates the physics
+        """
+        phase = self.project.phases()[self.settings['phase']]
+        for alg, xi in zip(algs, x):
+            alg[alg.settings['quantity']] = xi
+            phase[alg.settings['quantity']] = xi
+        for obj in self.project.find_physics(phase=phase):
+            obj.regenerate_models()
+
+    def _get_newton_system(self, alg):
+        r"""
+        Returns ``A`` and ``b`` of the given algorithm, with BCs and source
+        terms applied, for the fields presently on the phase
+        """
+        alg._build_A()
+        alg._build_b()
+        alg._apply_BCs()
+        alg._apply_sources()
+        return alg.A.tocsr(), alg.b.copy()
+
+    def _get_newton_residual(self, algs, x, skip=None):
+        r"""
+        Returns the ``A`` matrix of each algorithm, and the residuals of all
+        the equations stacked in one array, for the fields ``x``.  The system
+        of the algorithm at index ``skip`` isn't built, its ``A`` is ``None``
+        and its residuals are zero.
+        """
+        self.n_residuals += 1
+        self._set_newton_fields(algs, x)
+        A, R = [], []
+        for i, (alg, xi) in enumerate(zip(algs, x)):
+            if i == skip:
+                A.append(None)
+                R.append(np.zeros_like(xi))
+                continue
+            Ai, bi = self._get_newton_system(alg)
+            A.append(Ai)
+            R.append(Ai @ xi - bi)
+        return A, np.concatenate(R)
+
+    def _get_newton_jacobian(self, A, C):
+        r"""
+        Returns the Jacobian with the ``A`` matrix of each algorithm in ``A``
+        on its diagonal, and the coupling blocks in ``C`` off of it
+        """
+        blocks = [[C.get((i, j)) for j in range(len(A))]
+                  for i in range(len(A))]
+        for i in range(len(A)):
+            blocks[i][i] = A[i]
+        return sparse.bmat(blocks, format='csr')
+
+    def _get_newton_coupling(self, algs, x, R):
+        r"""
+        Returns a ``dict`` with the coupling block of the Jacobian for each
+        pair of algorithms ``(i, j)``, i.e. the change of the residuals of
+        ``i`` with the field of ``j``, found by finite differences from the
+        residuals ``R`` at ``x``
+        """
+        n, Np = len(algs), algs[0].Np
+        colors, S = self._get_coloring()
+        eps = np.sqrt(np.finfo(float).eps)
+        blocks = {}
+        for j in range(n):
+            scale = np.amax(np.absolute(x[j]))
+            h = eps*np.maximum(np.absolute(x[j]), scale if scale > 0 else 1)
+            rows, cols = [[] for _ in range(n)], []
+            vals = [[] for _ in range(n)]
+            for k in range(colors.max() + 1):
+                xp = list(x)
+                xp[j] = x[j] + h*(colors == k)
+                Rp = self._get_newton_residual(algs, xp, skip=j)[1]
+                dR = np.split(Rp - R, n)
+                sel = colors[S.col] == k
+                for i in range(n):
+                    if i != j:
+                        rows[i].append(S.row[sel])
+                        vals[i].append(dR[i][S.row[sel]]/h[S.col[sel]])
+                cols.append(S.col[sel])
+            cols = np.concatenate(cols)
+            for i in range(n):
+                if i != j:
+                    Jij = sparse.coo_matrix(
+                        (np.concatenate(vals[i]), (np.concatenate(rows[i]),
+                                                   cols)), shape=(Np, Np))
+                    Jij = Jij.tocsr()
+                    Jij.eliminate_zeros()
+                    blocks[(i, j)] = Jij
+        # Put the unperturbed fields back
+        self._set_newton_fields(algs, x)
+        return blocks
+
+    def _get_coloring(self):
+        r"""
+        Returns a color for each pore such that no two pores of the same
+        color are neighbours or share a neighbour, along with the sparsity
+        pattern of the pore interactions in COO format
+        """
+        network = self.project.network
+        if (self._coloring is not None) and \
+                (self._coloring[0].size == network.Np):
+            return self._coloring
+        am = network.create_adjacency_matrix(fmt='csr')
+        S = (am + sparse.eye(network.Np, format='csr')).tocsr()
+        colors = _get_coloring_kernel()(S.indptr, S.indices)
+        self._coloring = (colors, S.tocoo())
+        return self._coloring
+
+
+@lru_cache(maxsize=None)
+def _get_coloring_kernel():
+    r"""
+    Compiles the kernel of ``NernstPlanckMultiphysicsSolver._get_coloring``
+    on first use, so numba is only imported when needed
+
+    Notes
+    -----
+    The kernel colors the pores greedily in order, giving each the lowest
+    color not used by the pores within two steps of it, which are found
+    from the CSR arrays of the adjacency matrix with its diagonal filled.
+
+    """
+    from numba import njit
+
+    @njit
+    def kernel(indptr, indices):
+        Np = indptr.size - 1
+        colors = np.full(Np, -1, dtype=np.int64)
+        # used[c] == p marks color c as taken by a neighbour of pore p
+        used = np.full(Np + 1, -1, dtype=np.int64)
+        for p in range(Np):
+            for i in indices[indptr[p]:indptr[p+1]]:
+                for j in indices[indptr[i]:indptr[i+1]]:
+                    if colors[j] >= 0:
+                        used[colors[j]] = p
+            c = 0
+            while used[c] == p:
+                c += 1
+            colors[p] = c
+        return colors
+
+    return kernel
@@ -1,9 +1,9 @@
 import scipy as sp
 import numpy as np
 from collections import namedtuple
+from functools import lru_cache
 from openpnm.algorithms import GenericAlgorithm
-from openpnm.topotools import site_percolation, bond_percolation
-from openpnm.topotools import remove_isolated_clusters, ispercolating
+from openpnm.topotools import ispercolating
 from openpnm.utils import logging
 logger = logging.getLogger(__name__)
 
@@ -40,6 +40,18 @@ class OrdinaryPercolation(GenericAlgorithm):
     threshold at which each site and bond was invaded is recorded, so it is
     possible to find invading configurations easily using Boolean logic.
 
+    Rather than finding the invaded clusters at each threshold, the throats
+    (or pores) are added to the clusters in order of entry pressure, keeping
+    track of which clusters are connected to the inlets, in the manner of
+    Newman and Ziff [1].  This gives the exact pressure at which each
+    element is invaded in a single pass, so the number of points only
+    affects the resolution of the reported curve.
+
+    References
+    ----------
+    [1] Newman MEJ, Ziff RM. Fast Monte Carlo algorithm for site or bond
+    percolation. Physical Review E. 64, 016706 (2001)
+
     """
 
     def __init__(self, settings={}, phase=None, **kwargs):
@@ -243,6 +255,9 @@ class OrdinaryPercolation(GenericAlgorithm):
             points spaced between the lowest and highest values of
             throat entry pressures using logarithmic spacing.  To specify low
             and high pressure points use the ``start`` and ``stop`` arguments.
+            The exact invasion pressure of each pore and throat is found
+            regardless, so these only set the points of the intrusion curve
+            and the highest pressure applied.
 
         start : int
             The optional starting point to use when generating pressure points.
@@ -294,38 +309,65 @@ class OrdinaryPercolation(GenericAlgorithm):
             else:
                 Pin = self['pore.inlets']
 
-        # Generate curve from points
-        conns = self.project.network['throat.conns']
-        for inv_val in points:
-            if self.settings['mode'] == 'bond':
-                t_invaded = self['throat.entry_pressure'] <= inv_val
-                labels = bond_percolation(conns, t_invaded)
-            elif self.settings['mode'] == 'site':
-                p_invaded = self['pore.entry_pressure'] <= inv_val
-                labels = site_percolation(conns, p_invaded)
-
-            # Optionally remove clusters not connected to the inlets
+        # Find the pressure at which each element is invaded
+        net = self.project.network
+        conns = net['throat.conns']
+        if self.settings['mode'] == 'bond':
+            Tinv = np.array(self['throat.entry_pressure'], dtype=float)
             if self.settings['access_limited']:
-                labels = remove_isolated_clusters(labels=labels,
-                                                  inlets=Pin)
-
-            # Store current applied pressure in newly invaded pores
-            pinds = (self['pore.invasion_pressure'] == np.inf) * \
-                    (labels.sites >= 0)
-            self['pore.invasion_pressure'][pinds] = inv_val
-            # Store current applied pressure in newly invaded throats
-            tinds = (self['throat.invasion_pressure'] == np.inf) * \
-                    (labels.bonds >= 0)
-            self['throat.invasion_pressure'][tinds] = inv_val
+                Tinv = self._run_accelerated(
+                    mode='bond', entry=Tinv, inlets=Pin, conns=conns)
+            # Pores are invaded along with the first of their throats
+            Pinv = np.full(self.Np, np.inf)
+            np.minimum.at(Pinv, conns[:, 0], Tinv)
+            np.minimum.at(Pinv, conns[:, 1], Tinv)
+        elif self.settings['mode'] == 'site':
+            Pinv = np.array(self['pore.entry_pressure'], dtype=float)
+            if self.settings['access_limited']:
+                Pinv = self._run_accelerated(
+                    mode='site', entry=Pinv, inlets=Pin, conns=conns)
+            # Throats are invaded once both of their pores are
+            Tinv = np.amax(Pinv[conns], axis=1)
+        # Elements are only invaded up to the highest applied pressure
+        Pinv[Pinv > np.amax(points)] = np.inf
+        Tinv[Tinv > np.amax(points)] = np.inf
+        self['pore.invasion_pressure'] = Pinv
+        self['throat.invasion_pressure'] = Tinv
 
         # Convert invasion pressures in sequence values
         Pinv = self['pore.invasion_pressure']
         Tinv = self['throat.invasion_pressure']
-        Pseq = np.searchsorted(np.unique(Pinv), Pinv)
-        Tseq = np.searchsorted(np.unique(Tinv), Tinv)
+        Pseq = np.unique(Pinv, return_inverse=True)[1]
+        Tseq = np.unique(Tinv, return_inverse=True)[1]
         self['pore.invasion_sequence'] = Pseq
         self['throat.invasion_sequence'] = Tseq
 
+    def _run_accelerated(self, mode, entry, inlets, conns):
+        r"""
+        Returns the pressure at which each throat (``mode='bond'``) or pore
+        (``mode='site'``) is invaded from the ``inlets``
+
+        Notes
+        -----
+        The elements are added in order of ``entry`` pressure to a
+        union-find forest of pores.  Each cluster not yet connected to the
+        inlets keeps a linked list of its elements, which are all assigned
+        the current pressure when the cluster joins one that is connected.
+        Each element is thus visited at most twice.
+
+        """
+        bond_kernel, site_kernel = _get_union_find_kernels()
+        entry = np.ascontiguousarray(entry, dtype=float)
+        order = np.argsort(entry, kind='stable')
+        inlets = np.zeros(self.Np, dtype=bool) | inlets
+        conns = np.ascontiguousarray(conns, dtype=np.int64)
+        if mode == 'bond':
+            return bond_kernel(order, entry, inlets, conns)
+        am = self.project.network.create_adjacency_matrix(fmt='csr')
+        return site_kernel(order, entry, inlets,
+                           am.indices.astype(np.int64),
+                           am.indptr.astype(np.int64))
+
     def get_intrusion_data(self, Pc=None):
         r"""
         Obtain the numerical values of the calculated intrusion curve.
@@ -427,3 +469,110 @@ class OrdinaryPercolation(GenericAlgorithm):
             inv_phase['pore.invasion_pressure'] = Ppressure
             inv_phase['throat.invasion_pressure'] = Tpressure
         return inv_phase
+
+
+@lru_cache(maxsize=None)
+def _get_union_find_kernels():
+    r"""
+    Compiles the union-find kernels of ``OrdinaryPercolation`` on first use,
+    so numba is only imported when needed
+    """
+    from numba import njit
+
+    @njit
+    def find(parent, i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:  # Path compression
+            parent[i], i = root, parent[i]
+        return root
+
+    @njit
+    def assign(head, nxt, r, inv, p):
+        # Invade all elements in the list of cluster r at pressure p
+        e = head[r]
+        while e >= 0:
+            inv[e] = p
+            e = nxt[e]
+        head[r] = -1
+
+    @njit
+    def union(parent, size, connected, head, tail, nxt, inv, a, b, p):
+        a = find(parent, a)
+        b = find(parent, b)
+        if a == b:
+            return a
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+        if connected[a] and not connected[b]:
+            assign(head, nxt, b, inv, p)
+        elif connected[b] and not connected[a]:
+            assign(head, nxt, a, inv, p)
+            connected[a] = True
+        elif not connected[a]:  # Concatenate the lists
+            if head[a] < 0:
+                head[a], tail[a] = head[b], tail[b]
+            elif head[b] >= 0:
+                nxt[tail[a]] = head[b]
+                tail[a] = tail[b]
+        head[b] = -1
+        return a
+
+    @njit
+    def add(head, tail, nxt, r, e):
+        nxt[e] = -1
+        if head[r] < 0:
+            head[r] = e
+        else:
+            nxt[tail[r]] = e
+        tail[r] = e
+
+    @njit
+    def bond_kernel(order, entry, inlets, conns):
+        Np, Nt = inlets.size, entry.size
+        parent = np.arange(Np)
+        size = np.ones(Np, dtype=np.int64)
+        connected = inlets.copy()
+        head = -np.ones(Np, dtype=np.int64)
+        tail = -np.ones(Np, dtype=np.int64)
+        nxt = -np.ones(Nt, dtype=np.int64)
+        inv = np.full(Nt, np.inf)
+        for t in order:
+            p = entry[t]
+            r = union(parent, size, connected, head, tail, nxt, inv,
+                      conns[t, 0], conns[t, 1], p)
+            if connected[r]:
+                inv[t] = p
+            else:
+                add(head, tail, nxt, r, t)
+        return inv
+
+    @njit
+    def site_kernel(order, entry, inlets, indices, indptr):
+        Np = inlets.size
+        parent = np.arange(Np)
+        size = np.ones(Np, dtype=np.int64)
+        connected = np.zeros(Np, dtype=np.bool_)
+        active = np.zeros(Np, dtype=np.bool_)
+        head = -np.ones(Np, dtype=np.int64)
+        tail = -np.ones(Np, dtype=np.int64)
+        nxt = -np.ones(Np, dtype=np.int64)
+        inv = np.full(Np, np.inf)
+        for i in order:
+            p = entry[i]
+            active[i] = True
+            if inlets[i]:
+                connected[i] = True
+                inv[i] = p
+            else:
+                add(head, tail, nxt, i, i)
+            for j in indices[indptr[i]:indptr[i+1]]:
+                if active[j]:
+                    union(parent, size, connected, head, tail, nxt, inv,
+                          i, j, p)
+        return inv
+
+    return bond_kernel, site_kernel
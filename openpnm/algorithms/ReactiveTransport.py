@@ -1,3 +1,4 @@
+import threading
 import numpy as np
 from openpnm.algorithms import GenericTransport
 # Uncomment this line when we stop supporting Python 3.6
@@ -58,6 +59,18 @@ class ReactiveTransportSettings(GenericSettings):
         Maximum number of iterations allowed for the nonlinear solver to
         converge. This parameter is different that ``GenericTransport``'s
         ``solver_max_iter``.
+    nlin_method : str (default = 'picard')
+        The method used to update the solution guess between nonlinear
+        iterations.  Options are 'picard', which takes the (relaxed) solution
+        of the linearized system, and 'anderson', which extrapolates from the
+        last few guesses using Anderson mixing and usually needs far fewer
+        iterations for stiff source terms.
+    nlin_anderson_depth : int (default = 5)
+        The number of previous iterations used by Anderson mixing.
+    relaxation_adaptive : bool (default = False)
+        If ``True``, the quantity relaxation factor is halved whenever the
+        residual grows, and increased again up to ``relaxation_quantity``
+        while the residual falls.
 
     ----
 
@@ -68,6 +81,9 @@ class ReactiveTransportSettings(GenericSettings):
     """
 
     nlin_max_iter = 5000
+    nlin_method = 'picard'
+    nlin_anderson_depth = 5
+    relaxation_adaptive = False
     # relaxation = RelaxationSettings()
     relaxation_source = 1.0
     relaxation_quantity = 1.0
@@ -76,6 +92,59 @@ class ReactiveTransportSettings(GenericSettings):
     sources = []
 
 
+class AndersonMixing:
+    r"""
+    Computes the next guess of a fixed-point iteration ``x = G(x)`` by
+    Anderson mixing of the last few guesses and their updates
+
+    Parameters
+    ----------
+    depth : int
+        The maximum number of previous iterations to use
+
+    Notes
+    -----
+    With ``f = G(x) - x``, the next guess is found from the combination of
+    previous differences in ``x`` and ``f`` which minimizes the norm of
+    ``f``.  Without any history this reduces to the relaxed Picard update
+    ``x + w*f``.
+
+    """
+
+    def __init__(self, depth=5):
+        self.depth = depth
+        self.reset()
+
+    def reset(self):
+        r"""
+        Discards the stored history
+        """
+        self._x = []
+        self._f = []
+
+    def update(self, x, gx, w=1.0):
+        r"""
+        Returns the next guess given the present guess ``x``, the result of
+        the fixed-point map ``gx``, and the relaxation factor ``w``
+        """
+        f = gx - x
+        self._x.append(x.copy())
+        self._f.append(f)
+        if len(self._x) > self.depth + 1:
+            self._x.pop(0)
+            self._f.pop(0)
+        if len(self._x) == 1:
+            return x + w*f
+        dX = np.diff(np.vstack(self._x), axis=0).T
+        dF = np.diff(np.vstack(self._f), axis=0).T
+        gamma = np.linalg.lstsq(dF, f, rcond=None)[0]
+        x_new = x + w*f - (dX + w*dF) @ gamma
+        if not np.all(np.isfinite(x_new)):
+            self.reset()
+            return x + w*f
+        return x_new
+
+
 @docstr.get_sections(base='ReactiveTransport', sections=['Parameters'])
 @docstr.dedent
 class ReactiveTransport(GenericTransport):
@@ -92,6 +161,10 @@ class ReactiveTransport(GenericTransport):
     reactions when source terms are added.
 
     """
+    # Shared by all instances, since they regenerate models on shared objects
+    _props_lock = threading.RLock()
+    # Fields solved for by other algorithms, see _update_iterative_props
+    _snapshot = None
 
     def __init__(self, settings={}, phase=None, **kwargs):
         super().__init__(**kwargs)
@@ -99,6 +172,7 @@ class ReactiveTransport(GenericTransport):
         self.settings.update(settings)
         if phase is not None:
             self.settings['phase'] = phase.name
+        self.residual_history = []
 
     def run(self, x0=None):
         r"""
@@ -209,23 +283,34 @@ class ReactiveTransport(GenericTransport):
         phase. This method was implemented relaxing one of the OpenPNM
         rules of algorithms not being able to write into phases.
 
+        The updates are done while holding a lock, so algorithms can be
+        solved on separate threads.  If ``_snapshot`` is set, to a ``dict``
+        of the fields being solved for by other algorithms at the same time,
+        these are put on the phase as well, and the properties depending on
+        them are also regenerated.  So the result does not depend on how far
+        the other algorithms have progressed.
+
         """
         phase = self.project.phases()[self.settings['phase']]
         physics = self.project.find_physics(phase=phase)
         geometries = self.project.geometries().values()
+        snapshot = {} if self._snapshot is None else self._snapshot
         # Regenerate iterative props with new guess
         iterative_props = self._get_iterative_props()
         if len(iterative_props) > 0:
-            # Put quantity on phase so physics finds it when regenerating
-            key = self.settings['quantity']
-            phase[key] = self[key]
-            phase.regenerate_models(propnames=iterative_props)
-            for geometry in geometries:
-                geometry.regenerate_models(iterative_props)
-            for phys in physics:
-                phys.regenerate_models(iterative_props)
-
-    def _apply_sources(self):
+            with self._props_lock:
+                for key, vals in snapshot.items():
+                    phase[key] = vals
+                # Put quantity on phase so physics finds it when regenerating
+                key = self.settings['quantity']
+                phase[key] = self[key]
+                phase.regenerate_models(propnames=iterative_props)
+                for geometry in geometries:
+                    geometry.regenerate_models(iterative_props)
+                for phys in physics:
+                    phys.regenerate_models(iterative_props)
+
+    def _apply_sources(self, sources=None):
         """r
         Update ``A`` and ``b`` applying source terms to specified pores.
 
@@ -251,10 +336,33 @@ class ReactiveTransport(GenericTransport):
         also depend on the time scheme. So, ``_correct_apply_sources()`` needs to
         be run afterwards to correct the already applied relaxed source terms.
 
+        ``sources`` is the list returned by ``_get_relaxed_sources``, which
+        is called if it's not given.
+
+        """
+        if sources is None:
+            sources = self._get_relaxed_sources()
+        for Ps, S1, S2 in sources:
+            # Modify A and b based on "relaxed" S1/S2
+            datadiag = self._A.diagonal().copy()
+            datadiag[Ps] = datadiag[Ps] - S1
+            self._A.setdiag(datadiag)
+            self._b[Ps] = self._b[Ps] + S2
+
+    def _get_relaxed_sources(self):
+        r"""
+        Returns a list containing the pores, and the relaxed S1 and S2, of
+        each source term, which are also written back to the phase
+
+        Notes
+        -----
+        This reads and writes the phase, so must be called while holding
+        ``_props_lock`` when algorithms are solved on separate threads.
+
         """
         phase = self.project.phases()[self.settings['phase']]
         w = self.settings['relaxation_source']
-
+        sources = []
         for item in self.settings['sources']:
             element, prop = item.split(".")
             _item = ".".join([element, "_" + prop])
@@ -268,14 +376,11 @@ class ReactiveTransport(GenericTransport):
             # Source term relaxation
             S1 = phase[item + '.S1'][Ps] = w * S1 + (1.0 - w) * X1
             S2 = phase[item + '.S2'][Ps] = w * S2 + (1.0 - w) * X2
-            # Modify A and b based on "relaxed" S1/S2
-            datadiag = self._A.diagonal().copy()
-            datadiag[Ps] = datadiag[Ps] - S1
-            self._A.setdiag(datadiag)
-            self._b[Ps] = self._b[Ps] + S2
+            sources.append((Ps, S1, S2))
             # Replace old values of S1/S2 by their current values
             self[_item + ".S1.old"] = phase[item + ".S1"]
             self[_item + ".S2.old"] = phase[item + ".S2"]
+        return sources
 
     def _run_reactive(self, x0):
         r"""
@@ -305,22 +410,24 @@ class ReactiveTransport(GenericTransport):
         algorithm divergence.
 
         """
-        w = self.settings['relaxation_quantity']
         quantity = self.settings['quantity']
         max_it = self.settings['nlin_max_iter']
         # Write initial guess to algorithm obj (for _update_iterative_props to work)
         self[quantity] = x = x0
         # Update A and b based on self[quantity]
         self._update_A_and_b()
+        self.residual_history = [self._get_residual()]
         # Just in case you got a lucky guess, i.e. x0!
         if self._is_converged():
             logger.info(f'Solution converged: {self._get_residual():.4e}')
             return x
 
+        update = self._get_nlin_update()
         for itr in range(max_it):
             # Solve, use relaxation, and update solution on algorithm obj
-            self[quantity] = x = self._solve(x0=x) * w + x * (1 - w)
+            self[quantity] = x = update(x)
             self._update_A_and_b()
+            self.residual_history.append(self._get_residual())
             # Check solution convergence
             if self._is_converged():
                 logger.info(f'Solution converged: {self._get_residual():.4e}')
@@ -330,23 +437,64 @@ class ReactiveTransport(GenericTransport):
         if not self._is_converged():
             raise Exception(f"Not converged after {max_it} iterations.")
 
+    def _get_nlin_update(self):
+        r"""
+        Returns a function which solves the present linearized system and
+        returns the next guess of the nonlinear iterations, according to
+        ``nlin_method`` and the relaxation settings
+
+        Notes
+        -----
+        The function relies on ``residual_history`` being updated after each
+        iteration to adapt the relaxation factor when ``relaxation_adaptive``
+        is ``True``.
+
+        """
+        method = self.settings['nlin_method']
+        if method not in ['picard', 'anderson']:
+            raise Exception(f'Unsupported nlin_method: {method}')
+        w_max = self.settings['relaxation_quantity']
+        mixer = AndersonMixing(depth=self.settings['nlin_anderson_depth'])
+        state = {'w': w_max}
+
+        def update(x):
+            res = self.residual_history
+            if self.settings['relaxation_adaptive'] and (len(res) > 1):
+                if res[-1] > res[-2]:
+                    state['w'] = state['w']/2
+                    mixer.reset()
+                else:
+                    state['w'] = min(state['w']*1.5, w_max)
+            w = state['w']
+            if method == 'anderson':
+                return mixer.update(x, self._solve(x0=x), w=w)
+            return self._solve(x0=x) * w + x * (1 - w)
+
+        return update
+
     def _update_A_and_b(self):
         r"""
         Updates A and b based on the most recent solution stored on
         algorithm object.
         """
-        # Update iterative properties on phase, geometries, and physics
-        self._update_iterative_props()
-        # Build A and b, apply BCs/source terms
-        self._build_A()
+        with self._props_lock:
+            # Update iterative properties on phase, geometries, and physics
+            self._update_iterative_props()
+            # Read everything needed from the phase while holding the lock
+            phase = self.project.phases()[self.settings['phase']]
+            g = np.array(phase[self.settings['conductance']], dtype=float)
+            sources = self._get_relaxed_sources()
+        # The rest only changes this algorithm, so is done outside the lock
+        self._build_A(g=g)
         self._build_b()
         self._apply_BCs()
-        self._apply_sources()
+        self._apply_sources(sources=sources)
 
-    def _get_iterative_props(self):
+    def _get_iterative_props(self, quantities=None):
         r"""
         Find and return properties that need to be iterated while running
-        the algorithm.
+        the algorithm, i.e. those depending on its 'quantity' or on any of
+        the given ``quantities``, which default to those in ``_snapshot``.
 
         Notes
         -----
@@ -366,8 +514,11 @@ class ReactiveTransport(GenericTransport):
             dg = nx.compose(dg, g.models.dependency_graph(deep=True))
         for p in physics:
             dg = nx.compose(dg, p.models.dependency_graph(deep=True))
-        base_props = [self.settings["quantity"]]
-        if base_props is None:
+        if quantities is None:
+            quantities = [] if self._snapshot is None else self._snapshot
+        base_props = [self.settings["quantity"]] + list(quantities)
+        base_props = [item for item in base_props if item in dg.nodes]
+        if len(base_props) == 0:
             return []
         # Find all props downstream that rely on "quantity"
         dg = nx.DiGraph(nx.edge_dfs(dg, source=base_props))
@@ -375,11 +526,7 @@ class ReactiveTransport(GenericTransport):
             return []
         iterative_props = list(nx.dag.lexicographical_topological_sort(dg))
         # "quantity" shouldn't be in the returned list but "variable_props" should
-        try:
-            iterative_props.remove(self.settings["quantity"])
-        except ValueError:
-            pass
-        return iterative_props
+        return [item for item in iterative_props if item not in base_props]
 
     @docstr.dedent
     def _set_BC(self, pores, bctype, bcvalues=None, mode='merge'):
@@ -1,5 +1,6 @@
 import numpy as np
 from openpnm.algorithms import NernstPlanckMultiphysicsSolver
+from openpnm.algorithms.TransientReactiveTransport import Checkpoint
 from openpnm.utils import logging, Docorator, GenericSettings, nbr_to_str
 docstr = Docorator()
 logger = logging.getLogger(__name__)
@@ -32,6 +33,9 @@ class TransientNernstPlanckMultiphysicsSolverSettings(GenericSettings):
     t_tolerance = 1e-06
     t_precision = 12
     t_scheme = 'implicit'
+    t_checkpoint_file = None
+    t_checkpoint_interval = None
+    t_checkpoint_wall_time = None
 
 
 class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
@@ -51,9 +55,22 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
         c = TransientNernstPlanckMultiphysicsSolverSettings()
         self.settings._update_settings_and_docs(c)
         self.settings.update(settings)
+        self._b_step = {}
 
-    def run(self, t=None):
+    def run(self, t=None, resume_from=None):
         r"""
+        Runs the transient simulation
+
+        Parameters
+        ----------
+        t : scalar
+            The time to start the simulation from. If no time is specified, the
+            simulation starts from 't_initial' defined in the settings.
+        resume_from : str or path
+            The name of a checkpoint file saved by an earlier run (see
+            't_checkpoint_file').  The simulation continues from the time,
+            fields and stored solutions in the checkpoint, and ``t`` is
+            ignored.
 
         """
         print('―'*80)
@@ -76,6 +93,34 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
                 except KeyError:
                     alg.set_IC(0)
 
+        state = None
+        if resume_from is not None:
+            state = Checkpoint.load(resume_from)
+            t = float(state['t'])
+            for alg in algs:
+                prefix = alg.name + '|'
+                for k in state.keys():
+                    if k.startswith(prefix):
+                        alg[k[len(prefix):]] = state[k]
+                phase[alg.settings['quantity']] = alg[alg.settings['quantity']]
+            # Bring the models that depend on the restored fields up to date
+            for alg in algs:
+                alg._update_iterative_props()
+            for obj in self.project.find_physics(phase=phase):
+                obj.regenerate_models()
+
+        # Setup algorithms transient settings
+        for e in e_alg:
+            sets = {'t_initial': self.settings['t_initial'],
+                    't_final': self.settings['t_final'],
+                    't_step': self.settings['t_step'],
+                    't_output': self.settings['t_output'],
+                    't_tolerance': self.settings['t_tolerance'],
+                    't_precision': self.settings['t_precision'],
+                    't_scheme': self.settings['t_scheme'],
+                    }
+            e.settings.update(sets)
+
         for e in e_alg:
             # Save A matrix of the steady sys of eqs (WITHOUT BCs applied)
             e._build_A()
@@ -96,22 +141,18 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
         for alg in algs:
             alg._update_iterative_props()
 
-        # Setup algorithms transient settings
-        for e in e_alg:
-            sets = {'t_initial': self.settings['t_initial'],
-                    't_final': self.settings['t_final'],
-                    't_step': self.settings['t_step'],
-                    't_output': self.settings['t_output'],
-                    't_tolerance': self.settings['t_tolerance'],
-                    't_precision': self.settings['t_precision'],
-                    't_scheme': self.settings['t_scheme'],
-                    }
-            e.settings.update(sets)
-
-        self._run_transient(t=t)
+        self._run_transient(t=t, resume=state)
 
-    def _run_transient(self, t):
+    def _run_transient(self, t, resume=None):
         r"""
+        Marches in time from ``t``, or from the state in ``resume`` loaded
+        from a checkpoint, running Gummel iterations at each time step
+
+        Notes
+        -----
+        With Gummel iterations the conductances of the ions are updated once
+        per time step.  With 'newton' coupling they are updated along with
+        the potential, so the time stepping is fully implicit.
 
         """
         # Phase, potential and ions algorithms
@@ -130,6 +171,10 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
         s = self.settings['t_scheme']
         g_tol = self.settings['g_tol']
         g_max_iter = int(self.settings['g_max_iter'])
+        newton = self.settings['coupling'] == 'newton'
+        self.n_solves = 0
+        self.n_residuals = 0
+        self._check_workers(e_alg)
         # Initialize residuals & old/new fields for time marching
         t_res = {}
         t_old = {}
@@ -138,6 +183,18 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
             t_res[alg.name] = 1e+06
             t_old[alg.name] = None
             t_new[alg.name] = None
+        # Output times are counted from the start of the resumed simulation
+        t_start = t
+        if resume is not None:
+            t_start = float(resume['t_start'])
+            for alg in algs:
+                t_res[alg.name] = float(resume['t_res|' + alg.name])
+        checkpoint = None
+        if self.settings['t_checkpoint_file'] is not None:
+            checkpoint = Checkpoint(
+                filename=self.settings['t_checkpoint_file'],
+                interval=self.settings['t_checkpoint_interval'],
+                wall_time=self.settings['t_checkpoint_wall_time'], t=t)
 
         if isinstance(to, (float, int)):
             # Make sure 'tf' and 'to' are multiples of 'dt'
@@ -145,7 +202,7 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
             to = to + (dt-(to % dt))*((to % dt) != 0)
             self.settings['t_final'] = tf
             self.settings['t_output'] = to
-            out = np.arange(t+to, tf, to)
+            out = np.arange(t_start+to, tf, to)
         elif isinstance(to, (np.ndarray, list)):
             out = np.array(to)
         out = np.append(out, tf)
@@ -163,9 +220,10 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
         else:  # Do time iterations
             # Export the initial field (t=t_initial)
             t_str = nbr_to_str(nbr=t, t_precision=self.settings['t_precision'])
-            for alg in algs:
-                quant_init = alg[alg.settings['quantity']]
-                alg[alg.settings['quantity']+'@'+t_str] = quant_init
+            if resume is None:
+                for alg in algs:
+                    quant_init = alg[alg.settings['quantity']]
+                    alg[alg.settings['quantity']+'@'+t_str] = quant_init
             time = t + dt
             for time in np.arange(t+dt, tf+dt, dt):
                 t_r = [float(format(i, '.3g')) for i in t_res.values()]
@@ -178,58 +236,77 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
                     for alg in algs:  # Save the current fields
                         t_old[alg.name] = alg[alg.settings['quantity']].copy()
 
-                    # Initialize residuals & old/new fields for Gummel iterats
-                    g_res = {}
-                    g_old = {}
-                    g_new = {}
-                    for alg in algs:
-                        g_res[alg.name] = 1e+03
-                        g_old[alg.name] = None
-                        g_new[alg.name] = None
-
-                    # Iterate (Gummel) until solutions converge
-                    for itr in range(g_max_iter):
-                        g_r = [float(format(i, '.3g')) for i in g_res.values()]
-                        g_r = str(g_r)[1:-1]
-                        print('Start Gummel iter: ' + str(itr+1)
-                              + ', residuals: ' + g_r)
-                        g_convergence = max(i for i in g_res.values()) < g_tol
-                        if not g_convergence:
-                            # Ions
-                            for e in e_alg:
-                                g_old[e.name] = (
-                                    e[e.settings['quantity']].copy())
-
-                                e._t_run_reactive(x0=g_old[e.name])
-                                g_new[e.name] = (
-                                    e[e.settings['quantity']].copy()
+                    if newton:
+                        # The part of b from the previous time step
+                        for e in e_alg:
+                            e._t_update_b()
+                            self._b_step[e.name] = e._b.copy()
+                        self._run_newton(p_alg=p_alg, e_alg=e_alg)
+                        self._b_step = {}
+                    else:
+                        # Initialize residuals & old/new fields for Gummel
+                        g_res = {}
+                        g_old = {}
+                        g_new = {}
+                        for alg in algs:
+                            g_res[alg.name] = 1e+03
+                            g_old[alg.name] = None
+                            g_new[alg.name] = None
+
+                        # Iterate (Gummel) until solutions converge
+                        for itr in range(g_max_iter):
+                            g_r = [float(format(i, '.3g'))
+                                   for i in g_res.values()]
+                            g_r = str(g_r)[1:-1]
+                            print('Start Gummel iter: ' + str(itr+1)
+                                  + ', residuals: ' + g_r)
+                            g_convergence = max(g_res.values()) < g_tol
+                            if not g_convergence:
+                                # Ions
+                                for e in e_alg:
+                                    g_old[e.name] = (
+                                        e[e.settings['quantity']].copy())
+                                self._run_ions(e_alg=e_alg, x0=g_old,
+                                               transient=True)
+                                for e in e_alg:
+                                    self.n_solves += (
+                                        len(e.residual_history) - 1)
+                                    self.n_residuals += (
+                                        len(e.residual_history))
+                                    g_new[e.name] = (
+                                        e[e.settings['quantity']].copy()
+                                    )
+                                    # Residual
+                                    g_res[e.name] = np.sum(np.absolute(
+                                        g_old[e.name]**2 - g_new[e.name]**2))
+                                    phase.update(e.results())
+
+                                # Charge conservation eq
+                                for obj in phys:
+                                    obj.regenerate_models()
+                                g_old[p_alg.name] = (
+                                    p_alg[p_alg.settings['quantity']].copy())
+                                p_alg._run_reactive(x0=g_old[p_alg.name])
+                                self.n_solves += (
+                                    len(p_alg.residual_history) - 1)
+                                self.n_residuals += (
+                                    len(p_alg.residual_history))
+                                g_new[p_alg.name] = (
+                                    p_alg[p_alg.settings['quantity']].copy()
                                 )
                                 # Residual
-                                g_res[e.name] = np.sum(np.absolute(
-                                    g_old[e.name]**2 - g_new[e.name]**2))
-                                phase.update(e.results())
-
-                            # Charge conservation eq
-                            for obj in phys:
-                                obj.regenerate_models()
-                            g_old[p_alg.name] = (
-                                p_alg[p_alg.settings['quantity']].copy())
-                            p_alg._run_reactive(x0=g_old[p_alg.name])
-                            g_new[p_alg.name] = (
-                                p_alg[p_alg.settings['quantity']].copy()
-                            )
-                            # Residual
-                            g_res[p_alg.name] = np.sum(np.absolute(
-                                g_old[p_alg.name]**2 - g_new[p_alg.name]**2))
-                            # Update phase and physics
-                            phase.update(p_alg.results())
-                            for obj in phys:
-                                obj.regenerate_models()
-
-                        elif g_convergence:
-                            print('Solution for time step: ' + str(time)
-                                  + ' s converged')
-                            break
+                                g_res[p_alg.name] = np.sum(np.absolute(
+                                    g_old[p_alg.name]**2
+                                    - g_new[p_alg.name]**2))
+                                # Update phase and physics
+                                phase.update(p_alg.results())
+                                for obj in phys:
+                                    obj.regenerate_models()
+
+                            elif g_convergence:
+                                print('Solution for time step: ' + str(time)
+                                      + ' s converged')
+                                break
 
                     for alg in algs:  # Save new fields & compute t residuals
                         t_new[alg.name] = alg[alg.settings['quantity']].copy()
@@ -239,13 +316,21 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
 
                     # Output transient solutions. Round time to ensure every
                     # value in outputs is exported.
-                    if round(time, t_pre) in out:
+                    output = round(time, t_pre) in out
+                    if output:
                         t_str = nbr_to_str(nbr=time,
                                            t_precision=self.settings['t_precision'])
                         print('\nExporting time step: ' + str(time) + ' s')
                         for alg in algs:
                             alg[alg.settings['quantity']+'@'+t_str] = (
                                 t_new[alg.name])
+                    if (checkpoint is not None) and checkpoint.due(time, output):
+                        state = {'t_start': t_start}
+                        for alg in algs:
+                            state['t_res|' + alg.name] = t_res[alg.name]
+                            for k in alg.props():
+                                state[alg.name + '|' + k] = alg[k]
+                        checkpoint.save(time, state)
 
                     # Update A matrix of the steady sys of eqs (WITHOUT BCs)
                     for e in e_alg:
@@ -278,3 +363,38 @@ class TransientNernstPlanckMultiphysicsSolver(NernstPlanckMultiphysicsSolver):
                 print('\nMaximum time step reached: '+str(time)+' s')
             else:
                 print('\nTransient solver converged after: '+str(time)+' s')
+            logger.info(f'Linear systems solved: {self.n_solves}, residual'
+                        + f' evaluations: {self.n_residuals}')
+
+    def _get_newton_guess(self, algs):
+        r"""
+        Does one Gummel iteration within the present time step
+        """
+        phase = self.project.phases()[self.settings['phase']]
+        for alg in algs[1:] + algs[:1]:
+            x0 = alg[alg.settings['quantity']].copy()
+            if alg.name in self._b_step.keys():
+                alg._t_run_reactive(x0=x0)
+            else:
+                alg._run_reactive(x0=x0)
+            self.n_solves += len(alg.residual_history) - 1
+            self.n_residuals += len(alg.residual_history)
+            phase.update(alg.results())
+            for obj in self.project.find_physics(phase=phase):
+                obj.regenerate_models()
+
+    def _get_newton_system(self, alg):
+        r"""
+        Returns ``A`` and ``b`` of the given algorithm for the present time
+        step, with BCs and source terms applied
+        """
+        if alg.name not in self._b_step.keys():
+            return super()._get_newton_system(alg)
+        alg._build_A()
+        alg._A_steady = alg._A.copy()
+        alg._t_update_A()
+        alg._b = self._b_step[alg.name].copy()
+        alg._apply_BCs()
+        alg._apply_sources()
+        alg._correct_apply_sources()
+        return alg.A.tocsr(), alg.b.copy()
@@ -1,4 +1,10 @@
+import os
+import time as _time
 import numpy as np
+import scipy.sparse as sparse
+from scipy.linalg import expm
+from scipy.sparse.linalg import splu
+import xml.etree.ElementTree as ET
 from decimal import Decimal as dc
 from openpnm.algorithms import ReactiveTransport
 from openpnm.utils import logging, GenericSettings, Docorator
@@ -60,7 +66,50 @@ class TransientReactiveTransportSettings(GenericSettings):
         The time discretization scheme. Three options available: 'steady'
         to perform a steady-state simulation, and 'implicit' (fast, 1st
         order accurate) and 'cranknicolson' (slow, 2nd order accurate) both
-        for transient simulations. The default value is 'implicit'.
+        for transient simulations. The default value is 'implicit'.  For
+        linear problems without sources or rate BCs, 'exponential' can be
+        used to find the exact solution at the output times directly,
+        without marching through each 't_step'; other problems are then
+        solved with 'implicit'.
+    t_adaptive : bool
+        If ``True``, the time step is adapted to keep the local error below
+        't_adaptive_tol', starting from 't_step'.  The error of each step is
+        estimated from the difference between the 'implicit' and
+        'cranknicolson' solutions, so each step takes two solves.  Steps are
+        shortened to land exactly on the output times given by 't_output'
+        and 't_final'.  The default value is ``False``.
+    t_adaptive_tol : scalar
+        The largest local error allowed in each step when 't_adaptive' is
+        ``True``, relative to the largest magnitude of the 'quantity'.  The
+        default value is 1e-3.
+    t_step_min : scalar
+        The smallest time step allowed when 't_adaptive' is ``True``.  If
+        not given, 't_step' / 1000 is used.
+    t_step_max : scalar
+        The largest time step allowed when 't_adaptive' is ``True``.  If not
+        given, the step is only limited by the output times.
+    t_store_keys : bool
+        If ``True`` each stored solution is also written to the algorithm as
+        'quantity@time', which keeps a second copy of it.  The default is
+        ``False``, since all stored solutions are kept in the
+        ``time_series`` attribute, from which ``results`` reads them, so
+        they reach the phase, and so the ``io`` classes, as 'quantity@time'
+        either way.
+    t_store_file : str
+        The name of a file in which to keep the stored solutions as a
+        memory-mapped array, for simulations with more outputs than fit in
+        memory.  The default value is ``None``, which keeps them in memory.
+    t_checkpoint_file : str
+        The name of a file in which to save the state of the simulation
+        from time to time, so that it can be continued with
+        ``run(resume_from=...)`` if interrupted.  The default value is
+        ``None``, which turns checkpointing off.
+    t_checkpoint_interval : scalar
+        The simulated time between checkpoints.  If neither this nor
+        't_checkpoint_wall_time' are given, a checkpoint is saved at each
+        output time.
+    t_checkpoint_wall_time : scalar
+        The wall clock time in seconds between checkpoints.
 
     ----
 
@@ -84,10 +133,361 @@ class TransientReactiveTransportSettings(GenericSettings):
     t_tolerance = 1e-06
     t_precision = 12
     t_scheme = 'implicit'
+    t_adaptive = False
+    t_adaptive_tol = 1e-3
+    t_step_min = None
+    t_step_max = None
+    t_store_keys = False
+    t_store_file = None
+    t_checkpoint_file = None
+    t_checkpoint_interval = None
+    t_checkpoint_wall_time = None
     pore_volume = 'pore.volume'
     t_solns = []
 
 
+class TimeSeries:
+    r"""
+    Stores the solution of a transient simulation at a series of times in a
+    single (n_times x Np) array
+
+    Parameters
+    ----------
+    Np : int
+        The number of values stored at each time
+    chunk : int
+        The number of rows added to the array each time it fills up
+    filename : str or path, optional
+        If given, the array is held in a memory-mapped file at this location
+        rather than in memory, so long simulations on large networks are
+        limited by disk space instead of RAM.
+
+    Notes
+    -----
+    Storing a solution is a copy into the next free row of the array, which
+    avoids the validation done when writing to the algorithm's dictionary.
+    The array grows by ``chunk`` rows whenever it fills up.
+
+    """
+
+    def __init__(self, Np, chunk=64, filename=None):
+        self.Np = int(Np)
+        self.chunk = int(chunk)
+        self.filename = filename
+        self._n = 0
+        self._times = np.zeros(self.chunk, dtype=float)
+        self._buffer = self._allocate(self.chunk)
+
+    def _allocate(self, n_rows):
+        if self.filename is None:
+            buffer = np.zeros((n_rows, self.Np), dtype=float)
+            if self._n > 0:
+                buffer[:self._n] = self._buffer[:self._n]
+            return buffer
+        # Rows are contiguous, so growing the file keeps the stored rows
+        nbytes = n_rows * self.Np * np.dtype(float).itemsize
+        mode = 'r+b' if self._n > 0 else 'w+b'
+        if self._n > 0:
+            self._buffer.flush()
+        with open(self.filename, mode) as f:
+            f.truncate(nbytes)
+        return np.memmap(self.filename, dtype=float, mode='r+',
+                         shape=(n_rows, self.Np))
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def times(self):
+        r"""
+        The times at which a solution is stored
+        """
+        return self._times[:self._n]
+
+    @property
+    def data(self):
+        r"""
+        The stored solutions, one row per time
+        """
+        return self._buffer[:self._n]
+
+    def append(self, t, x):
+        r"""
+        Stores the solution ``x`` at time ``t``, replacing any solution
+        already stored at that time
+        """
+        i = np.flatnonzero(self.times == t)
+        if i.size == 0:
+            if self._n == self._buffer.shape[0]:
+                n_rows = self._n + self.chunk
+                self._buffer = self._allocate(n_rows)
+                self._times = np.resize(self._times, n_rows)
+            i = self._n
+            self._n += 1
+        else:
+            i = i[0]
+        self._times[i] = t
+        self._buffer[i] = x
+
+    def results(self, times=None):
+        r"""
+        Returns a dictionary of the stored solutions keyed by time
+
+        Parameters
+        ----------
+        times : scalar or array_like, optional
+            The times to return.  Times that are not stored are skipped.  If
+            not given all stored times are returned.
+
+        """
+        if times is None:
+            ind = np.arange(self._n)
+        else:
+            ind = [np.flatnonzero(self.times == t) for t in np.atleast_1d(times)]
+            ind = np.concatenate(ind).astype(int)
+        return {self._times[i]: np.array(self._buffer[i]) for i in ind}
+
+    def interpolate(self, t):
+        r"""
+        Returns the solution at time ``t`` found by linear interpolation
+        between the two nearest stored times
+        """
+        if self._n == 0:
+            raise Exception('No solutions have been stored')
+        order = np.argsort(self.times)
+        times = self.times[order]
+        if (t < times[0]) or (t > times[-1]):
+            raise Exception(f'{t} is outside the stored times '
+                            + f'[{times[0]}, {times[-1]}]')
+        j = min(np.searchsorted(times, t, side='right'), self._n - 1)
+        i = max(j - 1, 0)
+        ti, tj = times[i], times[j]
+        xi, xj = self._buffer[order[i]], self._buffer[order[j]]
+        if tj == ti:
+            return np.array(xi)
+        return xi + (t - ti)/(tj - ti)*(xj - xi)
+
+    def to_hdf5(self, filename, name='data'):
+        r"""
+        Writes the stored times and solutions to an HDF5 file as the datasets
+        'time' and ``name``
+        """
+        import h5py
+        order = np.argsort(self.times)
+        with h5py.File(filename, 'w') as f:
+            f.create_dataset('time', data=self.times[order])
+            dset = f.create_dataset(name, shape=(self._n, self.Np),
+                                    dtype=float, compression='gzip')
+            # Copy one row at a time so memory-mapped data is not loaded
+            for row, i in enumerate(order):
+                dset[row] = self._buffer[i]
+
+    def to_xdmf(self, network, filename, name='pore.data'):
+        r"""
+        Writes the stored solutions as a temporal collection which can be
+        viewed in Paraview
+
+        Parameters
+        ----------
+        network : OpenPNM Network object
+            The network on which the solutions were found
+        filename : str or path
+            The name of the XDMF file.  The data is written to an HDF5 file of
+            the same name with the extension '.hdf'.
+        name : str
+            The name of the solution in the files
+
+        Notes
+        -----
+        All times point to slices of a single dataset in the HDF5 file, so
+        the solutions are read directly from the stored array and written
+        only once.
+
+        """
+        import h5py
+        from pathlib import Path
+        from openpnm.io.XDMF import XDMF, create_root, create_domain, \
+            create_grid, create_time, create_attribute, create_data_item, \
+            create_geometry, create_topology
+        path = Path(filename).with_suffix('.xmf')
+        fname_hdf = path.stem + '.hdf'
+        self.to_hdf5(path.with_suffix('.hdf'), name=name)
+        with h5py.File(path.with_suffix('.hdf'), 'a') as f:
+            f['coordinates'] = network['pore.coords']
+            f['connections'] = network['throat.conns']
+        Nt = network.Nt
+        root = create_root('Xdmf')
+        domain = create_domain()
+        t_grid = create_grid(Name="TimeSeries", GridType="Collection",
+                             CollectionType="Temporal")
+        for row, t in enumerate(np.sort(self.times)):
+            grid = create_grid(Name=str(t), GridType="Uniform")
+            grid.append(create_time(mode='Single', Value=str(t)))
+            slab = create_data_item(value='', Dimensions=str(self.Np),
+                                    ItemType='HyperSlab', Type='HyperSlab')
+            slab.append(create_data_item(
+                value=f'{row} 0 1 1 1 {self.Np}', Dimensions='3 2',
+                Format='XML', DataType='Int'))
+            slab.append(create_data_item(
+                value=fname_hdf + ':/' + name,
+                Dimensions=f'{self._n} {self.Np}', Format='HDF',
+                Precision='8', DataType='Float'))
+            attr = create_attribute(Name=name, Center='Node',
+                                    AttributeType='Scalar')
+            attr.append(slab)
+            grid.append(attr)
+            topo = create_topology(TopologyType="Polyline",
+                                   NodesPerElement=str(2),
+                                   NumberOfElements=str(Nt))
+            topo.append(create_data_item(
+                value=fname_hdf + ':connections', Dimensions=f'{Nt} 2',
+                Format='HDF', NumberType='Int'))
+            geo = create_geometry(GeometryType="XYZ")
+            geo.append(create_data_item(
+                value=fname_hdf + ':coordinates', Dimensions=f'{self.Np} 3',
+                Format='HDF', DataType='Float'))
+            grid.append(topo)
+            grid.append(geo)
+            t_grid.append(grid)
+        domain.append(t_grid)
+        root.append(domain)
+        with open(path, 'w') as file:
+            file.write(XDMF._header)
+            file.write(ET.tostring(root).decode("utf-8"))
+
+
+class Checkpoint:
+    r"""
+    Decides when to save the state of a transient simulation, and saves and
+    loads it
+
+    Parameters
+    ----------
+    filename : str or path
+        The file in which the state is saved, in numpy's compressed ``npz``
+        format
+    interval : scalar, optional
+        The simulated time between checkpoints
+    wall_time : scalar, optional
+        The wall clock time in seconds between checkpoints
+    t : scalar
+        The simulated time at the start
+
+    Notes
+    -----
+    If neither ``interval`` nor ``wall_time`` are given, a checkpoint is
+    due whenever a solution is output.  Each checkpoint is first written to a
+    temporary file which then replaces ``filename``, so an interruption while
+    saving leaves the previous checkpoint intact.
+
+    """
+
+    def __init__(self, filename, interval=None, wall_time=None, t=0):
+        self.filename = str(filename)
+        self.interval = interval
+        self.wall_time = wall_time
+        self.count = 0
+        self._t = t
+        self._wall = _time.time()
+
+    def due(self, t, output=False):
+        r"""
+        Returns ``True`` if a checkpoint should be saved at time ``t``, where
+        ``output`` indicates whether a solution was just output
+        """
+        if (self.interval is None) and (self.wall_time is None):
+            return output
+        if self.interval is not None:
+            if t - self._t >= self.interval*(1 - 1e-9):
+                return True
+        if self.wall_time is not None:
+            if _time.time() - self._wall >= self.wall_time:
+                return True
+        return False
+
+    def save(self, t, state):
+        r"""
+        Saves the dictionary of arrays ``state`` along with the time ``t``
+        """
+        temp = self.filename + '.tmp'
+        with open(temp, 'wb') as f:
+            np.savez_compressed(f, t=t, **state)
+        os.replace(temp, self.filename)
+        self._t = t
+        self._wall = _time.time()
+        self.count += 1
+        logger.info(f'    Saved checkpoint at: {t} s')
+
+    @staticmethod
+    def load(filename):
+        r"""
+        Returns the state saved in ``filename`` as a dictionary of arrays
+        """
+        with np.load(filename, allow_pickle=False) as f:
+            return {k: f[k] for k in f.files}
+
+
+def expm_multiply_si(M, v, t, lu=None, tol=1e-8, max_iter=40):
+    r"""
+    Computes ``expm(t*M) @ v`` for a sparse, stiff ``M`` with a shift-and-invert
+    Krylov method
+
+    Parameters
+    ----------
+    M : sparse matrix
+        The operator, whose eigenvalues must have non-positive real parts
+    v : ND-array
+        The vector to multiply
+    t : scalar
+        The time to integrate over
+    lu : SuperLU object, optional
+        The factorization of ``I - t/10*M``, which is computed if not given
+    tol : scalar
+        The tolerance on the change in the result between iterations,
+        relative to the norm of ``v``
+    max_iter : int
+        The maximum size of the Krylov basis
+
+    Notes
+    -----
+    The Krylov basis is built from ``(I - g M)^-1`` with ``g = t/10`` rather
+    than from ``M``, so the stiff, quickly decaying modes which make
+    ``scipy.sparse.linalg.expm_multiply`` take many steps are resolved in a
+    few iterations.  See van den Eshof and Hochbruck, SIAM J. Sci. Comput.
+    27 (2006) 1438.
+
+    """
+    beta = np.linalg.norm(v)
+    if (beta == 0) or (t == 0):
+        return v.copy()
+    g = t/10
+    if lu is None:
+        lu = splu((sparse.eye(M.shape[0]) - g*M).tocsc())
+    V = np.zeros((v.size, max_iter+1))
+    H = np.zeros((max_iter+1, max_iter))
+    V[:, 0] = v/beta
+    y_old = np.zeros(0)
+    for j in range(max_iter):
+        w = lu.solve(V[:, j])
+        # Orthogonalize twice for stability
+        for _ in range(2):
+            h = V[:, :j+1].T @ w
+            w -= V[:, :j+1] @ h
+            H[:j+1, j] += h
+        H[j+1, j] = np.linalg.norm(w)
+        k = j + 1
+        T = (np.eye(k) - np.linalg.inv(H[:k, :k]))/g
+        y = beta*expm(t*T)[:, 0]
+        err = np.linalg.norm(y - np.append(y_old, 0))
+        if (H[j+1, j] < 1e-12) or (err < tol*beta):
+            return V[:, :k] @ y
+        V[:, j+1] = w/H[j+1, j]
+        y_old = y
+    logger.warning(f'expm_multiply_si not converged after {max_iter}'
+                   + f' iterations: {err/beta:.4e}')
+    return V[:, :k] @ y
+
+
 class TransientReactiveTransport(ReactiveTransport):
     r"""
     A subclass of ReactiveTransport for transient/steady-state simulations
@@ -105,7 +505,8 @@ class TransientReactiveTransport(ReactiveTransport):
     phenomena with reactions when source terms are added. It supports 3 time
     discretization schemes; 'steady' to perform a steady-state simulation, and
     'implicit' (fast, 1st order accurate) and 'cranknicolson' (slow, 2nd order
-    accurate) both for transient simulations.
+    accurate) both for transient simulations.  Linear problems without source
+    terms can also use 'exponential', which jumps straight to each output time.
 
     """
 
@@ -115,6 +516,8 @@ class TransientReactiveTransport(ReactiveTransport):
         self.settings.update(settings)
         # Initialize the steady sys of eqs A matrix
         self._A_steady = None
+        self.time_series = None
+        self._checkpoint = None
         if phase is not None:
             self.settings['phase'] = phase.name
         # Initialize the initial condition
@@ -158,7 +561,9 @@ class TransientReactiveTransport(ReactiveTransport):
         fdict = {
             'implicit':         [1.0, 1.0, 0.0],
             'cranknicolson':    [0.5, 1.0, 0.0],
-            'steady':           [1.0, 0.0, 1.0]
+            'steady':           [1.0, 0.0, 1.0],
+            # Only used when falling back to implicit time marching
+            'exponential':      [1.0, 1.0, 0.0]
         }
         if scheme is None:
             raise Exception("settings['t_scheme'] hasn't been set.")
@@ -179,6 +584,12 @@ class TransientReactiveTransport(ReactiveTransport):
     _f2 = property(fget=_get_f2)
     _f3 = property(fget=_get_f3)
 
+    def _validate_settings(self):
+        super()._validate_settings()
+        if self.settings['matrix_free']:
+            raise Exception('Matrix-free mode is not supported by transient'
+                            + ' algorithms, set matrix_free to False')
+
     def _t_update_A(self):
         r"""
         A method to update 'A' matrix at each time step according to 't_scheme'
@@ -208,7 +619,7 @@ class TransientReactiveTransport(ReactiveTransport):
             b[Ps] -= self._f2 * (1-self._f1) * phase[f"{item}.rate"][Ps]
         self._b = b
 
-    def run(self, t=None):
+    def run(self, t=None, resume_from=None):
         r"""
         Builds 'A' matrix of the steady system of equations to be used at each
         time step to build transient 'A' and 'b'. Imposes the initial
@@ -220,6 +631,11 @@ class TransientReactiveTransport(ReactiveTransport):
         t : scalar
             The time to start the simulation from. If no time is specified, the
             simulation starts from 't_initial' defined in the settings.
+        resume_from : str or path
+            The name of a checkpoint file saved by an earlier run (see
+            't_checkpoint_file').  The simulation continues from the time,
+            fields and stored solutions in the checkpoint, and ``t`` is
+            ignored.
 
         """
         logger.info('―' * 80)
@@ -244,9 +660,14 @@ class TransientReactiveTransport(ReactiveTransport):
         self._b_t = self._b.copy()
         t = self.settings['t_initial'] if t is None else t
         self._update_iterative_props()
-        self._run_transient(t=t)
+        state = None
+        if resume_from is not None:
+            state = Checkpoint.load(resume_from)
+            t = self._set_checkpoint_state(state)
+            self._update_iterative_props()
+        self._run_transient(t=t, resume=state)
 
-    def _run_transient(self, t):
+    def _run_transient(self, t, resume=None):
         """r
         Performs a transient simulation according to the specified settings
         updating 'b' and calling '_t_run_reactive' at each time step.
@@ -259,6 +680,8 @@ class TransientReactiveTransport(ReactiveTransport):
         ----------
         t : scalar
             The time to start the simulation from.
+        resume : dict
+            The state loaded from a checkpoint, if resuming a simulation.
 
         Notes
         -----
@@ -277,54 +700,313 @@ class TransientReactiveTransport(ReactiveTransport):
         quantity = self.settings['quantity']
         s = self.settings['t_scheme']
 
+        exponential = (s == 'exponential') and self._can_use_exponential()
+        if (s == 'exponential') and not exponential:
+            logger.warning('The exponential scheme requires a linear problem'
+                           + ' without sources or rate BCs, using implicit'
+                           + ' instead')
+        adaptive = self.settings['t_adaptive'] and (s != 'steady') \
+            and not exponential
+        # Output times are counted from the start of the resumed simulation
+        self._t_start = t if resume is None else float(resume['t_start'])
+        self._checkpoint = None
+        if self.settings['t_checkpoint_file'] is not None:
+            self._checkpoint = Checkpoint(
+                filename=self.settings['t_checkpoint_file'],
+                interval=self.settings['t_checkpoint_interval'],
+                wall_time=self.settings['t_checkpoint_wall_time'], t=t)
+
         if isinstance(to, (float, int)):
             # Make sure 'tf' and 'to' are multiples of 'dt'
-            tf = tf + (dt-(tf % dt))*((tf % dt) != 0)
-            to = to + (dt-(to % dt))*((to % dt) != 0)
-            self.settings['t_final'] = tf
-            self.settings['t_output'] = to
-            out = np.arange(t+to, tf, to)
+            if not (adaptive or exponential):
+                tf = tf + (dt-(tf % dt))*((tf % dt) != 0)
+                to = to + (dt-(to % dt))*((to % dt) != 0)
+                self.settings['t_final'] = tf
+                self.settings['t_output'] = to
+            out = np.arange(self._t_start+to, tf, to)
         elif isinstance(to, (np.ndarray, list)):
             out = np.array(to)
         out = np.append(out, tf)
         out = np.unique(out)
         out = np.around(out, decimals=t_pre)
 
+        if (s != 'steady') and (resume is None):
+            self.time_series = TimeSeries(
+                Np=self.Np, chunk=min(out.size + 1, 1024),
+                filename=self.settings['t_store_file'])
+
         # If solver in steady mode, do one iteration
         if s == 'steady':
             logger.info('    Running in steady mode')
             self._t_run_reactive()
+        elif adaptive:
+            # Export the initial field (t=t_initial)
+            if resume is None:
+                self._store_soln(t, self["pore.ic"])
+                self[quantity] = self["pore.ic"]
+            dt0 = None if resume is None else resume.get('t_step_adaptive')
+            self._run_transient_adaptive(t=t, out=out[out > t], dt=dt0)
+        elif exponential:
+            if resume is None:
+                self._store_soln(t, self["pore.ic"])
+                self[quantity] = self["pore.ic"]
+            self._run_transient_exponential(t=t, out=out[out > t])
         # Time marching step
         else:
             # Export the initial field (t=t_initial)
-            t_str = self._nbr_to_str(t)
-            quant_init = self["pore.ic"]
-            self[quantity + '@' + t_str] = quant_init
-            self[quantity] = quant_init
+            if resume is None:
+                quant_init = self["pore.ic"]
+                self._store_soln(t, quant_init)
+                self[quantity] = quant_init
 
             time = None
-            for time in np.arange(t+dt, tf+dt, dt):
-                logger.info(f'    Current time step: {time} s')
-                # Update A and b and apply BCs
-                self._t_update_A()
-                self._t_update_b()
-                self._apply_BCs()
-                # Save copies of A and b to be used in _t_run_reactive()
-                self._A_t = self._A.copy()
-                self._b_t = self._b.copy()
-                x_old = self[quantity]
-                self._t_run_reactive(x0=x_old)
-                x_new = self[quantity]
-                # Output transient solutions. Round time to ensure every
-                # value in outputs is exported.
-                if round(time, t_pre) in out:
-                    t_str = self._nbr_to_str(time)
-                    self[quantity + '@' + t_str] = x_new
-                    self.settings['t_solns'].append(t_str)
-                    logger.info(f'        Exporting time step: {time} s')
+            # A is the same at every step of a linear problem, so its
+            # factorization can be reused
+            self._constant_A = self._has_constant_A()
+            try:
+                for time in np.arange(t+dt, tf+dt, dt):
+                    logger.info(f'    Current time step: {time} s')
+                    # Update A and b and apply BCs
+                    self._t_update_A()
+                    self._t_update_b()
+                    self._apply_BCs()
+                    # Save copies of A and b to be used in _t_run_reactive()
+                    self._A_t = self._A.copy()
+                    self._b_t = self._b.copy()
+                    x_old = self[quantity]
+                    self._t_run_reactive(x0=x_old)
+                    x_new = self[quantity]
+                    # Output transient solutions. Round time to ensure every
+                    # value in outputs is exported.
+                    output = round(time, t_pre) in out
+                    if output:
+                        t_str = self._store_soln(time, x_new)
+                        self.settings['t_solns'].append(t_str)
+                        logger.info(f'        Exporting time step: {time} s')
+                    self._save_checkpoint(time, output=output)
+            finally:
+                self._constant_A = False
 
             logger.info(f'    Maximum time step reached: {time} s')
 
+    def _run_transient_adaptive(self, t, out, dt=None):
+        r"""
+        Marches in time from ``t`` through each of the output times in
+        ``out``, adapting the time step to the estimated local error
+
+        Notes
+        -----
+        Each step is taken with both the 'implicit' and 'cranknicolson'
+        schemes.  The solution of the scheme in ``settings`` is kept, and the
+        difference between the two, which is of order dt^2, is used as the
+        error estimate.  Steps with an error above ``t_adaptive_tol`` are
+        rejected and retried with a smaller step, unless already at
+        ``t_step_min``.  The times of the accepted steps are stored in
+        ``t_history``.  The first step is ``dt``, or 't_step' if not given.
+
+        """
+        quantity = self.settings['quantity']
+        t_pre = self.settings['t_precision']
+        tol = self.settings['t_adaptive_tol']
+        scheme = self.settings['t_scheme']
+        scheme = 'implicit' if scheme == 'exponential' else scheme
+        other = 'cranknicolson' if scheme == 'implicit' else 'implicit'
+        dt_min = self.settings['t_step_min']
+        dt_min = self.settings['t_step']/1000 if dt_min is None else dt_min
+        dt_max = self.settings['t_step_max']
+        dt_max = np.inf if dt_max is None else dt_max
+        # Keep the history when resuming from a checkpoint
+        if (dt is None) or not hasattr(self, 't_history'):
+            self.t_history = [t]
+        dt = self.settings['t_step'] if dt is None else float(dt)
+        for t_out in out:
+            while round(t_out - t, t_pre) > 0:
+                h = min(dt, t_out - t)
+                x_old = self[quantity].copy()
+                x = self._t_step(x=x_old, dt=h, scheme=scheme)
+                x_est = self._t_step(x=x_old, dt=h, scheme=other)
+                scale = max(np.amax(np.abs(x)), np.amax(np.abs(x_old)))
+                err = np.amax(np.abs(x - x_est))/scale if scale > 0 else 0.0
+                factor = 0.9*np.sqrt(tol/err) if err > 0 else 2.0
+                factor = min(2.0, max(0.2, factor))
+                if (err > tol) and (h > dt_min):
+                    logger.info(f'    Rejected time step: {h} s')
+                    self[quantity] = x_old
+                    dt = max(h*factor, dt_min)
+                    continue
+                self[quantity] = x
+                # Land exactly on the output time despite roundoff
+                t = t_out if round(t_out - t - h, t_pre) <= 0 else t + h
+                self.t_history.append(t)
+                logger.info(f'    Current time step: {t} s')
+                # Steps shortened to hit an output time don't set the next dt
+                if h == dt:
+                    dt = min(max(h*factor, dt_min), dt_max)
+                if t != t_out:
+                    self._save_checkpoint(t, t_step_adaptive=dt)
+            t_str = self._store_soln(t_out, self[quantity])
+            self.settings['t_solns'].append(t_str)
+            logger.info(f'        Exporting time step: {t_out} s')
+            self._save_checkpoint(t, output=True, t_step_adaptive=dt)
+
+    def _can_use_exponential(self):
+        r"""
+        Returns ``True`` if the problem has no source terms or rate BCs, and
+        neither the conductance nor the pore volume depend on the quantity
+        being solved for
+        """
+        if 'pore.bc_rate' in self.keys():
+            if np.isfinite(self['pore.bc_rate']).any():
+                return False
+        return self._has_constant_A()
+
+    def _has_constant_A(self):
+        r"""
+        Returns ``True`` if the problem has no source terms, and neither the
+        conductance nor the pore volume depend on the quantity being solved
+        for, so A is the same at every time step of a given size
+        """
+        props = [self.settings['conductance'], self.settings['pore_volume']]
+        iterative_props = self._get_iterative_props()
+        return (len(self.settings['sources']) == 0) \
+            and not set(props).intersection(iterative_props)
+
+    def _run_transient_exponential(self, t, out):
+        r"""
+        Finds the solution at each of the output times in ``out`` directly
+        from the matrix exponential of the steady operator
+
+        Notes
+        -----
+        For a linear problem without sources the pores not fixed by value
+        BCs obey ``V dx/dt = -A x + r``, where ``r`` is the flow from the
+        fixed pores.  The departure ``y`` from the steady solution obeys
+        ``dy/dt = M y`` with ``M = -A/V``, so each output is
+        ``expm(M (t_out - t)) y`` added to the steady solution.  This is
+        found with
+        ``expm_multiply_si``, whose cost does not depend on the stiffness of
+        ``M`` unlike ``scipy.sparse.linalg.expm_multiply``.  Output times
+        separated by the same interval share one factorization.
+
+        """
+        quantity = self.settings['quantity']
+        Vi = self.project.network[self.settings['pore_volume']]
+        A = self._A_steady.tocsr()
+        x = self[quantity].copy()
+        fixed = np.zeros(self.Np, dtype=bool)
+        if 'pore.bc_value' in self.keys():
+            fixed = np.isfinite(self['pore.bc_value'])
+        F = ~fixed
+        r = -A[F][:, fixed] @ x[fixed]
+        A = A[F][:, F]
+        M = (sparse.diags(-1/Vi[F]) @ A).tocsr()
+        # Without value BCs the steady solution is the initial one
+        x_steady = splu(A.tocsc()).solve(r) if fixed.any() else x[F]
+        y = x[F] - x_steady
+        tol = self.settings['solver_tol']
+        t_pre = self.settings['t_precision']
+        lus = {}
+        for t_out in out:
+            logger.info(f'    Current time step: {t_out} s')
+            dt = round(t_out - t, t_pre)
+            if dt not in lus.keys():
+                lus[dt] = splu((sparse.eye(M.shape[0]) - dt/10*M).tocsc())
+            y = expm_multiply_si(M, y, t=dt, lu=lus[dt], tol=tol)
+            t = t_out
+            x[F] = x_steady + y
+            self[quantity] = x
+            t_str = self._store_soln(t_out, x)
+            self.settings['t_solns'].append(t_str)
+            logger.info(f'        Exporting time step: {t_out} s')
+            self._save_checkpoint(t_out, output=True)
+
+    def _get_checkpoint_state(self):
+        r"""
+        Returns the arrays needed to continue the simulation as a dictionary
+
+        Notes
+        -----
+        This includes all numerical properties on the algorithm, such as the
+        current 'quantity' and the old source term values, except for the
+        stored solutions, which are taken from ``time_series``.
+
+        """
+        state = {k: self[k] for k in self.props() if '@' not in k}
+        state['t_start'] = self._t_start
+        state['t_solns'] = np.array(self.settings['t_solns'], dtype=str)
+        state['residual_history'] = np.array(self.residual_history)
+        if self.time_series is not None:
+            state['time_series.times'] = self.time_series.times
+            state['time_series.data'] = self.time_series.data
+        if hasattr(self, 't_history'):
+            state['t_history'] = np.array(self.t_history)
+        return state
+
+    def _set_checkpoint_state(self, state):
+        r"""
+        Restores the state returned by ``_get_checkpoint_state`` and returns
+        the time at which it was saved
+        """
+        for k in state.keys():
+            if k.startswith(('pore.', 'throat.')):
+                self[k] = state[k]
+        self.settings['t_solns'] = [str(i) for i in state['t_solns']]
+        self.residual_history = list(state['residual_history'])
+        if 't_history' in state.keys():
+            self.t_history = list(state['t_history'])
+        self.time_series = None
+        if 'time_series.times' in state.keys():
+            self.time_series = TimeSeries(
+                Np=self.Np, filename=self.settings['t_store_file'])
+            for t, x in zip(state['time_series.times'],
+                            state['time_series.data']):
+                self._store_soln(t, x)
+        return float(state['t'])
+
+    def _save_checkpoint(self, t, output=False, **kwargs):
+        r"""
+        Saves a checkpoint at time ``t`` if one is due, along with any arrays
+        given as keyword arguments
+        """
+        if (self._checkpoint is None) or not self._checkpoint.due(t, output):
+            return
+        state = self._get_checkpoint_state()
+        state.update(kwargs)
+        self._checkpoint.save(t, state)
+
+    def _store_soln(self, t, x):
+        r"""
+        Stores the solution ``x`` at time ``t`` in ``time_series``, and on the
+        algorithm if ``t_store_keys`` is ``True``.  Returns the time as a
+        string.
+        """
+        t = round(t, self.settings['t_precision'])
+        t_str = self._nbr_to_str(t)
+        self.time_series.append(t, x)
+        if self.settings['t_store_keys']:
+            self[self.settings['quantity'] + '@' + t_str] = x
+        return t_str
+
+    def _t_step(self, x, dt, scheme):
+        r"""
+        Takes a single time step of size ``dt`` from the solution ``x``
+        using the given scheme, and returns the new solution
+        """
+        quantity = self.settings['quantity']
+        temp = {k: self.settings[k] for k in ['t_step', 't_scheme']}
+        self.settings.update({'t_step': dt, 't_scheme': scheme})
+        try:
+            self[quantity] = x
+            self._t_update_A()
+            self._t_update_b()
+            self._apply_BCs()
+            self._A_t = self._A.copy()
+            self._b_t = self._b.copy()
+            self._t_run_reactive(x0=x)
+        finally:
+            self.settings.update(temp)
+        return self[quantity].copy()
+
     def _t_run_reactive(self, x0=None):
         """r
         Repeatedly updates transient 'A', 'b', and the solution guess within
@@ -349,28 +1031,33 @@ class TransientReactiveTransport(ReactiveTransport):
 
         """
         quantity = self.settings['quantity']
-        w = self.settings['relaxation_quantity']
         max_it = int(self.settings['nlin_max_iter'])
         x = np.zeros(self.Np, dtype=float) if x0 is None else x0.copy()
 
         # Write initial guess to algorithm for _update_iterative_props to work
         self[quantity] = x
+        self.residual_history = []
+        update = self._get_nlin_update()
         for itr in range(max_it):
-            # Update iterative properties on phase and physics
-            self._update_iterative_props()
-            # Build A and b, apply source terms and correct according to scheme
+            with self._props_lock:
+                # Update iterative properties on phase and physics
+                self._update_iterative_props()
+                sources = self._get_relaxed_sources()
+            # Build A and b, apply source terms and correct them
+            # according to scheme
             self._A = self._A_t.copy()
             self._b = self._b_t.copy()
-            self._apply_sources()
-            self._correct_apply_sources()
+            self._apply_sources(sources=sources)
+            self._correct_apply_sources(sources=sources)
             # Compute the residual
             res = self._get_residual()
+            self.residual_history.append(res)
             if itr >= 1 and self._is_converged():
                 logger.info(f'Solution converged: {res:.4e}')
                 return x
             logger.info(f'Tolerance not met: {res:.4e}')
             # Solve, use relaxation, and update solution on algorithm obj
-            self[quantity] = x = self._solve(x0=x) * w + x * (1 - w)
+            self[quantity] = x = update(x)
         # Check solution convergence after max_it iterations
         if not self._is_converged():
             raise Exception(f"Not converged after {max_it} iterations.")
@@ -397,12 +1084,22 @@ class TransientReactiveTransport(ReactiveTransport):
         -----
         The keyword steps is interpreted in the same way as times.
 
+        Solutions are read from ``time_series`` where available, so they are
+        returned even if ``t_store_keys`` is ``False``.  Use
+        ``time_series.interpolate`` to get the solution between the stored
+        times.
+
         """
         if 'steps' in kwargs.keys():
             times = kwargs['steps']
         t_pre = self.settings['t_precision']
         quantity = self.settings['quantity']
+        series = {}
+        if self.time_series is not None:
+            for i, ti in enumerate(self.time_series.times):
+                series[quantity + '@' + self._nbr_to_str(ti)] = i
         q = [k for k in list(self.keys()) if quantity in k]
+        q += [k for k in series.keys() if k not in q]
         if times is None:
             t = q
         elif times in ['final', 'actual']:
@@ -424,7 +1121,12 @@ class TransientReactiveTransport(ReactiveTransport):
                                      np.around(strd_t, decimals=t_pre))
             if missing_t.size != 0:
                 logger.warning('Time(s) '+str(missing_t)+' not stored.')
-        d = {k: self[k] for k in t}
+        d = {}
+        for k in t:
+            if k in series.keys():
+                d[k] = np.array(self.time_series.data[series[k]])
+            else:
+                d[k] = self[k]
         return d
 
     def _nbr_to_str(self, nbr, t_pre=None):
@@ -446,21 +1148,27 @@ class TransientReactiveTransport(ReactiveTransport):
         nbr_str = str(int(round(nbr, t_pre)*10**n)) + ('e-'+str(n))*(n != 0)
         return nbr_str
 
-    def _correct_apply_sources(self):
+    def _correct_apply_sources(self, sources=None):
         """r
         Update 'A' and 'b' correcting the already applied source terms to
         specified pores
 
         Notes
         -----
-        Correction (built for transient simulations) depends on the time scheme
+        Correction (built for transient simulations) depends on the time scheme.
+        ``sources`` is the list of already applied relaxed source terms, as
+        returned by ``_get_relaxed_sources``, if not given they're fetched
+        from the phase.
 
         """
-        phase = self.project.phases()[self.settings['phase']]
-        for item in self.settings['sources']:
-            Ps = self.pores(item)
-            # Fetch already added relaxed source term
-            S1, S2 = [phase[item + '.' + x][Ps] for x in ['S1', 'S2']]
+        if sources is None:
+            phase = self.project.phases()[self.settings['phase']]
+            sources = []
+            for item in self.settings['sources']:
+                Ps = self.pores(item)
+                S1, S2 = [phase[item + '.' + x][Ps] for x in ['S1', 'S2']]
+                sources.append((Ps, S1, S2))
+        for Ps, S1, S2 in sources:
             # Correct S1 and S2 in A and b as a function of t_scheme
             datadiag = self._A.diagonal().copy()
             datadiag[Ps] = datadiag[Ps] - S1 + self._f1*S1
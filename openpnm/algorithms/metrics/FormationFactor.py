@@ -101,24 +101,29 @@ class FormationFactor(GenericMetric):
             phys = GenericPhysics(network=self.network,
                                   phase=phase, geometry=geom)
             phys.add_model(propname='throat.diffusive_conductance', model=mod)
+        Diff = FickianDiffusion(network=self.project.network, phase=phase)
+        # Solve all directions together to share the assembly of A
+        sets = {}
+        for bcs in self.settings['inlets'].keys():
+            vals = np.ones(self.network.Np)*np.nan
+            vals[self.network.pores(self.settings['inlets'][bcs])] = 1.0
+            vals[self.network.pores(self.settings['outlets'][bcs])] = 0.0
+            sets[bcs] = {'pore.bc_value': vals}
+        res = Diff.run_batch(bcs=sets)
         for bcs in self.settings['inlets'].keys():
-            Diff = FickianDiffusion(network=self.project.network, phase=phase)
             Pin = self.network.pores(self.settings['inlets'][bcs])
-            Diff.set_value_BC(pores=Pin, values=1.0)
             Pout = self.network.pores(self.settings['outlets'][bcs])
-            Diff.set_value_BC(pores=Pout, values=0.0)
-            Diff.run()
             A = self.settings['areas'][bcs]
             if A is None:
-                A = Diff._get_domain_area()
+                A = Diff._get_domain_area(inlets=Pin, outlets=Pout)
                 self.settings['areas'][bcs] = A
             L = self.settings['lengths'][bcs]
             if L is None:
-                L = Diff._get_domain_length()
+                L = Diff._get_domain_length(inlets=Pin, outlets=Pout)
                 self.settings['lengths'][bcs] = L
-            R = Diff.rate(pores=Pin)
+            R = np.sum(res[bcs]['pore.rate'][Pin])
             Deff = R*L/A  # Conc gradient and diffusivity were both unity
-            self.results[bcs] = 1/Deff[0]
+            self.results[bcs] = 1/Deff
 
     def set_inlets(self, direction, label):
         r"""
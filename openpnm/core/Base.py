@@ -1,12 +1,17 @@
 import warnings
 import uuid
+import itertools
 import numpy as np
 from collections import namedtuple
 from openpnm.utils import Workspace, logging
+from openpnm.utils.Project import PropertyIndex
 from openpnm.utils.misc import PrintableList, PrintableDict, SettingsDict, Docorator
 docstr = Docorator()
 logger = logging.getLogger(__name__)
 ws = Workspace()
+# Each write to an array is stamped with the next value of this counter.  The
+# start is randomized so stamps remain unique for objects loaded from file.
+_version_counter = itertools.count(uuid.uuid4().int >> 64)
 
 
 class ParamMixin:
@@ -135,6 +140,8 @@ class Base(dict):
         instance.settings = SettingsDict()
         instance.settings['name'] = None
         instance.settings['_uuid'] = str(uuid.uuid4())
+        # Initialize the dictionary of version stamps for each array
+        instance._versions = {}
         return instance
 
     def __init__(self, Np=0, Nt=0, name=None, project=None, network=None, settings={}):
@@ -185,28 +192,28 @@ class Base(dict):
             raise Exception('All keys must start with either pore, or throat')
 
         # Check 2: If adding a new key, make sure it has no conflicts
-        if self.project:
-            proj = self.project
+        proj = self.project
+        if proj:
             boss = proj.find_full_domain(self)
-            keys = boss.keys(mode='all', deep=True)
+            index = proj._get_key_index(boss)
         else:
             boss = None
-            keys = self.keys()
+            index = PropertyIndex()
+            index.add(self.keys())
         # Prevent 'pore.foo.bar' when 'pore.foo' present
-        long_keys = [i for i in keys if i.count('.') > 1]
         key_root = '.'.join(key.split('.')[:2])
-        if (key.count('.') > 1) and (key_root in keys):
+        if (key.count('.') > 1) and (key_root in index):
             raise Exception('Cannot create ' + key + ' when '
                             + key_root + ' is already defined')
         # Prevent 'pore.foo' when 'pore.foo.bar' is present
-        if (key.count('.') == 1) and any([i.startswith(key) for i in long_keys]):
-            hit = [i for i in keys if i.startswith(key)][0]
+        if (key.count('.') == 1) and (key in index.roots):
+            hit = [i for i in index.keys() if i.startswith(key + '.')][0]
             raise Exception('Cannot create ' + key + ' when '
                             + hit + ' is already defined')
         # Prevent writing pore.foo on boss when present on subdomain
         if boss:
             if boss is self and (key not in ['pore.all', 'throat.all']):
-                if (key in keys) and (key not in self.keys()):
+                if (key in index) and (key not in self.keys()):
                     raise Exception('Cannot create ' + key + ' when it is'
                                     + ' already defined on a subdomain')
 
@@ -214,14 +221,12 @@ class Base(dict):
         if not isinstance(value, np.ndarray):
             value = np.array(value, ndmin=1)  # Convert value to an ndarray
 
+        new_key = key not in self.keys()
         # Skip checks for 'coords', 'conns'
         if key in ['pore.coords', 'throat.conns']:
             super(Base, self).__setitem__(key, value)
-            return
-
         # Skip checks for protected props, and prevent changes if defined
-        protected_keys = ['all']
-        if key.split('.')[1] in protected_keys:
+        elif key.split('.')[1] in ['all']:
             if key in self.keys():
                 if np.shape(self[key]) == (0, ):
                     super(Base, self).__setitem__(key, value)
@@ -229,19 +234,68 @@ class Base(dict):
                     warnings.warn(key+' is already defined.')
             else:
                 super(Base, self).__setitem__(key, value)
-            return
-
         # Write value to dictionary
-        if np.shape(value)[0] == 1:  # If value is scalar
+        elif np.shape(value)[0] == 1:  # If value is scalar
             value = np.ones((self._count(element), ), dtype=value.dtype)*value
             super(Base, self).__setitem__(key, value)
         elif np.shape(value)[0] == self._count(element):
             super(Base, self).__setitem__(key, value)
+        elif self._count(element) == 0:
+            super(Base, self).__setitem__(key, value)
         else:
-            if self._count(element) == 0:
-                self.update({key: value})
-            else:
-                raise Exception('Provided array is wrong length for ' + key)
+            raise Exception('Provided array is wrong length for ' + key)
+        self._versions[key] = next(_version_counter)
+        if proj and new_key:
+            proj._update_key_index(self, [key], mode='add')
+        if proj and self._isa() in ['network', 'phase']:
+            # Labels named after subdomains define their locations
+            name = key.split('.')[-1]
+            for obj in proj:
+                if (obj.name == name) and hasattr(obj, '_locations'):
+                    obj._locations.clear()
+                    proj._invalidate_associations()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._versions.pop(key, None)
+        self._update_key_index([key], mode='remove')
+
+    def pop(self, key, *args):
+        r"""
+        A subclassed version of the standard dict's pop method that keeps the
+        Project's index of key names up to date
+        """
+        present = key in self.keys()
+        vals = super().pop(key, *args)
+        if present:
+            self._versions.pop(key, None)
+            self._update_key_index([key], mode='remove')
+        return vals
+
+    def popitem(self):
+        key, vals = super().popitem()
+        self._versions.pop(key, None)
+        self._update_key_index([key], mode='remove')
+        return key, vals
+
+    def update(self, *args, **kwargs):
+        r"""
+        A subclassed version of the standard dict's update method that keeps
+        the Project's index of key names up to date.  Note that the values
+        are written directly, bypassing the checks in ``__setitem__``.
+        """
+        temp = dict(*args, **kwargs)
+        new_keys = [k for k in temp.keys() if k not in self.keys()]
+        super().update(temp)
+        for k in temp.keys():
+            self._versions[k] = next(_version_counter)
+        if new_keys:
+            self._update_key_index(new_keys, mode='add')
+
+    def _update_key_index(self, keys, mode):
+        proj = self.project
+        if proj:
+            proj._update_key_index(self, keys, mode=mode)
 
     def __getitem__(self, key):
         element, prop = key.split('.', 1)
@@ -281,6 +335,8 @@ class Base(dict):
         if validate:
             self.project._validate_name(name)
         self.settings['name'] = name
+        self.project._invalidate_key_index()
+        self.project._invalidate_associations()
         # Rename any label arrays in other objects
         for item in self.project:
             if 'pore.' + old_name in item.keys():
@@ -792,7 +848,10 @@ class Base(dict):
             arrs.append(None)
 
         # Obtain list of locations for inserting values
-        locs = [self._get_indices(element, item.name) for item in sources]
+        if self._isa() in ['network', 'phase']:
+            locs = [item._get_global_indices(element) for item in sources]
+        else:
+            locs = [self._get_indices(element, item.name) for item in sources]
 
         if np.all([item is None for item in arrs]):  # prop not found anywhere
             raise KeyError(prop)
@@ -1258,6 +1317,27 @@ class LegacyMixin:
         t = namedtuple('index_map', ('indices', 'mask'))
         return t(ind, mask)
 
+    def _map_locations(self, element, locations, origin, filtered):
+        # Between a subdomain and its full domain use the cached location
+        # indices of the subdomain, rather than searching the ids
+        ind = None
+        if (self.project is not None) and (origin.project is self.project):
+            if ('Subdomain' in self._mro()) \
+                    and (self.project.find_full_domain(self) is origin):
+                ind = self._get_local_indices(element)[locations]
+            elif ('Subdomain' in origin._mro()) \
+                    and (self.project.find_full_domain(origin) is self):
+                ind = origin._get_global_indices(element)[locations]
+        if ind is None:
+            ids = origin[element+'._id'][locations]
+            return self._map(element=element, ids=ids, filtered=filtered)
+        ind = np.array(ind, dtype=np.int64, ndmin=1)
+        mask = ind >= 0
+        if filtered:
+            return ind[mask]
+        t = namedtuple('index_map', ('indices', 'mask'))
+        return t(ind, mask)
+
     def map_pores(self, pores, origin, filtered=True):
         r"""
         Given a list of pore on a target object, finds indices of those pores
@@ -1289,8 +1369,8 @@ class LegacyMixin:
         map_throats
 
         """
-        ids = origin['pore._id'][pores]
-        return self._map(element='pore', ids=ids, filtered=filtered)
+        return self._map_locations(element='pore', locations=pores,
+                                   origin=origin, filtered=filtered)
 
     def map_throats(self, throats, origin, filtered=True):
         r"""
@@ -1323,8 +1403,8 @@ class LegacyMixin:
         map_pores
 
         """
-        ids = origin['throat._id'][throats]
-        return self._map(element='throat', ids=ids, filtered=filtered)
+        return self._map_locations(element='throat', locations=throats,
+                                   origin=origin, filtered=filtered)
 
     def check_data_health(self):
         r"""
@@ -1538,47 +1618,61 @@ class LabelMixin:
             raise Exception('Cannot proceed without {}.all'.format(element))
 
         # Begin computing label array
-        if mode in ['or', 'any', 'union']:
-            union = np.zeros_like(self[element+'.all'], dtype=bool)
-            for item in labels:  # Iterate over labels and collect all indices
-                union = union + self[element+'.'+item.split('.')[-1]]
-            ind = union
-        elif mode in ['and', 'all', 'intersection']:
-            intersect = np.ones_like(self[element+'.all'], dtype=bool)
-            for item in labels:  # Iterate over labels and collect all indices
-                intersect = intersect*self[element+'.'+item.split('.')[-1]]
-            ind = intersect
-        elif mode in ['xor', 'exclusive_or']:
-            xor = np.zeros_like(self[element+'.all'], dtype=int)
-            for item in labels:  # Iterate over labels and collect all indices
-                info = self[element+'.'+item.split('.')[-1]]
-                xor = xor + np.int8(info)
-            ind = (xor == 1)
-        elif mode in ['nor', 'not', 'none']:
-            nor = np.zeros_like(self[element+'.all'], dtype=int)
-            for item in labels:  # Iterate over labels and collect all indices
-                info = self[element+'.'+item.split('.')[-1]]
-                nor = nor + np.int8(info)
-            ind = (nor == 0)
-        elif mode in ['nand']:
-            nand = np.zeros_like(self[element+'.all'], dtype=int)
-            for item in labels:  # Iterate over labels and collect all indices
-                info = self[element+'.'+item.split('.')[-1]]
-                nand = nand + np.int8(info)
-            ind = (nand < len(labels)) * (nand > 0)
-        elif mode in ['xnor', 'nxor']:
-            xnor = np.zeros_like(self[element+'.all'], dtype=int)
-            for item in labels:  # Iterate over labels and collect all indices
-                info = self[element+'.'+item.split('.')[-1]]
-                xnor = xnor + np.int8(info)
-            ind = (xnor > 1)
-        else:
-            raise Exception('Unsupported mode: '+mode)
+        masks = [self[element+'.'+item.split('.')[-1]] for item in labels]
+        ind = self._combine_labels(masks=masks, mode=mode,
+                                   size=self[element+'.all'].shape[0])
         # Extract indices from boolean mask
         ind = np.where(ind)[0]
         ind = ind.astype(dtype=int)
         return ind
 
+    @staticmethod
+    def _combine_labels(masks, mode, size):
+        r"""
+        Combines a list of boolean label arrays according to the logic given
+        by ``mode``, and returns the result as a boolean mask
+
+        Notes
+        -----
+        The masks are packed into bits using ``np.packbits`` and combined
+        with bitwise operations, so each intermediate array uses 1 bit per
+        pore or throat.  The modes which count the number of labels present
+        at each location are found by tracking which bits are set at least
+        once and at least twice.
+        """
+        modes = {'or': 'any', 'any': 'any', 'union': 'any',
+                 'and': 'all', 'all': 'all', 'intersection': 'all',
+                 'xor': 'xor', 'exclusive_or': 'xor',
+                 'nor': 'nor', 'not': 'nor', 'none': 'nor',
+                 'nand': 'nand',
+                 'xnor': 'xnor', 'nxor': 'xnor'}
+        if mode not in modes.keys():
+            raise Exception('Unsupported mode: '+mode)
+        mode = modes[mode]
+        once = np.zeros(((size + 7) // 8, ), dtype=np.uint8)
+        twice = np.zeros_like(once) if mode in ['xor', 'xnor'] else None
+        every = ~once if mode in ['all', 'nand'] else None
+        for mask in masks:
+            bits = np.packbits(mask)
+            if twice is not None:
+                np.bitwise_or(twice, once & bits, out=twice)
+            if every is not None:
+                np.bitwise_and(every, bits, out=every)
+            np.bitwise_or(once, bits, out=once)
+        if mode == 'any':
+            bits = once
+        elif mode == 'all':
+            bits = every
+        elif mode == 'xor':
+            bits = once & ~twice
+        elif mode == 'nor':
+            bits = ~once
+        elif mode == 'nand':
+            bits = once & ~every
+        elif mode == 'xnor':
+            bits = twice
+        return np.unpackbits(bits, count=size).astype(bool)
+
     def pores(self, labels='all', mode='or', asmask=False, target=None):
         r"""
         Returns pore indicies where given labels exist, according to the logic
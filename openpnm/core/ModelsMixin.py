@@ -1,4 +1,7 @@
+import time
+import hashlib
 import inspect
+from collections import OrderedDict
 import numpy as np
 from openpnm.utils import PrintableDict, logging, Workspace
 from openpnm.utils.misc import is_valid_propname
@@ -7,6 +10,97 @@ logger = logging.getLogger(__name__)
 ws = Workspace()
 
 
+def _update_hash(h, value):
+    r"""
+    Updates the given hash object with the contents of ``value``
+    """
+    if isinstance(value, np.ndarray) and (value.dtype != object):
+        h.update(repr((value.dtype.str, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).view(np.uint8))
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update_hash(h, item)
+    else:
+        h.update(repr(value).encode())
+
+
+class ModelCache(OrderedDict):
+    r"""
+    Stores the results of models keyed by a fingerprint of their inputs,
+    discarding the least recently used results once their total size
+    exceeds ``max_size``
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of bytes to be held in the cache.  The default
+        is 100 MB.
+
+    Notes
+    -----
+    The number of times a stored result was found or not found is given by
+    ``hits`` and ``misses``.  Copies of the arrays are stored and returned
+    so that editing the values on the object does not alter the cache.
+
+    """
+
+    def __init__(self, max_size=1e8):
+        super().__init__()
+        self.max_size = max_size
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def fetch(self, key):
+        r"""
+        Returns a copy of the result stored under ``key``, or ``None`` if
+        not found
+        """
+        if key in self.keys():
+            self.hits += 1
+            self.move_to_end(key)
+            return self._copy(self[key])
+        self.misses += 1
+
+    def store(self, key, vals):
+        r"""
+        Stores a copy of ``vals`` under ``key``, then discards the least
+        recently used results until the cache is below ``max_size``
+        """
+        vals = self._copy(vals)
+        if key in self.keys():
+            self.nbytes -= self._nbytes(self.pop(key))
+        self[key] = vals
+        self.nbytes += self._nbytes(vals)
+        while (self.nbytes > self.max_size) and (len(self) > 0):
+            _, old = self.popitem(last=False)
+            self.nbytes -= self._nbytes(old)
+
+    def _copy(self, vals):
+        # Models may return a dict of arrays (i.e. size factors)
+        if isinstance(vals, dict):
+            return {k: self._copy(v) for k, v in vals.items()}
+        return np.array(vals, copy=True, subok=True, ndmin=1)
+
+    def _nbytes(self, vals):
+        if isinstance(vals, dict):
+            return sum([self._nbytes(v) for v in vals.values()])
+        return vals.nbytes
+
+    def clear(self):
+        super().clear()
+        self.nbytes = 0
+
+    @property
+    def stats(self):
+        r"""
+        A dictionary containing the number of hits, misses, stored results
+        and bytes held by the cache
+        """
+        return PrintableDict({'hits': self.hits, 'misses': self.misses,
+                              'count': len(self), 'nbytes': self.nbytes})
+
+
 class ModelsDict(PrintableDict):
     r"""
     This subclassed dictionary is assigned to the ``models`` attribute of
@@ -197,6 +291,27 @@ class ModelsDict(PrintableDict):
 
         return ax
 
+    @property
+    def cache(self):
+        r"""
+        The ``ModelCache`` holding the results of models whose ``regen_mode``
+        is 'cached', along with the hit and miss statistics
+        """
+        if not hasattr(self, '_cache'):
+            self._cache = ModelCache()
+        return self._cache
+
+    @property
+    def timings(self):
+        r"""
+        A dictionary containing the wall time in seconds taken by the most
+        recent run of each model
+        """
+        if not hasattr(self, '_timings'):
+            self._timings = PrintableDict()
+            self._timings._value = "Time [s]"
+        return self._timings
+
     def __str__(self):
         horizontal_rule = '―' * 85
         lines = [horizontal_rule]
@@ -304,6 +419,10 @@ class ModelsMixin:
             to the ``regenerate_models`` method.  This allows full control
             of when the model is run.
 
+            *'cached'* - Is run like 'normal', but the results are stored in
+            ``models.cache`` and reused when the model is called again with
+            identical parameters and input values.
+
         """
         if propname in kwargs.values():  # Prevent infinite loops of look-ups
             raise Exception(propname+' can\'t be both dependency and propname')
@@ -327,7 +446,8 @@ class ModelsMixin:
         if regen_mode not in ['deferred', 'explicit']:
             self._regen(propname)
 
-    def regenerate_models(self, propnames=None, exclude=[], deep=False):
+    def regenerate_models(self, propnames=None, exclude=[], deep=False,
+                          workers=None):
         r"""
         Re-runs the specified model or models.
 
@@ -350,10 +470,46 @@ class ModelsMixin:
             The default is ``False``.  The method does not work in reverse,
             so regenerating models on a Physics will not update a Phase.
 
+        workers : int, optional
+            If given, the models are run on a pool of this many threads
+            instead of one after the other (see Notes).  The default is
+            ``None``, which runs the models serially.
+
+        Notes
+        -----
+        When ``workers`` is given, the models to be run on all objects are
+        combined into a single dependency graph, and models that do not
+        depend on each other are run concurrently.  This is only beneficial
+        for models that spend most of their time in numpy functions which
+        release the GIL.  The values are written to the objects once each
+        group of concurrent models has finished.  In either case, the wall
+        time taken by each model is stored in ``models.timings``.
+
+        If ``settings['skip_unchanged_models']`` is ``True`` then a model is
+        only rerun if its parameters or any of the arrays named in its
+        parameters have been written since it was last run.  Since models are
+        called in order of the dependency graph, rerunning one model will
+        cause those downstream of it to be rerun as well.  Arrays that are
+        edited in-place (i.e. ``phase['pore.temperature'][0] = 350``) are not
+        detected as changed, which is why this is not the default.
+
+        """
+        tasks = self._get_regen_tasks(propnames=propnames, exclude=exclude,
+                                      deep=deep)
+        if workers is None:
+            for obj, prop in tasks:
+                obj._regen(prop)
+        else:
+            self._regen_concurrently(tasks=tasks, workers=workers)
+
+    def _get_regen_tasks(self, propnames=None, exclude=[], deep=False):
+        r"""
+        Returns a list of (object, propname) tuples in the order that
+        ``regenerate_models`` would run them
         """
         # If empty list of propnames was given, do nothing and return
         if isinstance(propnames, list) and len(propnames) == 0:
-            return
+            return []
         if isinstance(propnames, str):  # Convert string to list if necessary
             propnames = [propnames]
         if propnames is None:  # If no props given, then regenerate them all
@@ -371,24 +527,63 @@ class ModelsMixin:
         else:
             # Make list of given propnames that are not in self
             other_models = list(set(propnames).difference(set(self_models)))
-        # The following has some redundant lines, but is easier to understand
+        # Start with the models on self
+        tasks = [(self, item) for item in propnames]
+        # Then add models on associated objects, if any in other_models
         if self._isa('phase'):
-            # Start be regenerating models on self
-            for item in propnames:
-                self._regen(item)
-            # Then regen models on associated objects, if any in other_models
-            for phys in self.project.find_physics(phase=self):
-                phys.regenerate_models(propnames=other_models, deep=False)
-        elif self._isa('network'):  # Repeat for other object types
-            for item in propnames:
-                self._regen(item)
-            for geom in self.project.geometries().values():
-                geom.regenerate_models(propnames=other_models, deep=False)
+            others = self.project.find_physics(phase=self)
+        elif self._isa('network'):
+            others = self.project.geometries().values()
         else:
-            for item in propnames:
-                self._regen(item)
+            others = []
+        for obj in others:
+            tasks.extend(obj._get_regen_tasks(propnames=other_models,
+                                              deep=False))
+        return tasks
+
+    def _regen_concurrently(self, tasks, workers):
+        r"""
+        Runs the given (object, propname) tasks on a pool of threads,
+        respecting the dependencies between models on all objects
+        """
+        import networkx as nx
+        from concurrent.futures import ThreadPoolExecutor
+
+        objs = {obj.name: obj for obj, prop in tasks}
+        dg = nx.DiGraph()
+        dg.add_nodes_from([(obj.name, prop) for obj, prop in tasks])
+        # Models may use values produced by models on other objects, so any
+        # task producing a dependency must be run before the dependent one
+        producers = {}
+        for name, prop in dg.nodes:
+            producers.setdefault(prop, []).append(name)
+        for name in objs.keys():
+            deps = objs[name].models.dependency_graph(deep=True)
+            for node in [n for n in dg.nodes if n[0] == name]:
+                for dep in deps.predecessors(node[1]):
+                    for producer in producers.get(dep, []):
+                        dg.add_edge((producer, dep), node)
+        cycles = list(nx.simple_cycles(dg))
+        if cycles:
+            raise Exception('Cyclic dependency found: ' + ' -> '.join(
+                            [str(i) for i in cycles[0] + [cycles[0][0]]]))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for group in nx.topological_generations(dg):
+                group = sorted(group)
+                futures = [pool.submit(objs[name]._run_model, prop)
+                           for name, prop in group]
+                # Values are written only once all running models are done
+                for (name, prop), future in zip(group, futures):
+                    objs[name]._store_model_result(prop, future.result())
 
     def _regen(self, prop):
+        self._store_model_result(prop, self._run_model(prop))
+
+    def _run_model(self, prop):
+        r"""
+        Runs the model for the given propname and returns the result, or
+        ``None`` if the model should not be or could not be run
+        """
         # Create a temporary dict of all model arguments
         try:
             kwargs = self.models[prop].copy()
@@ -399,23 +594,143 @@ class ModelsMixin:
         model = kwargs.pop('model')
         regen_mode = kwargs.pop('regen_mode', None)
         # Only regenerate model if regen_mode is correct
+        vals = None
+        tic = time.perf_counter()
         if self.settings['freeze_models']:
             # Don't run ANY models if freeze_models is set to True
             msg = (f"{prop} was not run since freeze_models is set to"
                    " True in object settings.")
             logger.warning(prettify_logger_message(msg))
+            return
         elif regen_mode == 'constant':
             # Only regenerate if data not already in dictionary
             if prop not in self.keys():
-                self[prop] = model(target=self, **kwargs)
+                vals = model(target=self, **kwargs)
+        elif self.settings['skip_unchanged_models'] \
+                and self._model_is_current(prop):
+            logger.debug(f"{prop} was not run since its inputs are unchanged")
         else:
             try:
-                self[prop] = model(target=self, **kwargs)
+                if regen_mode == 'cached':
+                    key = self._get_model_fingerprint(prop)
+                    vals = self.models.cache.fetch(key)
+                    if vals is None:
+                        vals = model(target=self, **kwargs)
+                        self.models.cache.store(key, vals)
+                else:
+                    vals = model(target=self, **kwargs)
             except KeyError as e:
                 msg = (f"{prop} was not run since the following property"
                        f" is missing: {e}")
                 logger.error(prettify_logger_message(msg))
                 self.models[prop]['regen_mode'] = 'deferred'
+        if vals is not None:
+            self.models.timings[prop] = time.perf_counter() - tic
+        return vals
+
+    def _store_model_result(self, prop, vals):
+        if vals is not None:
+            self[prop] = vals
+            self._model_stamps[prop] = self._get_model_stamp(prop)
+
+    def _get_model_deps(self, prop):
+        r"""
+        Returns the set of propnames which appear in the given model's
+        parameters, along with the labels of the locations of a subdomain
+        on its full domain, since moving it changes the model's inputs
+        """
+        deps = set()
+        for param in self.models[prop].values():
+            for item in (param if type(param) == list else [param]):
+                if is_valid_propname(item):
+                    deps.add(item)
+        if 'Subdomain' in self._mro():
+            deps.update(['pore.' + self.name, 'throat.' + self.name])
+        return deps
+
+    def _get_model_fingerprint(self, prop):
+        r"""
+        Returns a hash of the given model's function, parameters and the
+        values of the arrays named in its parameters, as well as the
+        locations of a subdomain, for use as the key in ``models.cache``
+
+        Notes
+        -----
+        As in ``_get_model_stamp``, the input arrays are looked up on all
+        objects in the project.  Their values rather than their versions
+        are hashed so that a previous state can be recognized after the
+        inputs have been overwritten with it.
+        """
+        params = self.models[prop].copy()
+        params.pop('regen_mode', None)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((prop, self.Np, self.Nt)).encode())
+        for k in sorted(params.keys()):
+            h.update(k.encode())
+            _update_hash(h, params[k])
+        deps = self._get_model_deps(prop)
+        for obj in self.project:
+            for key in sorted(obj.keys()):
+                if '.'.join(key.split('.')[:2]) in deps:
+                    h.update((obj.name + key).encode())
+                    _update_hash(h, dict.get(obj, key))
+        return h.hexdigest()
+
+    def _get_model_stamp(self, prop):
+        r"""
+        Returns the parameters of the given model along with the version
+        stamps of its output and of the arrays named in its parameters
+
+        Notes
+        -----
+        Input arrays are looked up on all objects in the project since
+        models often fetch values from associated objects (i.e. a physics
+        reading ``'pore.temperature'`` from its phase).  This is
+        conservative, so a change to an unrelated array of the same name
+        will cause the model to be rerun.
+        """
+        params = self.models[prop].copy()
+        params.pop('regen_mode', None)
+        deps = self._get_model_deps(prop)
+        versions = {}
+        for obj in self.project:
+            for key, version in obj._versions.items():
+                if '.'.join(key.split('.')[:2]) in deps:
+                    versions[(obj.name, key)] = version
+        # Models returning a dict are stored as several nested arrays
+        output = {k: v for k, v in self._versions.items()
+                  if (k == prop) or k.startswith(prop + '.')}
+        return params, versions, output
+
+    def _model_is_current(self, prop):
+        r"""
+        Returns ``True`` if neither the parameters nor the inputs of the
+        given model have changed since it was last run, and its output has
+        not been overwritten or deleted since
+        """
+        if prop not in self._model_stamps.keys():
+            return False
+        old_params, old_versions, old_output = self._model_stamps[prop]
+        params, versions, output = self._get_model_stamp(prop)
+        if (len(output) == 0) or (output != old_output):
+            return False
+        if versions != old_versions:
+            return False
+        if params.keys() != old_params.keys():
+            return False
+        for k in params.keys():
+            try:
+                if not np.array_equal(params[k], old_params[k]):
+                    return False
+            except Exception:
+                return False
+        return True
+
+    @property
+    def _model_stamps(self):
+        if not hasattr(self, '_model_stamps_dict'):
+            self._model_stamps_dict = {}
+        return self._model_stamps_dict
 
     def remove_model(self, propname=None, mode=['model', 'data']):
         r"""
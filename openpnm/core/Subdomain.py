@@ -16,6 +16,12 @@ class Subdomain(Base, LegacyMixin, LabelMixin):
 
     """
 
+    def __new__(cls, *args, **kwargs):
+        instance = super(Subdomain, cls).__new__(cls, *args, **kwargs)
+        # Initialize dictionary of cached global and local location indices
+        instance._locations = {}
+        return instance
+
     def __getitem__(self, key):
         element = key.split('.')[0]
         # Try to get vals directly first
@@ -23,7 +29,7 @@ class Subdomain(Base, LegacyMixin, LabelMixin):
         if vals is None:  # Otherwise invoke search
             # Find boss object (either phase or network)
             boss = self.project.find_full_domain(self)
-            inds = boss._get_indices(element=element, labels=self.name)
+            inds = self._get_global_indices(element=element)
             try:  # Will invoke interleave data if necessary
                 vals = boss[key]  # Will return nested dict if present
                 if isinstance(vals, dict):  # Index into each array in nested dict
@@ -41,14 +47,50 @@ class Subdomain(Base, LegacyMixin, LabelMixin):
         if self.project and not hasattr(value, 'keys'):
             proj = self.project
             boss = proj.find_full_domain(self)
-            keys = boss.keys(mode='all', deep=True)
+            index = proj._get_key_index(boss)
             # Prevent 'pore.foo' on subdomain when already present on boss
-            if key in set(boss.keys()).difference(set(self.keys())):
-                hit = [i for i in keys if i.startswith(key)][0]
+            if (key in index) and (key in boss.keys()) \
+                    and (key not in self.keys()):
                 raise Exception('Cannot create ' + key + ' when '
-                                + hit + ' is already defined')
+                                + key + ' is already defined')
         super().__setitem__(key, value)
 
+    def _get_global_indices(self, element):
+        r"""
+        Returns the indices of the pores or throats on the full domain object
+        (i.e. Network or Phase) to which this object is assigned
+
+        Notes
+        -----
+        The indices are cached to avoid searching the label array on the full
+        domain object each time data is mapped between the two.  The cache is
+        cleared by ``set_locations``, by ``topotools.trim`` and ``extend``,
+        and whenever the label array named after this object is written on
+        the full domain.  Editing that label array in-place is not detected.
+
+        """
+        element = self._parse_element(element, single=True)
+        if element not in self._locations:
+            boss = self.project.find_full_domain(self)
+            inds = np.where(boss[element + '.' + self.name])[0]
+            self._locations[element] = inds
+        return self._locations[element]
+
+    def _get_local_indices(self, element):
+        r"""
+        Returns an array the length of the full domain containing the local
+        index of each pore or throat on this object, or -1 where the
+        location is not assigned to this object
+        """
+        element = self._parse_element(element, single=True)
+        if element + '.local' not in self._locations:
+            inds = self._get_global_indices(element)
+            boss = self.project.find_full_domain(self)
+            local = np.ones((boss._count(element), ), dtype=int)*-1
+            local[inds] = np.arange(inds.size)
+            self._locations[element + '.local'] = local
+        return self._locations[element + '.local']
+
     @property
     def _domain(self):
         try:
@@ -161,3 +203,4 @@ class Subdomain(Base, LegacyMixin, LabelMixin):
 
         # Finally assign mask to boss
         boss[element + '.' + self.name] = np.copy(mask)
+        self._locations.clear()
@@ -114,6 +114,7 @@ class GenericPhysics(ParamMixin, Subdomain, ModelsMixin):
             phase['pore.'+self.name] = old_phase.pop('pore.'+self.name, False)
             phase['throat.'+self.name] = old_phase.pop('throat.'+self.name, False)
             self.clear()
+            self._locations.clear()
         elif mode in ['add']:
             temp = None
             try:
@@ -131,6 +132,7 @@ class GenericPhysics(ParamMixin, Subdomain, ModelsMixin):
             self.phase.pop('pore.' + self.name, None)
             self.phase.pop('throat.' + self.name, None)
             self.clear()
+            self._locations.clear()
 
     def _set_geo(self, geo):
         if geo is None:
@@ -192,11 +194,13 @@ class GenericPhysics(ParamMixin, Subdomain, ModelsMixin):
             Ts = self.network.throats(geometry.name)
             self.set_locations(pores=Ps, throats=Ts, mode='add')
             phase.set_label(label=self.name, pores=Ps, throats=Ts, mode='add')
+            self.project._invalidate_associations()
         elif mode in ['drop']:
             phase.set_label(label=self.name, mode='clear')
             self.update({'pore.all': np.array([], dtype=bool)})
             self.update({'throat.all': np.array([], dtype=bool)})
             self.clear()
+            self._locations.clear()
         elif mode in ['move']:
             phys = self.project.find_physics(phase=phase, geometry=geometry)
             phys.set_geometry(mode='drop')
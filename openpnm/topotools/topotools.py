@@ -266,6 +266,10 @@ def trim(network, pores=[], throats=[]):
     # Clear adjacency and incidence matrices which will be out of date now
     network._am.clear()
     network._im.clear()
+    # Clear cached subdomain locations which will be out of date as well
+    for obj in network.project:
+        if hasattr(obj, '_locations'):
+            obj._locations.clear()
 
 
 def extend(network, coords=[], conns=[], labels=[], **kwargs):
@@ -354,6 +358,10 @@ def extend(network, coords=[], conns=[], labels=[], **kwargs):
     # Clear adjacency and incidence matrices which will be out of date now
     network._am.clear()
     network._im.clear()
+    # Clear cached subdomain locations which will be out of date as well
+    for obj in network.project:
+        if hasattr(obj, '_locations'):
+            obj._locations.clear()
 
 
 def reduce_coordination(network, z):
@@ -623,6 +631,10 @@ def clone_pores(network, pores, labels=['clone'], mode='parents'):
     # Clear adjacency and incidence matrices which will be out of date now
     network._am.clear()
     network._im.clear()
+    # Clear cached subdomain locations which will be out of date as well
+    for obj in network.project:
+        if hasattr(obj, '_locations'):
+            obj._locations.clear()
 
 
 def merge_networks(network, donor=[]):
@@ -715,6 +727,10 @@ def merge_networks(network, donor=[]):
     # Clear adjacency and incidence matrices which will be out of date now
     network._am.clear()
     network._im.clear()
+    # Clear cached subdomain locations which will be out of date as well
+    for obj in network.project:
+        if hasattr(obj, '_locations'):
+            obj._locations.clear()
 
 
 def stitch(network, donor, P_network, P_donor, method='nearest',
@@ -64,6 +64,8 @@ class Project(list):
                 if item.name in self.names:
                     item.name = self._generate_name(item)
                 super().append(item)
+                self._invalidate_key_index()
+                self._invalidate_associations()
             else:
                 raise Exception('Only OpenPNM objects can be added')
 
@@ -239,6 +241,13 @@ class Project(list):
         # If phase happens to be in settings (i.e. algorithm), look it up
         if 'phase' in obj.settings.keys():
             return self.phases()[obj.settings['phase']]
+        # Look up physics in the table of associations
+        if obj._isa('physics'):
+            phase = self._get_associations()['phase'].get(obj.name)
+            if phase is None:
+                raise Exception('Cannot find a phase associated with '
+                                + obj.name)
+            return phase
         # Otherwise find it using bottom-up approach (i.e. look in phase keys)
         for item in self.phases().values():
             if ('pore.' + obj.name in item) or ('throat.' + obj.name in item):
@@ -268,10 +277,10 @@ class Project(list):
         if 'geometry' in physics.settings.keys():
             geom = self.geometries()[physics.settings['geometry']]
             return geom
-        # Otherwise, use the bottom-up approach
-        for geo in self.geometries().values():
-            if physics in self.find_physics(geometry=geo):
-                return geo
+        # Otherwise, look it up in the table of associations
+        geo = self._get_associations()['geometry'].get(physics.name)
+        if geo is not None:
+            return geo
         # If all else fails, throw an exception
         raise Exception('Cannot find a geometry associated with '+physics.name)
 
@@ -312,31 +321,25 @@ class Project(list):
 
         """
 
+        table = self._get_associations()
         if geometry is not None and phase is not None:
-            physics = self.find_physics(geometry=geometry)
-            phases = list(self.phases().values())
-            return physics[phases.index(phase)]
+            physics = table['physics'].get((geometry.name, phase.name))
+            if physics is None:
+                raise Exception('Cannot find a physics associated with '
+                                + geometry.name + ' and ' + phase.name)
+            return physics
 
         if geometry is not None and phase is None:
             result = []
-            geoPs = self.network[f'pore.{geometry.name}']
-            geoTs = self.network[f'throat.{geometry.name}']
             for _phase in self.phases().values():
-                physics = self.find_physics(phase=_phase)
-                for phys in physics:
-                    Ps = _phase.map_pores(pores=phys.Ps, origin=phys)
-                    physPs = _phase.tomask(pores=Ps)
-                    Ts = _phase.map_throats(throats=phys.Ts, origin=phys)
-                    physTs = _phase.tomask(throats=Ts)
-                    if np.all(geoPs == physPs) and np.all(geoTs == physTs):
-                        result.append(phys)
+                phys = table['physics'].get((geometry.name, _phase.name))
+                if phys is not None:
+                    result.append(phys)
             return result
 
         if geometry is None and phase is not None:
-            names = set(self.physics().keys())
-            keys = set([item.split('.')[-1] for item in phase.keys()])
-            hits = names.intersection(keys)
-            return [self.physics().get(i, None) for i in hits]
+            return [phys for phys in self.physics().values()
+                    if table['phase'].get(phys.name) is phase]
 
         return list(self.physics().values())
 
@@ -446,6 +449,135 @@ class Project(list):
                 if key.split('.')[-1] == obj.name:
                     del item[key]
         super().remove(obj)
+        self._invalidate_key_index()
+        self._invalidate_associations()
+
+    def _get_key_index(self, obj):
+        r"""
+        Returns the index of all property and label names defined on the
+        full domain object associated with ``obj`` and on its subdomains
+
+        Parameters
+        ----------
+        obj : OpenPNM object
+            Any object in the project.  The index of its full domain (i.e.
+            the Network for a Geometry, the Phase for a Physics) is returned.
+
+        Returns
+        -------
+        index : PropertyIndex
+            A dictionary of key names and the number of objects in the
+            domain on which each is defined
+
+        Notes
+        -----
+        The index is built on first use, then updated incrementally as keys
+        are written to or deleted from objects, so that checking for name
+        conflicts does not require scanning every key in the domain.
+
+        """
+        if getattr(self, '_key_index', None) is None:
+            self._key_index = {}
+        boss = self.find_full_domain(obj)
+        if boss.name not in self._key_index:
+            index = PropertyIndex()
+            for item in [boss] + list(getattr(boss, '_subdomains', [])):
+                index.add(item.keys())
+            self._key_index[boss.name] = index
+        return self._key_index[boss.name]
+
+    def _update_key_index(self, obj, keys, mode):
+        r"""
+        Records the addition or removal of keys on the given object in the
+        index of its full domain, if that index has already been built
+
+        Parameters
+        ----------
+        obj : OpenPNM object
+            The object on which the keys were added or removed
+        keys : list of strings
+            The keys that were added or removed
+        mode : string
+            Either 'add' or 'remove'
+
+        """
+        names = set(self.names)
+        if any([k.split('.')[-1] in names for k in keys]):
+            # Labels named after objects define the associations between
+            # objects, so the domains may have changed
+            self._invalidate_key_index()
+            self._invalidate_associations()
+            return
+        index = getattr(self, '_key_index', None)
+        if not index:
+            return
+        try:
+            boss = self.find_full_domain(obj)
+        except Exception:
+            # Physics without a phase, picked up if associated later on
+            return
+        if boss.name in index:
+            getattr(index[boss.name], mode)(keys)
+
+    def _invalidate_key_index(self):
+        self._key_index = None
+
+    def _get_associations(self):
+        r"""
+        Returns a dictionary describing which Phase and Geometry each Physics
+        is associated with, building it if necessary
+
+        Returns
+        -------
+        associations : dict
+            With the following keys:
+
+            * 'phase'
+                A dictionary of the Phase for each Physics name
+            * 'geometry'
+                A dictionary of the Geometry for each Physics name
+            * 'physics'
+                A dictionary of the Physics for each (Geometry name, Phase
+                name) tuple
+
+        Notes
+        -----
+        The associations are defined by the label arrays named after each
+        Physics on the Phases and after each Geometry on the Network.  The
+        table is discarded whenever objects are added, removed or renamed,
+        or such label arrays are written, and is rebuilt on the next look-up.
+
+        """
+        if getattr(self, '_associations', None) is None:
+            phases = {}
+            geometries = {}
+            physics = {}
+            for phys in self.physics().values():
+                for phase in self.phases().values():
+                    if ('pore.' + phys.name in phase.keys()) or \
+                            ('throat.' + phys.name in phase.keys()):
+                        phases[phys.name] = phase
+                        break
+                if phys.name not in phases.keys():
+                    continue
+                phase = phases[phys.name]
+                physPs = phase.get('pore.' + phys.name)
+                physTs = phase.get('throat.' + phys.name)
+                for geo in self.geometries().values():
+                    geoPs = self.network.get('pore.' + geo.name)
+                    geoTs = self.network.get('throat.' + geo.name)
+                    if np.array_equal(geoPs, physPs) and \
+                            np.array_equal(geoTs, physTs):
+                        geometries[phys.name] = geo
+                        physics[(geo.name, phase.name)] = phys
+                        break
+            self._associations = {'phase': phases,
+                                  'geometry': geometries,
+                                  'physics': physics}
+        return self._associations
+
+    def _invalidate_associations(self):
+        self._associations = None
 
     def save_object(self, obj):
         r"""
@@ -1031,6 +1163,47 @@ class Project(list):
     grid = property(fget=_get_grid, fset=_set_grid)
 
 
+class PropertyIndex(dict):
+    r"""
+    A dictionary that counts how many objects in a domain define each key
+
+    The number of nested keys (i.e. 'pore.foo.bar') under each root name
+    (i.e. 'pore.foo') is tracked in the ``roots`` attribute, so both kinds
+    of naming conflicts can be detected with a dictionary look-up.
+
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.roots = {}
+
+    def add(self, keys):
+        r"""
+        Increments the counts of the given keys
+        """
+        for key in keys:
+            self[key] = self.get(key, 0) + 1
+            if key.count('.') > 1:
+                root = '.'.join(key.split('.')[:2])
+                self.roots[root] = self.roots.get(root, 0) + 1
+
+    def remove(self, keys):
+        r"""
+        Decrements the counts of the given keys, dropping those that reach 0
+        """
+        for key in keys:
+            if self.get(key, 0) > 1:
+                self[key] -= 1
+            else:
+                self.pop(key, None)
+            if key.count('.') > 1:
+                root = '.'.join(key.split('.')[:2])
+                if self.roots.get(root, 0) > 1:
+                    self.roots[root] -= 1
+                else:
+                    self.roots.pop(root, None)
+
+
 class ProjectGrid(Tableist):
     r"""
     This is a subclass of a Tableist grid, which adds the ability to lookup
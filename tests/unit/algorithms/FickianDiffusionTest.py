@@ -1,4 +1,6 @@
+import numpy as np
 import openpnm as op
+import numpy.testing as nt
 
 
 class FickianDiffusionTest:
@@ -15,6 +17,24 @@ class FickianDiffusionTest:
                                               geometry=self.geo)
         self.phys['throat.diffusive_conductance'] = 1.0
 
+    def test_matrix_free(self):
+        self.phys['throat.diffusive_conductance'] = \
+            np.random.rand(self.net.Nt) + 0.5
+        alg = op.algorithms.FickianDiffusion(network=self.net,
+                                             phase=self.phase)
+        alg.settings.update({'solver_family': 'scipy',
+                             'solver_type': 'cg',
+                             'solver_tol': 1e-12})
+        alg.set_value_BC(pores=self.net.pores('left'), values=1.0)
+        alg.set_value_BC(pores=self.net.pores('right'), values=0.0)
+        alg.run()
+        x = alg['pore.concentration'].copy()
+        alg.settings['matrix_free'] = True
+        alg.run()
+        assert type(alg.A).__name__ == 'LaplacianOperator'
+        nt.assert_allclose(alg['pore.concentration'], x, rtol=1e-8)
+        self.phys['throat.diffusive_conductance'] = 1.0
+
     def teardown_class(self):
         ws = op.Workspace()
         ws.clear()
@@ -154,6 +154,161 @@ class GenericTransportTest:
         # Revert back changes to objects
         self.setup_class()
 
+    def test_A_template_reused_and_matches_laplacian(self):
+        from scipy.sparse.csgraph import laplacian
+        alg = op.algorithms.GenericTransport(network=self.net,
+                                             phase=self.phase)
+        alg.settings['conductance'] = 'throat.diffusive_conductance'
+        alg.settings['cache_A'] = False
+        g = np.random.rand(self.net.Nt, 2)
+        self.phys['throat.diffusive_conductance'] = g
+        alg._build_A()
+        am = self.net.create_adjacency_matrix(weights=g, fmt='coo')
+        assert alg.A.format == 'csr'
+        nt.assert_allclose((alg.A - laplacian(am)).toarray(), 0, atol=1e-14)
+        template = alg._A_template
+        self.phys['throat.diffusive_conductance'] = 2*g
+        alg._build_A()
+        # The same template is refilled with the new conductances
+        assert alg._A_template is template
+        nt.assert_allclose((alg.A - 2*laplacian(am)).toarray(), 0, atol=1e-14)
+        # Changing the topology causes the template to be rebuilt
+        net = op.network.Cubic(shape=[3, 3, 1])
+        phase = op.phases.GenericPhase(network=net)
+        phase['throat.conductance'] = 1.0
+        alg = op.algorithms.GenericTransport(network=net, phase=phase)
+        alg.settings['conductance'] = 'throat.conductance'
+        alg.settings['cache_A'] = False
+        alg._build_A()
+        template = alg._A_template
+        op.topotools.trim(network=net, throats=[0])
+        alg._build_A()
+        assert alg._A_template is not template
+        assert alg.A.nnz == net.Np + 2*net.Nt
+        # Revert back changes to objects
+        self.setup_class()
+
+    def test_BC_slots_reused_and_match_dense_elimination(self):
+        alg = op.algorithms.GenericTransport(network=self.net,
+                                             phase=self.phase)
+        alg.settings['conductance'] = 'throat.diffusive_conductance'
+        alg.settings['quantity'] = 'pore.mole_fraction'
+        alg.set_value_BC(pores=self.net.pores('left'), values=1.0)
+        alg.set_value_BC(pores=self.net.pores('right'), values=0.5)
+        alg._build_A()
+        alg._build_b()
+        A0 = alg.A.toarray()
+        alg._apply_BCs()
+        # Compare with eliminating the BC rows and columns of the dense A
+        ind = np.isfinite(alg['pore.bc_value'])
+        f = A0.diagonal().mean()
+        x_BC = np.where(ind, alg['pore.bc_value'], 0)
+        b = -A0 @ x_BC
+        b[ind] = x_BC[ind] * f
+        A0[ind, :] = 0
+        A0[:, ind] = 0
+        A0[ind, ind] = f
+        nt.assert_allclose(alg.A.toarray(), A0)
+        nt.assert_allclose(alg.b, b)
+        # The slots are reused until the BCs change
+        slots = alg._BC_slots
+        alg._build_A()
+        alg._build_b()
+        alg._apply_BCs()
+        assert alg._BC_slots is slots
+        alg.set_value_BC(pores=self.net.pores('front'), values=0.2)
+        alg._build_A()
+        alg._build_b()
+        alg._apply_BCs()
+        assert alg._BC_slots is not slots
+
+    def test_run_batch_matches_separate_runs(self):
+        alg = op.algorithms.GenericTransport(network=self.net,
+                                             phase=self.phase)
+        alg.settings['conductance'] = 'throat.diffusive_conductance'
+        alg.settings['quantity'] = 'pore.mole_fraction'
+        bcs = {}
+        for name, (inlet, val) in {'x1': ('left', 1.0),
+                                   'x2': ('left', 2.0),
+                                   'y': ('front', 1.0)}.items():
+            vals = np.ones(self.net.Np)*np.nan
+            vals[self.net.pores(inlet)] = val
+            vals[self.net.pores('right')] = 0.0
+            bcs[name] = {'pore.bc_value': vals}
+        res = alg.run_batch(bcs=bcs)
+        # BCs on the algorithm are left untouched
+        assert np.all(np.isnan(alg['pore.bc_value']))
+        for name, bc in bcs.items():
+            alg['pore.bc_value'] = bc['pore.bc_value']
+            alg.run()
+            x = alg['pore.mole_fraction']
+            nt.assert_allclose(res[name]['pore.mole_fraction'], x)
+            P = np.where(np.isfinite(bc['pore.bc_value']))[0]
+            nt.assert_allclose(res[name]['pore.rate'][P],
+                               alg.rate(pores=P, mode='single'), atol=1e-12)
+        # Explicit RHS columns are solved with the BCs on the algorithm
+        Ps = np.where(np.isnan(alg['pore.bc_value']))[0][:3]
+        r = np.zeros(self.net.Np)
+        r[Ps] = 1e-3
+        r[self.net.pores('front')] = 5.0  # Overwritten by the BCs
+        B = np.vstack([np.zeros(self.net.Np), r]).T
+        res = alg.run_batch(b=B)
+        nt.assert_allclose(res[0]['pore.mole_fraction'], x)
+        alg.set_rate_BC(pores=Ps, rates=1e-3)
+        alg.run()
+        nt.assert_allclose(res[1]['pore.mole_fraction'],
+                           alg['pore.mole_fraction'])
+        alg.remove_BC(pores=Ps)
+        with pytest.raises(Exception):
+            alg.run_batch(bcs=bcs, b=B)
+
+    def test_matrix_free_matches_assembled_A(self):
+        net = op.network.Cubic(shape=[6, 5, 4])
+        phase = op.phases.GenericPhase(network=net)
+        phase['throat.conductance'] = np.random.rand(net.Nt, 2) + 0.5
+        alg = op.algorithms.GenericTransport(network=net, phase=phase)
+        alg.settings.update({'conductance': 'throat.conductance',
+                             'quantity': 'pore.x',
+                             'solver_family': 'scipy',
+                             'solver_type': 'bicgstab',
+                             'solver_tol': 1e-12})
+        alg.set_value_BC(pores=net.pores('left'), values=1.0)
+        alg.set_value_BC(pores=net.pores('right'), values=0.0)
+        alg.set_rate_BC(pores=net.pores('front'), rates=0.1)
+        alg.run()
+        A = alg.A.toarray()
+        x = alg['pore.x']
+        alg.settings.update({'matrix_free': True, 'cache_A': False})
+        alg.run()
+        assert type(alg.A).__name__ == 'LaplacianOperator'
+        y = np.random.rand(net.Np)
+        nt.assert_allclose(alg.A @ y, A @ y, atol=1e-12)
+        nt.assert_allclose(alg.A.rmatvec(y), A.T @ y, atol=1e-12)
+        nt.assert_allclose(alg['pore.x'], x, rtol=1e-8)
+        # Direct solvers need the assembled matrix
+        alg.settings['solver_type'] = 'spsolve'
+        with pytest.raises(Exception):
+            alg.run()
+
+    def test_matrix_free_topology_health(self):
+        net = op.network.Cubic(shape=[6, 1, 1])
+        op.topotools.trim(network=net, throats=[2])
+        phase = op.phases.GenericPhase(network=net)
+        phase['throat.conductance'] = 1.0
+        alg = op.algorithms.GenericTransport(network=net, phase=phase)
+        alg.settings.update({'conductance': 'throat.conductance',
+                             'quantity': 'pore.x',
+                             'solver_family': 'scipy',
+                             'solver_type': 'cg',
+                             'matrix_free': True})
+        alg.set_value_BC(pores=[0], values=1.0)
+        # Pores 3 to 5 are not connected to any BCs
+        with pytest.raises(Exception):
+            alg.run()
+        alg.set_value_BC(pores=[5], values=0.0)
+        alg.run()
+        nt.assert_allclose(alg['pore.x'], [1, 1, 1, 0, 0, 0], atol=1e-8)
+
     def test_rate_single_pore(self):
         alg = op.algorithms.ReactiveTransport(network=self.net,
                                               phase=self.phase)
@@ -36,6 +36,38 @@ class IPTest:
         alg.run()
         assert alg["throat.invasion_sequence"].max() == (alg.Nt - 1)
 
+    def test_resumable_run(self):
+        alg = op.algorithms.InvasionPercolation(network=self.net, phase=self.water)
+        alg.set_inlets(pores=self.net.pores("top"))
+        alg.run()
+        seq = alg["throat.invasion_sequence"].copy()
+        # Invading in chunks gives the same sequence as a single run
+        alg.set_inlets(pores=self.net.pores("top"), overwrite=True)
+        alg.run(n_steps=1000)
+        assert alg["throat.invasion_sequence"].max() == 999
+        while len(alg.queue) > 0:
+            alg.run(n_steps=1000)
+        assert np.all(alg["throat.invasion_sequence"] == seq)
+        # Stopping criteria
+        alg.set_inlets(pores=self.net.pores("top"), overwrite=True)
+        Pc = np.median(self.water["throat.entry_pressure"])
+        alg.run(until_pressure=Pc)
+        inv = alg["throat.invasion_sequence"] >= 0
+        assert alg["throat.entry_pressure"][inv].max() <= Pc
+        assert alg["throat.entry_pressure"][alg["throat.sorted"][alg.queue[0]]] > Pc
+        alg.run(until_saturation=0.9)
+        Vp = self.net["pore.volume"]
+        Vt = self.net["throat.volume"]
+        Pinv = alg["pore.invasion_sequence"].copy()
+        Tinv = alg["throat.invasion_sequence"]
+        Pinv[self.net.pores("top")] = -1  # Inlets are not counted
+
+        def S(N):
+            V = Vp[(Pinv >= 0)*(Pinv <= N)].sum() + Vt[(Tinv >= 0)*(Tinv <= N)].sum()
+            return V/(Vp.sum() + Vt.sum())
+        assert S(Tinv.max()) >= 0.9
+        assert S(Tinv.max() - 1) < 0.9
+
     def test_results(self):
         alg = op.algorithms.InvasionPercolation(network=self.net, phase=self.water)
         alg.set_inlets(pores=self.net.pores("top"))
@@ -59,6 +91,20 @@ class IPTest:
         alg.apply_trapping(outlets=self.net.pores("bottom"))
         assert "pore.trapped" in alg.labels()
 
+    def test_trapping_partial_invasion(self):
+        alg = op.algorithms.InvasionPercolation(network=self.net, phase=self.water)
+        alg.set_inlets(pores=self.net.pores("top"))
+        alg.run(n_steps=300)
+        defender = alg["pore.invasion_sequence"] < 0
+        outlets = self.net.pores("bottom")
+        alg.apply_trapping(outlets=outlets)
+        # Defender connected to the outlets escapes, all the rest is trapped
+        clusters = op.topotools.find_clusters(self.net, mask=defender)[0]
+        escaping = np.isin(clusters, clusters[outlets][clusters[outlets] >= 0])
+        assert np.all(alg["pore.clusters"][escaping] == -2)
+        assert np.all(alg["pore.trapped"][defender & ~escaping])
+        assert np.any(alg["pore.trapped"][defender])
+
     def test_plot_intrusion_curve(self):
         alg = op.algorithms.InvasionPercolation(network=self.net, phase=self.water)
         alg.set_inlets(pores=self.net.pores("top"))
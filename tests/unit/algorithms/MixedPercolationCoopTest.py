@@ -97,6 +97,21 @@ class MixedPercolationCoopTest:
         ip.set_inlets(pores=pn.pores('bottom'))
         ip.run()
         assert np.any(~np.isnan(ip.tt_Pc.data[0]))
+        # Only the pairs that fill are stored, sorted by throat
+        assert ip.tt_Pc.has_sorted_indices
+        assert np.all(~np.isnan(ip.tt_Pc.data))
+
+    def test_throat_pairs(self):
+        ip = mpc(network=self.net)
+        Ps, Ts, T1, T2 = ip._get_throat_pairs()
+        assert np.all(Ps[T1] == Ps[T2])
+        for pore in self.net.Ps:
+            ts = self.net.find_neighbor_throats(pores=pore)
+            assert np.all(Ts[Ps == pore] == ts)
+            mask = Ps[T1] == pore
+            pairs = [[ts[i], ts[j]] for i in range(len(ts))
+                     for j in range(i + 1, len(ts))]
+            assert np.all(np.column_stack((Ts[T1], Ts[T2]))[mask] == pairs)
 
 
 if __name__ == '__main__':
@@ -457,6 +457,27 @@ class MixedPercolationTest:
         # Single invasion point
         assert np.any(alg_data.S_pore < 1.0)
 
+    def test_merging_multiple_clusters(self):
+        pn = op.network.Cubic(shape=[5, 5, 1], spacing=1)
+        geo = op.geometry.GenericGeometry(network=pn,
+                                          pores=pn.pores(),
+                                          throats=pn.throats())
+        air = op.phases.Air(network=pn)
+        phys = op.physics.GenericPhysics(network=pn, phase=air, geometry=geo)
+        np.random.seed(0)
+        phys['throat.entry_pressure'] = np.random.random(pn.Nt)
+        phys['pore.entry_pressure'] = np.random.random(pn.Np)
+        IP_1 = mp(network=pn)
+        IP_1.setup(phase=air)
+        IP_1.set_inlets(clusters=[[0], [4], [20], [24]])
+        # Clusters merge into ones that have already invaded in the same round
+        IP_1.run()
+        assert np.all(IP_1['pore.invasion_sequence'] > -1)
+        assert np.all(IP_1['throat.invasion_sequence'] > -1)
+        assert IP_1.count == pn.Np + pn.Nt - 4
+        assert len(IP_1.queue) == 4
+        assert not np.any(IP_1.invasion_running)
+
 
 if __name__ == '__main__':
     t = MixedPercolationTest()
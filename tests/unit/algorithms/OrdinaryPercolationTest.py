@@ -154,6 +154,28 @@ class OrdinaryPercolationTest:
         Tent = self.water['throat.entry_pressure']
         assert np.all(Tent <= Tinv)
 
+    def test_invasion_pressures_match_cluster_search(self):
+        self.phys['pore.entry_pressure'] = np.random.rand(self.net.Np)*1e4
+        conns = self.net['throat.conns']
+        inlets = self.net.pores('top')
+        for mode in ['bond', 'site']:
+            alg = op.algorithms.OrdinaryPercolation(network=self.net,
+                                                    phase=self.water)
+            alg.settings['mode'] = mode
+            alg.set_inlets(pores=inlets)
+            alg.run(points=50)
+            for Pc in alg._points:
+                if mode == 'bond':
+                    mask = self.water['throat.entry_pressure'] <= Pc
+                    labels = op.topotools.bond_percolation(conns, mask)
+                else:
+                    mask = self.water['pore.entry_pressure'] <= Pc
+                    labels = op.topotools.site_percolation(conns, mask)
+                labels = op.topotools.remove_isolated_clusters(labels, inlets)
+                data = alg.results(Pc=Pc)
+                assert np.all(data['pore.occupancy'] == (labels.sites >= 0))
+                assert np.all(data['throat.occupancy'] == (labels.bonds >= 0))
+
 
 if __name__ == '__main__':
 
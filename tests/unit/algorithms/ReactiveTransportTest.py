@@ -223,6 +223,57 @@ class ReactiveTransportTest:
         desired = [10.0, 8.18175755, 5.42194391, 0.0]
         assert_allclose(c_avg, desired)
 
+    def test_reuse_preconditioner(self):
+        alg = op.algorithms.ReactiveTransport(network=self.net,
+                                              phase=self.phase)
+        alg.settings.update({'conductance': 'throat.diffusive_conductance',
+                             'quantity': 'pore.concentration',
+                             'solver_family': 'scipy',
+                             'solver_type': 'gmres',
+                             'solver_preconditioner': 'block_jacobi',
+                             'reuse_preconditioner': True})
+        alg.set_source(pores=self.net.pores('bottom'), propname='pore.reaction')
+        alg.set_value_BC(pores=self.net.pores('top'), values=1.0)
+        alg.run()
+        c = alg['pore.concentration'].copy()
+        stats = alg.preconditioner.stats
+        assert stats['reuses'] > 0
+        rebuilds = stats['A changed'] + stats['convergence degraded']
+        assert stats['builds'] == rebuilds + 1
+        # Any change in A causes a rebuild when the tolerance is zero
+        alg.settings['preconditioner_tol'] = 0.0
+        alg.run()
+        assert alg.preconditioner.stats['A changed'] > stats['A changed']
+        # Results match those without a reused preconditioner
+        alg.settings.update({'solver_family': 'pypardiso',
+                             'solver_type': 'spsolve'})
+        alg.run()
+        assert_allclose(alg['pore.concentration'], c, rtol=1e-5)
+
+    def test_anderson_mixing_needs_fewer_iterations(self):
+        its = {}
+        for method in ['picard', 'anderson']:
+            alg = op.algorithms.ReactiveTransport(network=self.net,
+                                                  phase=self.phase)
+            alg.settings.update({'conductance': 'throat.diffusive_conductance',
+                                 'quantity': 'pore.concentration',
+                                 'relaxation_quantity': 0.2,
+                                 'nlin_method': method})
+            alg.set_source(pores=self.net.pores('bottom'),
+                           propname='pore.reaction')
+            alg.set_value_BC(pores=self.net.pores('top'), values=1.0)
+            alg.run()
+            its[method] = len(alg.residual_history)
+            assert alg.residual_history[-1] < alg.residual_history[0]
+            c = alg['pore.concentration']
+            if method == 'picard':
+                c_picard = c
+        assert_allclose(c, c_picard, rtol=1e-5)
+        assert its['anderson'] < its['picard']
+        alg.settings['nlin_method'] = 'foo'
+        with pytest.raises(Exception):
+            alg.run()
+
     def test_reset(self):
         self.alg.reset(bcs=True, source_terms=True)
         self.alg.set_source(pores=self.net.pores('bottom'), propname='pore.reaction')
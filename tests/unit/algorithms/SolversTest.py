@@ -39,6 +39,38 @@ class SolversTest:
             xmean = self.alg['pore.x'].mean()
             nt.assert_allclose(actual=xmean, desired=0.5875950426)
 
+    def test_scipy_direct_reuses_factorization(self):
+        alg = op.algorithms.GenericTransport(network=self.net)
+        alg.settings.update(self.alg.settings)
+        alg.set_value_BC(pores=self.net.pores('front'), values=1.0)
+        alg.set_value_BC(pores=self.net.pores('bottom'), values=0.0)
+        alg.settings.update(solver_family='scipy', solver_type='spsolve')
+        # Factorizations are not cached by default
+        assert not alg.settings['cache_factorization']
+        alg.run()
+        assert alg._factorization_cache is None
+        alg.settings['cache_factorization'] = True
+        cache = alg.factorization_cache
+        alg.run()
+        assert len(cache) == 1
+        hits = cache.hits
+        alg.run()
+        assert cache.hits == hits + 1
+        xmean = alg['pore.x'].mean()
+        nt.assert_allclose(actual=xmean, desired=0.5875950426)
+        # Changing the BCs changes A so requires a new factorization
+        alg.set_value_BC(pores=self.net.pores('top'), values=0.5)
+        alg.run()
+        assert len(cache) == 2
+        # Least recently used factorizations are discarded beyond max_size
+        evictions = cache.evictions
+        cache.max_size = cache.nbytes
+        cache.store('foo', None, nbytes=1)
+        assert cache.evictions == evictions + 1
+        assert cache.nbytes <= cache.max_size
+        # Each algorithm has its own cache
+        assert self.alg.factorization_cache is not cache
+
     def test_scipy_iterative(self):
         solvers = ['bicg', 'bicgstab', 'cg', 'cgs', 'qmr', 'gcrotmk',
                    'gmres', 'lgmres']
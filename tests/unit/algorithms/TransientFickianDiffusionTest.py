@@ -1,3 +1,4 @@
+import pytest
 import numpy as np
 import openpnm as op
 
@@ -42,6 +43,38 @@ class TransientFickianDiffusionTest:
         y = np.around(alg[alg.settings['quantity']], decimals=5)
         assert np.all(x == y)
 
+    def test_constant_A_reuses_factorization(self):
+        alg = op.algorithms.TransientFickianDiffusion(network=self.net,
+                                                      phase=self.phase)
+        alg.settings.update({'t_final': 10, 't_step': 1, 't_output': 5,
+                             't_scheme': 'implicit',
+                             'solver_family': 'scipy',
+                             'solver_type': 'spsolve'})
+        assert not alg.settings['cache_factorization']
+        alg.set_IC(0)
+        alg.set_value_BC(pores=self.net.pores('right'), values=1)
+        alg.set_value_BC(pores=self.net.pores('left'), values=0)
+        alg.run()
+        cache = alg.factorization_cache
+        assert len(cache) == 1
+        assert cache.hits > 0
+        # A steady solve is not cached when caching is off
+        alg.settings['t_scheme'] = 'steady'
+        cache.clear()
+        alg.run()
+        assert len(cache) == 0
+
+    def test_matrix_free_not_supported(self):
+        alg = op.algorithms.TransientFickianDiffusion(network=self.net,
+                                                      phase=self.phase)
+        alg.settings.update({'t_final': 10, 't_step': 1, 't_output': 5,
+                             'solver_family': 'scipy', 'solver_type': 'cg',
+                             'matrix_free': True})
+        alg.set_IC(0)
+        alg.set_value_BC(pores=self.net.pores('right'), values=1)
+        with pytest.raises(Exception, match='Matrix-free'):
+            alg.run()
+
     def teardown_class(self):
         ws = op.Workspace()
         ws.clear()
@@ -67,7 +67,9 @@ class TransientImplicitReactiveTransportTest:
                  "pore.concentration@5e-1",
                  "pore.concentration@7e-1",
                  "pore.concentration@1"]
-        assert set(times).issubset(self.alg.keys())
+        assert set(times).issubset(self.alg.results().keys())
+        # Solutions are only kept in the time series by default
+        assert not [k for k in self.alg.keys() if '@' in k]
 
     def test_transient_reactive_transport_results(self):
         times_total = ["pore.concentration@0",
@@ -105,6 +107,119 @@ class TransientImplicitReactiveTransportTest:
         y = self.alg["pore.concentration"]
         nt.assert_allclose(y, x, rtol=1e-5)
 
+    def test_adaptive_time_stepping(self):
+        alg = op.algorithms.TransientReactiveTransport(
+            network=self.net, phase=self.phase, settings=self.settings)
+        alg.settings.update({'t_initial': 0,
+                             't_final': 1,
+                             't_step': 0.001,
+                             't_scheme': 'cranknicolson',
+                             't_output': [0.5, 0.73]})
+        alg.set_value_BC(pores=self.net.pores('front'), values=2)
+        alg.set_source(propname='pore.reaction', pores=self.net.pores('back'))
+        alg.run()
+        x = alg['pore.concentration'].copy()
+        alg.settings.update({'t_adaptive': True, 't_adaptive_tol': 1e-4,
+                             't_step': 0.01, 't_solns': []})
+        alg.run()
+        y = alg["pore.concentration"]
+        nt.assert_allclose(y, x, rtol=1e-3)
+        # Far fewer steps than the fixed step run, and outputs are exact
+        assert len(alg.t_history) < 100
+        assert {0.5, 0.73, 1}.issubset(alg.t_history)
+        assert alg.settings['t_solns'] == ['5e-1', '73e-2', '1']
+        assert alg.settings['t_step'] == 0.01
+
+    def test_time_series_store(self, tmp_path):
+        alg = op.algorithms.TransientReactiveTransport(
+            network=self.net, phase=self.phase, settings=self.settings)
+        alg.settings.update({'t_initial': 0,
+                             't_final': 1,
+                             't_step': 0.01,
+                             't_output': 0.01,
+                             't_store_keys': False,
+                             't_store_file': str(tmp_path / 'soln.dat'),
+                             't_solns': []})
+        alg.set_value_BC(pores=self.net.pores('front'), values=2)
+        alg.set_source(propname='pore.reaction', pores=self.net.pores('back'))
+        alg.run()
+        ts = alg.time_series
+        # More outputs than the initial chunk, all in the memory-mapped file
+        assert len(ts) == 101
+        assert isinstance(ts.data, np.memmap)
+        assert not [k for k in alg.keys() if '@' in k]
+        d = alg.results(times=[0.5, 1])
+        assert set(d.keys()) == {'pore.concentration@5e-1',
+                                 'pore.concentration@1'}
+        nt.assert_allclose(d['pore.concentration@1'], alg['pore.concentration'])
+        x = ts.interpolate(0.505)
+        x0, x1 = ts.results(times=[0.5, 0.51]).values()
+        nt.assert_allclose(x, (x0 + x1)/2)
+        ts.to_xdmf(network=self.net, filename=tmp_path / 'soln',
+                   name='pore.concentration')
+        assert (tmp_path / 'soln.xmf').exists()
+        import h5py
+        with h5py.File(tmp_path / 'soln.hdf', 'r') as f:
+            nt.assert_allclose(f['pore.concentration'][-1],
+                               alg['pore.concentration'])
+
+    def test_exponential_scheme(self):
+        alg = op.algorithms.TransientReactiveTransport(
+            network=self.net, phase=self.phase, settings=self.settings)
+        alg.settings.update({'t_initial': 0,
+                             't_final': 1,
+                             't_step': 0.001,
+                             't_output': [0.05, 0.5],
+                             't_scheme': 'cranknicolson'})
+        alg.set_value_BC(pores=self.net.pores('front'), values=2)
+        alg.run()
+        x = alg.results(times=[0.05, 0.5, 1])
+        alg.settings.update({'t_scheme': 'exponential', 't_step': 0.1})
+        alg.run()
+        y = alg.results(times=[0.05, 0.5, 1])
+        for k in x.keys():
+            nt.assert_allclose(y[k], x[k], rtol=1e-5)
+        # Problems with sources are solved by implicit time marching
+        alg.set_source(propname='pore.reaction', pores=self.net.pores('back'))
+        alg.run()
+        y = alg["pore.concentration"]
+        x = [2, 0.95029957, 0.41910096,
+             2, 0.95029957, 0.41910096,
+             2, 0.95029957, 0.41910096]
+        nt.assert_allclose(y, x, rtol=1e-5)
+
+    def test_checkpoint_and_resume(self, tmp_path):
+        def setup(**kwargs):
+            alg = op.algorithms.TransientReactiveTransport(
+                network=self.net, phase=self.phase, settings=self.settings)
+            alg.settings.update({'t_initial': 0,
+                                 't_final': 1,
+                                 't_step': 0.1,
+                                 't_output': 0.2,
+                                 't_scheme': 'implicit',
+                                 't_solns': []})
+            alg.settings.update(kwargs)
+            alg.set_value_BC(pores=self.net.pores('front'), values=2)
+            alg.set_source(propname='pore.reaction',
+                           pores=self.net.pores('back'))
+            return alg
+        alg = setup()
+        alg.run()
+        x = alg.results()
+        # Interrupt a run after 0.5 s, with a checkpoint at 0.3 s
+        fname = str(tmp_path / 'checkpoint.npz')
+        alg = setup(t_checkpoint_file=fname, t_checkpoint_interval=0.3,
+                    t_final=0.5)
+        alg.run()
+        assert alg._checkpoint.count == 1
+        alg = setup()
+        alg.run(resume_from=fname)
+        y = alg.results()
+        assert x.keys() == y.keys()
+        for k in x.keys():
+            nt.assert_allclose(y[k], x[k], rtol=1e-12)
+        assert alg.settings['t_solns'] == ['2e-1', '4e-1', '6e-1', '8e-1', '1']
+
     def test_adding_bc_over_sources(self):
         with pytest.raises(Exception):
             self.alg.set_value_BC(pores=self.net.pores("right"), values=0.3)
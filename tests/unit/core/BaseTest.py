@@ -989,6 +989,19 @@ class BaseTest:
         with pytest.raises(KeyError):
             pn.get_conduit_data('blah')
 
+    def test_combine_labels_matches_label_counts(self):
+        np.random.seed(0)
+        masks = [np.random.rand(45) < 0.4 for _ in range(4)]
+        counts = np.sum(masks, axis=0)
+        combine = op.core.LabelMixin._combine_labels
+        assert np.all(combine(masks, 'or', 45) == (counts > 0))
+        assert np.all(combine(masks, 'and', 45) == (counts == 4))
+        assert np.all(combine(masks, 'xor', 45) == (counts == 1))
+        assert np.all(combine(masks, 'nor', 45) == (counts == 0))
+        assert np.all(combine(masks, 'nand', 45) == (counts > 0)*(counts < 4))
+        assert np.all(combine(masks, 'xnor', 45) == (counts > 1))
+        assert np.all(combine([], 'and', 45))
+
 
 if __name__ == '__main__':
 
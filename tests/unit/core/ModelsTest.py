@@ -195,6 +195,118 @@ class ModelsTest:
         _ = geo['pore.seed']
         assert len(geo) == 3
 
+    def test_skip_unchanged_models(self):
+        pn = op.network.Cubic(shape=[3, 3, 3], spacing=1e-4)
+        geo = op.geometry.SpheresAndCylinders(network=pn, pores=pn.Ps,
+                                              throats=pn.Ts)
+        air = op.phases.Air(network=pn)
+        phys = op.physics.Standard(network=pn, phase=air, geometry=geo)
+        for obj in [geo, air, phys]:
+            obj.settings['skip_unchanged_models'] = True
+        air.regenerate_models(deep=True)
+        geo.regenerate_models()
+        seed = geo['pore.seed'].copy()
+        g = phys['throat.diffusive_conductance'].copy()
+        # Nothing changed so arrays should not be rewritten
+        v1 = phys._versions['throat.diffusive_conductance']
+        air.regenerate_models(deep=True)
+        geo.regenerate_models()
+        assert phys._versions['throat.diffusive_conductance'] == v1
+        assert np.all(geo['pore.seed'] == seed)
+        # Changing an input causes all dependent models to rerun
+        air['pore.temperature'] = 350.0
+        air.regenerate_models(deep=True)
+        assert phys._versions['throat.diffusive_conductance'] != v1
+        assert np.all(phys['throat.diffusive_conductance'] > g)
+        # Changing a model parameter also causes it to rerun
+        v2 = geo._versions['pore.seed']
+        geo.models['pore.seed']['num_range'] = [0.5, 0.5]
+        geo.regenerate_models()
+        assert geo._versions['pore.seed'] != v2
+        assert np.all(geo['pore.seed'] == 0.5)
+
+    def test_regenerate_models_with_workers(self):
+        pn = op.network.Cubic(shape=[5, 5, 5], spacing=1e-4)
+        Ps = pn.pores('left')
+        Ts = pn.find_neighbor_throats(pores=Ps, mode='xnor')
+        geo1 = op.geometry.SpheresAndCylinders(network=pn, pores=Ps,
+                                               throats=Ts)
+        geo2 = op.geometry.SpheresAndCylinders(network=pn,
+                                               pores=pn.pores('left', mode='not'),
+                                               throats=pn.throats(geo1.name,
+                                                                  mode='not'))
+        air = op.phases.Air(network=pn)
+        phys1 = op.physics.Standard(network=pn, phase=air, geometry=geo1)
+        phys2 = op.physics.Standard(network=pn, phase=air, geometry=geo2)
+        air['pore.temperature'] = 350.0
+        air.regenerate_models(deep=True)
+        g = air['throat.diffusive_conductance'].copy()
+        air['pore.temperature'] = 298.0
+        air.regenerate_models(deep=True, workers=4)
+        assert np.all(air['throat.diffusive_conductance'] < g)
+        air['pore.temperature'] = 350.0
+        air.regenerate_models(deep=True, workers=4)
+        assert np.allclose(air['throat.diffusive_conductance'], g)
+        assert 'throat.diffusive_conductance' in phys1.models.timings.keys()
+        assert 'throat.diffusive_conductance' in phys2.models.timings.keys()
+        assert 'pore.diffusivity' in air.models.timings.keys()
+        seed = geo1['pore.seed'].copy()
+        pn.regenerate_models(deep=True, workers=2)
+        assert not np.all(geo1['pore.seed'] == seed)
+        assert geo2.models.timings['throat.volume'] >= 0
+
+    def test_cached_regen_mode(self):
+        pn = op.network.Cubic(shape=[3, 3, 3], spacing=1e-4)
+        geo = op.geometry.SpheresAndCylinders(network=pn, pores=pn.Ps,
+                                              throats=pn.Ts)
+        air = op.phases.Air(network=pn)
+        phys = op.physics.Standard(network=pn, phase=air, geometry=geo)
+        phys.add_model(propname='throat.diffusive_conductance',
+                       model=mods.physics.diffusive_conductance.generic_diffusive,
+                       regen_mode='cached')
+        cache = phys.models.cache
+        assert cache.misses == 1
+        g1 = phys['throat.diffusive_conductance'].copy()
+        air['pore.temperature'] = 350.0
+        air.regenerate_models()
+        phys.regenerate_models()
+        g2 = phys['throat.diffusive_conductance'].copy()
+        assert np.all(g2 > g1)
+        assert cache.misses == 2
+        # Returning to a previous state reuses the stored result
+        air['pore.temperature'] = 298.0
+        air.regenerate_models()
+        phys.regenerate_models()
+        assert cache.hits == 1
+        assert np.allclose(phys['throat.diffusive_conductance'], g1)
+        # Editing the returned values does not alter the stored ones
+        phys['throat.diffusive_conductance'][:] = 0.0
+        phys.regenerate_models()
+        assert cache.hits == 2
+        assert np.allclose(phys['throat.diffusive_conductance'], g1)
+        assert cache.stats['count'] == 2
+        # Least recently used results are discarded to stay within budget
+        cache.max_size = g1.nbytes
+        cache.store('foo', g1)
+        assert cache.stats['count'] == 1
+        assert cache.nbytes <= cache.max_size
+
+    def test_cached_regen_mode_after_moving_subdomain(self):
+        pn = op.network.Cubic(shape=[4, 1, 1])
+        g1 = op.geometry.GenericGeometry(network=pn, pores=[0, 1])
+        g2 = op.geometry.GenericGeometry(network=pn, pores=[2, 3])
+
+        def x_coord(target):
+            return target['pore.coords'][:, 0]
+
+        g1.add_model(propname='pore.x', model=x_coord, regen_mode='cached')
+        assert np.all(g1['pore.x'] == [0.5, 1.5])
+        g1.set_locations(pores=[2, 3], mode='switch')
+        g2.set_locations(pores=[0, 1], mode='switch')
+        g1.regenerate_models()
+        assert np.all(g1['pore.x'] == [2.5, 3.5])
+        assert g1.models.cache.hits == 0
+
 
 if __name__ == '__main__':
 
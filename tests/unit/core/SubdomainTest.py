@@ -86,6 +86,36 @@ class SubdomainTest:
         assert phys1 in air.physics
         assert phys2 in air.physics
 
+    def test_cached_locations_updated_by_set_locations(self):
+        pn = op.network.Cubic([6, 1, 1])
+        g1 = op.geometry.GenericGeometry(network=pn, pores=[0, 1, 2])
+        g2 = op.geometry.GenericGeometry(network=pn, pores=[3, 4, 5])
+        g1['pore.foo'] = 1.0
+        g2['pore.foo'] = 2.0
+        assert np.all(g1._get_global_indices('pore') == [0, 1, 2])
+        assert np.all(pn['pore.foo'] == [1, 1, 1, 2, 2, 2])
+        g2.set_locations(pores=[2], mode='switch')
+        assert np.all(g1._get_global_indices('pore') == [0, 1])
+        assert np.all(g2._get_global_indices('pore') == [2, 3, 4, 5])
+        assert np.all(g2._get_local_indices('pore') == [-1, -1, 0, 1, 2, 3])
+        assert np.all(g1['pore.coords'] == pn['pore.coords'][[0, 1]])
+        # Mapping to and from the network uses the cached indices
+        assert np.all(g2.map_pores(pores=[1, 2, 5], origin=pn) == [0, 3])
+        m = g2.map_pores(pores=[1, 2, 5], origin=pn, filtered=False)
+        assert np.all(m.mask == [False, True, True])
+        assert np.all(pn.map_pores(pores=[0, 3], origin=g2) == [2, 5])
+
+    def test_cached_locations_updated_by_trim(self):
+        pn = op.network.Cubic([6, 1, 1])
+        g1 = op.geometry.GenericGeometry(network=pn, pores=[0, 1, 2])
+        g2 = op.geometry.GenericGeometry(network=pn, pores=[3, 4, 5])
+        g2['pore.foo'] = np.arange(3)
+        assert np.all(g2._get_global_indices('pore') == [3, 4, 5])
+        op.topotools.trim(network=pn, pores=[0])
+        assert np.all(g2._get_global_indices('pore') == [2, 3, 4])
+        assert np.all(g2['pore.coords'] == pn['pore.coords'][[2, 3, 4]])
+        assert np.all(pn['pore.foo'][2:] == [0, 1, 2])
+
 
 if __name__ == '__main__':
 
@@ -392,6 +392,79 @@ class ProjectTest:
         assert df.shape[1] == 3
         assert self.net.name + '.throat.conns_head' in df.index
 
+    def test_key_index_updated_incrementally(self):
+        proj = self.ws.copy_project(self.net.project)
+        net = proj.network
+        geo1 = proj.geometries()['geo_01']
+        index = proj._get_key_index(geo1)
+        assert index is proj._get_key_index(net)
+        assert index['pore.all'] == 3
+        geo1['pore.foo'] = 1.0
+        assert index['pore.foo'] == 1
+        assert index is proj._get_key_index(net)
+        geo1['throat.bar.baz'] = 1.0
+        assert index.roots['throat.bar'] == 1
+        del geo1['throat.bar.baz']
+        assert 'throat.bar.baz' not in index
+        assert 'throat.bar' not in index.roots
+        geo1.pop('pore.foo')
+        assert 'pore.foo' not in index
+        net.update({'pore.foo': np.ones(net.Np)})
+        assert index['pore.foo'] == 1
+
+    def test_key_index_matches_rebuilt_index(self):
+        proj = self.ws.copy_project(self.net.project)
+        phase = proj.phases()['phase_01']
+        phys = proj.find_physics(phase=phase)
+        phys[0]['pore.foo'] = 1.0
+        phys[1]['pore.foo'] = 2.0
+        phys[1]['throat.bar.baz'] = 2.0
+        index = dict(proj._get_key_index(phase))
+        proj._invalidate_key_index()
+        assert index == dict(proj._get_key_index(phase))
+
+    def test_key_index_invalidated_by_new_associations(self):
+        proj = self.ws.copy_project(self.net.project)
+        net = proj.network
+        index = proj._get_key_index(net)
+        geo = op.geometry.GenericGeometry(network=net)
+        assert proj._get_key_index(net) is not index
+        geo['pore.blah'] = 1.0
+        with pytest.raises(Exception):
+            net['pore.blah'] = 1.0
+        proj.purge_object(geo)
+        net['pore.blah'] = 1.0
+
+    def test_associations_updated_when_objects_change(self):
+        net = op.network.Cubic(shape=[4, 1, 1])
+        proj = net.project
+        geo1 = op.geometry.GenericGeometry(network=net, pores=[0, 1])
+        geo2 = op.geometry.GenericGeometry(network=net, pores=[2, 3])
+        phase = op.phases.GenericPhase(network=net)
+        phys1 = op.physics.GenericPhysics(network=net, phase=phase,
+                                          geometry=geo1)
+        assert proj.find_physics(geometry=geo1, phase=phase) is phys1
+        assert proj.find_physics(geometry=geo2) == []
+        assert proj.find_geometry(phys1) is geo1
+        # Adding an object updates the table
+        phys2 = op.physics.GenericPhysics(network=net, phase=phase,
+                                          geometry=geo2)
+        assert proj.find_physics(phase=phase) == [phys1, phys2]
+        assert proj.find_physics(geometry=geo2) == [phys2]
+        # Renaming an object updates the table
+        phys2.name = 'foo'
+        assert proj.find_physics(geometry=geo2, phase=phase) is phys2
+        # Moving a physics to a new phase updates the table
+        phase2 = op.phases.GenericPhase(network=net)
+        phys2.set_phase(phase=phase2, mode='move')
+        assert proj.find_phase(phys2) is phase2
+        assert proj.find_physics(phase=phase) == [phys1]
+        # Removing an object updates the table
+        proj.purge_object(phys1)
+        assert proj.find_physics(phase=phase) == []
+        with pytest.raises(Exception):
+            proj.find_physics(geometry=geo1, phase=phase)
+
 
 if __name__ == '__main__':
 